@@ -1,52 +1,336 @@
 from __future__ import annotations
 
-from collections.abc import Callable, Iterator
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import nullcontext
 from typing import TYPE_CHECKING, TypeVar
 
 T = TypeVar("T")
 
+import queue
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import parsedate_to_datetime
 
 import frappe
 import frappe.defaults
+from frappe.utils import add_to_date, now_datetime
 from hishel.httpx import SyncCacheClient
-from httpx import Response
+from httpx import Response, TransportError
 from pydantic import BaseModel, field_validator
 
-from .datastruct import Address, LedgerEntry, Listing, Me, Payment, ShopReceipt, User
+from . import metrics
+from .datastruct import Address, Inventory, LedgerEntry, Listing, Me, Payment, ShopReceipt, User
 
 if TYPE_CHECKING:
 	from .etsy.doctype.etsy_shop.etsy_shop import EtsyShop
+	from .etsy.doctype.etsy_sync_run.etsy_sync_run import SyncRunJournal
+
+API_BASE_URL = "https://api.etsy.com/"  # can be overridden with the site config `etsy_api_base_url`
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT")
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BACKOFF_BASE = 0.5  # seconds
+RETRY_BACKOFF_MAX = 30.0  # seconds
+RETRY_AFTER_MAX = 300.0  # seconds, upper bound for a server-requested wait
+CIRCUIT_FAILURE_THRESHOLD = 3  # failed requests (after retries) until the circuit opens
+CIRCUIT_COOLDOWN = 900  # seconds a shop's sync is paused once the circuit is open
+PAYMENT_FETCH_WORKERS = 4  # concurrent payment requests, well below Etsy's rate limit
+PAGE_INTERVAL = 0.25  # seconds between page requests of a worker process, shared by concurrent fetches
+FETCH_BUFFER = 200  # records fetched ahead of the writer in `fetch_concurrently`
+POLL_RATE_WINDOW = 24  # hours of imported orders that determine a shop's order rate
+POLL_SAMPLES_PER_ORDER = 4  # polls within the mean time between two orders of a shop
+POLL_TOLERANCE = 30  # seconds a shop may be polled ahead of its schedule, absorbs scheduler jitter
+
+
+class EtsyCircuitOpenError(Exception):
+	"""Raised when a request is attempted while the circuit breaker of the shop is open."""
 
 
 ### Helper functions
-def fetch_all(fetch_func: Callable[[int], tuple[int, list[T]]], start_offset: int = 0) -> Iterator[T]:
+def fetch_all(
+	fetch_func: Callable[[int], tuple[int, list[T]]],
+	start_offset: int = 0,
+	key: Callable[[T], Hashable] | None = None,
+	anchor: Hashable | None = None,
+) -> Iterator[T]:
 	"""
+	Yields the records of all pages from `start_offset` on, until a page is empty
+	or the `count` returned with the latest page is reached.
+
+	With `key` (snapshot mode), records are identified by `key(record)` and each one is yielded once.
+	Every page after the first overlaps the previous one by its last record (the anchor) to detect drift:
+	records added before the current position move the anchor to a later position and the repeated
+	records are skipped; records removed before it move unseen records into the previous page,
+	which is then fetched once more. `anchor` is the key of the record before `start_offset`,
+	e.g. the last ID of an Etsy Import Checkpoint.
+	Pin the snapshot in `fetch_func` where the endpoint allows it (e.g. `max_created` at the run start),
+	so added records cannot cause drift at all.
+
 	### Usage example:
-	`for x in fetch_all(lambda offset: getXYZ(offset=offset, params=...)):`
+	`for x in fetch_all(lambda offset: getXYZ(offset=offset, params=...), key=lambda x: x.xyz_id):`
 	"""
-	offset: int = start_offset
-	total: int | None = None
-	seen: int = 0
+	offset: int = start_offset  # position after the last record of the previous page
+	seen: set[Hashable] = set()
+	stepped_back_at: int = -1  # steps back at most once per position, drift may not resolve
 
 	while True:
-		total_count, page = fetch_func(offset)
-
-		if total is None:
-			total = total_count
+		overlap = key is not None and anchor is not None and offset > 0
+		request_offset = offset - 1 if overlap else offset
+		total, page = fetch_func(request_offset)
 
 		if not page:
 			return
 
-		for item in page:
+		records = page
+		if overlap:
+			keys = [key(item) for item in page]
+			if anchor in keys:  # records up to the anchor are processed, or were added after it
+				records = page[keys.index(anchor) + 1 :]
+			elif request_offset > stepped_back_at:
+				stepped_back_at = request_offset
+				offset = max(1, request_offset - len(page) + 1)
+				page_throttle()
+				continue
+
+		for item in records:
+			if key is not None:
+				if (item_key := key(item)) in seen:
+					continue
+				seen.add(item_key)
 			yield item
-			seen += 1
 
-		if seen >= total:
+		if request_offset + len(page) >= total:
 			return
 
-		offset += len(page)
-		time.sleep(0.25)  # limit querys/sec
+		offset = request_offset + len(page)
+		if key is not None:
+			anchor = key(page[-1])
+		page_throttle()  # limit querys/sec
+
+
+def fetch_concurrently(fetchers: dict[str, Callable[[], Iterator[T]]]) -> Iterator[tuple[str, T | None]]:
+	"""
+	Runs each fetcher in its own thread and yields `(name, record)` in the order the records arrive,
+	then `(name, None)` once all records of a fetcher are yielded. The consumer is the only writer:
+	fetchers run at most `FETCH_BUFFER` records ahead of it, and their page requests share `page_throttle`.
+	An exception in a fetcher stops the others and is raised to the consumer.
+	Fetchers may share an `EtsyAPI`, each thread sends its requests through its own `EtsyAPI.client`.
+	A single fetcher runs in the calling thread.
+
+	### Usage example:
+	`for name, x in fetch_concurrently({name: lambda: fetch_all(...) for name in ...}):`
+	"""
+	if len(fetchers) == 1:
+		[(name, fetcher)] = fetchers.items()
+		for record in fetcher():
+			yield name, record
+		yield name, None
+		return
+
+	site, sites_path = frappe.local.site, frappe.local.sites_path
+	records: queue.Queue = queue.Queue(maxsize=FETCH_BUFFER)
+	stop = threading.Event()
+
+	def put(item: tuple):
+		while not stop.is_set():
+			try:
+				return records.put(item, timeout=0.1)
+			except queue.Full:
+				continue
+
+	def run(name: str, fetcher: Callable[[], Iterator[T]]):
+		# worker threads need a Frappe context for the metrics and the circuit breaker in Redis
+		frappe.init(site, sites_path=sites_path)
+		try:
+			for record in fetcher():
+				if stop.is_set():
+					return
+				put((name, record, None))
+			put((name, None, None))
+		except Exception as e:
+			put((name, None, e))
+		finally:
+			frappe.destroy()
+
+	threads = [threading.Thread(target=run, args=item, daemon=True) for item in fetchers.items()]
+	for thread in threads:
+		thread.start()
+
+	try:
+		pending = set(fetchers)
+		while pending:
+			name, record, error = records.get()
+			if error:
+				raise error
+			if record is None:
+				pending.discard(name)
+			yield name, record
+	finally:
+		stop.set()
+		for thread in threads:
+			thread.join()
+
+
+class Throttle:
+	"""Spaces calls at least `interval` seconds apart, across all threads of the process."""
+
+	def __init__(self, interval: float):
+		self.interval = interval
+		self._next = 0.0
+		self._lock = threading.Lock()
+
+	def __call__(self):
+		with self._lock:
+			now = time.monotonic()
+			delay = max(0.0, self._next - now)
+			self._next = max(now, self._next) + self.interval
+		if delay:
+			wait("throttle", delay)
+
+
+page_throttle = Throttle(PAGE_INTERVAL)
+
+
+def wait(reason: str, seconds: float):
+	"""Sleeps for `seconds` and records the wait in the API metrics."""
+	time.sleep(seconds)
+	metrics.record_wait(reason, seconds)
+
+
+def backoff_delay(attempt: int, retry_after: str | None = None) -> float:
+	"""
+	Returns the seconds to wait before retry number `attempt` (starting at 1).
+	A valid `Retry-After` header (seconds or HTTP-date) is honoured,
+	otherwise exponential backoff with full jitter is used.
+	"""
+	if retry_after:
+		try:
+			delay = float(retry_after)
+		except ValueError:
+			try:
+				delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+			except (TypeError, ValueError):
+				delay = None
+		if delay is not None:
+			return min(max(0.0, delay), RETRY_AFTER_MAX)
+
+	return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+	"""
+	Per-shop circuit breaker, shared by all workers through the Redis cache.
+	Opens after `CIRCUIT_FAILURE_THRESHOLD` consecutive failed requests and
+	pauses the shop's synchronisation for `CIRCUIT_COOLDOWN` seconds.
+	"""
+
+	def __init__(self, etsy_shop: str):
+		self.etsy_shop = etsy_shop
+		self.key = f"etsy:circuit_breaker:{etsy_shop}"
+
+	def state(self) -> dict:
+		return frappe.cache().get_value(self.key) or {}
+
+	def is_open(self) -> bool:
+		return self.state().get("open_until", 0) > time.time()
+
+	def record_success(self):
+		if self.state():
+			frappe.cache().delete_value(self.key)
+
+	def record_failure(self):
+		state = self.state()
+		failures = state.get("failures", 0) + 1
+
+		if failures >= CIRCUIT_FAILURE_THRESHOLD:
+			state = {"failures": 0, "open_until": time.time() + CIRCUIT_COOLDOWN}
+			frappe.log_error(
+				f"Etsy: Circuit breaker opened for shop {self.etsy_shop}",
+				f"Synchronisation is paused for {CIRCUIT_COOLDOWN // 60} minutes after {failures} failed requests.",
+			)
+		else:
+			state["failures"] = failures
+
+		frappe.cache().set_value(self.key, state, expires_in_sec=2 * CIRCUIT_COOLDOWN)
+
+
+class PollSchedule:
+	"""
+	Per-shop schedule of the scheduled receipt sync, shared by all workers through the Redis cache.
+	The scheduler job runs every `min_interval` minutes, but polls a shop only once it is due:
+	`POLL_SAMPLES_PER_ORDER` times within the mean time between its orders of the last `POLL_RATE_WINDOW`
+	hours, doubled for every poll in a row that found no new order, within `min_interval` and `max_interval`.
+	"""
+
+	def __init__(self, etsy_shop: str, min_interval: int, max_interval: int):
+		self.etsy_shop = etsy_shop
+		self.min_interval = max(1, min_interval)
+		self.max_interval = max(self.min_interval, max_interval)
+		self.key = f"etsy:poll_schedule:{etsy_shop}"
+
+	@classmethod
+	def for_shop(cls, etsy_shop: str) -> PollSchedule:
+		"""Schedule of `etsy_shop` within the bounds of 'Etsy Settings'."""
+		settings = frappe.get_cached_doc("Etsy Settings")
+		return cls(
+			etsy_shop,
+			settings.sales_order_sync_interval,
+			settings.sales_order_max_interval or settings.sales_order_sync_interval,
+		)
+
+	def state(self) -> dict:
+		return frappe.cache().get_value(self.key) or {}
+
+	def is_due(self) -> bool:
+		return self.state().get("next_poll", 0) - POLL_TOLERANCE <= time.time()
+
+	def next_poll(self) -> datetime | None:
+		"""Time of the next poll in the system timezone, `None` if the shop is due."""
+		if (next_poll := self.state().get("next_poll", 0)) > time.time():
+			return add_to_date(now_datetime(), seconds=next_poll - time.time())
+		return None
+
+	def recent_orders(self) -> int:
+		"""
+		Number of receipts imported for the shop by scheduled polls and webhooks within the last
+		`POLL_RATE_WINDOW` hours. Manual imports and backfills of older orders are not counted.
+		"""
+		from frappe.query_builder.functions import Sum
+
+		run = frappe.qb.DocType("Etsy Sync Run")
+		orders = (
+			frappe.qb.from_(run)
+			.select(Sum(run.records_created))
+			.where(
+				(run.etsy_shop == self.etsy_shop)
+				& (run.kind == "Receipts")
+				& run.trigger.isin(("Scheduled", "Webhook"))
+				& (run.started_at >= add_to_date(now_datetime(), hours=-POLL_RATE_WINDOW))
+			)
+			.run()
+		)
+		return int(orders[0][0] or 0)
+
+	def interval(self, orders: int, empty_polls: int) -> float:
+		"""Minutes until the next poll of a shop with `orders` recent orders after `empty_polls` empty polls."""
+		if not orders:
+			return self.max_interval
+		interval = POLL_RATE_WINDOW * 60 / orders / POLL_SAMPLES_PER_ORDER
+		interval = max(self.min_interval, interval) * 2 ** min(empty_polls, 10)
+		return min(interval, self.max_interval)
+
+	def record_poll(self, created: int):
+		"""Schedules the next poll after a poll that imported `created` new receipts."""
+		empty_polls = 0 if created else self.state().get("empty_polls", 0) + 1
+		interval = self.interval(self.recent_orders(), empty_polls)
+		frappe.cache().set_value(
+			self.key,
+			{"next_poll": time.time() + interval * 60, "empty_polls": empty_polls},
+			expires_in_sec=int(2 * self.max_interval * 60),
+		)
 
 
 ### Query Parameter Classes
@@ -229,9 +513,17 @@ class QP_getListingsByShop(BaseModel):
 
 
 class EtsyRESTv3:
-	def __init__(self, auth_header: dict, language: str = "de"):
+	def __init__(
+		self,
+		auth_header: dict,
+		language: str = "de",
+		circuit_breaker: CircuitBreaker | None = None,
+		base_url: str | None = None,
+	):
 		self.headers = auth_header
 		self.language = language
+		self.circuit_breaker = circuit_breaker
+		self.base_url = base_url or frappe.conf.get("etsy_api_base_url") or API_BASE_URL
 
 	def args(
 		self,
@@ -240,7 +532,7 @@ class EtsyRESTv3:
 		params: dict | None = None,
 		extensions: dict | None = None,
 	) -> dict:
-		_url = "https://api.etsy.com/"
+		_url = self.base_url if self.base_url.endswith("/") else f"{self.base_url}/"
 		_url += endpoint[1:] if endpoint.startswith("/") else endpoint
 
 		_params = {k: v for k, v in params.items() if v is not None} if isinstance(params, dict) else {}
@@ -254,9 +546,58 @@ class EtsyRESTv3:
 
 		return dict(url=_url, params=_params, headers=_headers, extensions=_extensions)
 
+	def request(self, client: SyncCacheClient, method: str = "GET", **kwargs) -> Response:
+		"""
+		Sends a request through `client`.
+		Idempotent requests are retried on timeouts, network errors and `RETRY_STATUS_CODES`.
+		Raises `EtsyCircuitOpenError` while the shop's circuit breaker is open.
+		"""
+		if self.circuit_breaker and self.circuit_breaker.is_open():
+			raise EtsyCircuitOpenError(
+				f"Etsy: Circuit breaker is open for shop {self.circuit_breaker.etsy_shop}"
+			)
+
+		attempts = RETRY_MAX_ATTEMPTS if method.upper() in IDEMPOTENT_METHODS else 1
+
+		for attempt in range(1, attempts + 1):
+			start = time.perf_counter()
+			try:
+				resp = client.request(method, **kwargs)
+			except TransportError as e:
+				metrics.record_request(kwargs["url"], type(e).__name__, time.perf_counter() - start)
+				if attempt == attempts:
+					if self.circuit_breaker:
+						self.circuit_breaker.record_failure()
+					raise
+				wait("retry", backoff_delay(attempt))
+				continue
+
+			metrics.record_request(
+				kwargs["url"],
+				resp.status_code,
+				time.perf_counter() - start,
+				size=len(resp.content),
+				from_cache=bool(resp.extensions.get("hishel_from_cache")),
+			)
+
+			if resp.status_code not in RETRY_STATUS_CODES:
+				if self.circuit_breaker:
+					self.circuit_breaker.record_success()
+				return resp
+
+			if attempt == attempts:
+				if self.circuit_breaker:
+					self.circuit_breaker.record_failure()
+				resp.raise_for_status()
+
+			wait(
+				"rate_limit" if resp.status_code == 429 else "retry",
+				backoff_delay(attempt, resp.headers.get("Retry-After")),
+			)
+
 	def getMe(self, client: SyncCacheClient) -> Response:
 		"""Returns basic info for the user making the request."""
-		return client.get(**self.args(endpoint="/v3/application/users/me"))
+		return self.request(client, **self.args(endpoint="/v3/application/users/me"))
 
 	def getUser(self, client: SyncCacheClient, user_id: int) -> Response:
 		"""
@@ -266,7 +607,7 @@ class EtsyRESTv3:
 		### query params:
 		- user_id: The numeric ID of a user.
 		"""
-		return client.get(**self.args(endpoint=f"/v3/application/users/{user_id}"))
+		return self.request(client, **self.args(endpoint=f"/v3/application/users/{user_id}"))
 
 	def getUserAddress(self, client: SyncCacheClient, user_address_id: int) -> Response:
 		"""
@@ -274,7 +615,7 @@ class EtsyRESTv3:
 		### query params:
 		- user_address_id: The numeric ID of the user's address.
 		"""
-		return client.get(**self.args(endpoint=f"/v3/application/user/addresses/{user_address_id}"))
+		return self.request(client, **self.args(endpoint=f"/v3/application/user/addresses/{user_address_id}"))
 
 	def getShopPaymentByReceiptId(self, client: SyncCacheClient, shop_id: int, receipt_id: int) -> Response:
 		"""
@@ -283,37 +624,73 @@ class EtsyRESTv3:
 		- shop_id: The unique positive non-zero numeric ID for an Etsy Shop.
 		- receipt_id: The numeric ID for the receipt associated to this transaction.
 		"""
-		return client.get(
-			**self.args(endpoint=f"/v3/application/shops/{shop_id}/receipts/{receipt_id}/payments")
+		return self.request(
+			client, **self.args(endpoint=f"/v3/application/shops/{shop_id}/receipts/{receipt_id}/payments")
+		)
+
+	def getShopReceipt(self, client: SyncCacheClient, shop_id: int, receipt_id: int) -> Response:
+		"""
+		Retrieves a receipt, identified by a receipt id, from an Etsy shop
+		### query params:
+		- shop_id: The unique positive non-zero numeric ID for an Etsy Shop.
+		- receipt_id: The numeric ID for the receipt associated to this transaction.
+		"""
+		return self.request(
+			client, **self.args(endpoint=f"/v3/application/shops/{shop_id}/receipts/{receipt_id}")
 		)
 
 	def getShopReceipts(self, client: SyncCacheClient, query_params: QP_getShopReceipts) -> Response:
 		"""Requests the Shop Receipts from a specific Shop, unfiltered or filtered by receipt id range or offset, date, paid, and/or shipped purchases."""
-		return client.get(
+		return self.request(
+			client,
 			**self.args(
 				endpoint=f"/v3/application/shops/{query_params.shop_id}/receipts",
 				params=query_params.model_dump(exclude={"shop_id"}, exclude_unset=True),
-			)
+			),
 		)
 
 	def getShopPaymentAccountLedgerEntries(
 		self, client: SyncCacheClient, query_params: QP_getShopPaymentAccountLedgerEntries
 	) -> Response:
 		"""Get a Shop Payment Account Ledger's Entries"""
-		return client.get(
+		return self.request(
+			client,
 			**self.args(
 				endpoint=f"/v3/application/shops/{query_params.shop_id}/payment-account/ledger-entries",
 				params=query_params.model_dump(exclude={"shop_id"}, exclude_unset=True),
-			)
+			),
 		)
 
 	def getListingsByShop(self, client: SyncCacheClient, query_params: QP_getListingsByShop) -> Response:
 		"""Endpoint to list Listings that belong to a Shop."""
-		return client.get(
+		return self.request(
+			client,
 			**self.args(
 				endpoint=f"/v3/application/shops/{query_params.shop_id}/listings",
 				params=query_params.model_dump(exclude={"shop_id"}, exclude_unset=True),
-			)
+			),
+		)
+
+	def getListingInventory(self, client: SyncCacheClient, listing_id: int) -> Response:
+		"""
+		Retrieves the inventory record for a listing.
+		### query params:
+		- listing_id: The numeric ID for the listing.
+		"""
+		return self.request(client, **self.args(endpoint=f"/v3/application/listings/{listing_id}/inventory"))
+
+	def updateListingInventory(self, client: SyncCacheClient, listing_id: int, inventory: dict) -> Response:
+		"""
+		Updates the inventory for a listing identified by a listing ID. The update replaces all products
+		of the listing, so it is idempotent and retried like a GET request.
+		### query params:
+		- listing_id: The numeric ID for the listing.
+		"""
+		return self.request(
+			client,
+			method="PUT",
+			json=inventory,
+			**self.args(endpoint=f"/v3/application/listings/{listing_id}/inventory"),
 		)
 
 	# utils
@@ -324,24 +701,43 @@ class EtsyRESTv3:
 		- listing_id: The numeric ID for the listing associated to this transaction.
 		- listing_image_id: The numeric ID of the primary listing image for this transaction.
 		"""
-		return client.get(
+		return self.request(
+			client,
 			**self.args(
 				endpoint=f"/v3/application/listings/{listing_id}/images/{listing_image_id}",
 				extensions={"force_cache": True},
-			)
+			),
 		)
 
 
 class EtsyAPI:
-	def __init__(self, etsy_shop: EtsyShop):
+	def __init__(self, etsy_shop: EtsyShop, journal: SyncRunJournal | None = None):
 		language: str = etsy_shop.language or frappe.defaults.get_global_default("language")
-		self.rest = EtsyRESTv3(etsy_shop.get_auth_header(), language=language.split("-")[0])
-		self.client = SyncCacheClient()
+		self.rest = EtsyRESTv3(
+			etsy_shop.get_auth_header(),
+			language=language.split("-")[0],
+			circuit_breaker=CircuitBreaker(etsy_shop.name),
+		)
+		self.journal = journal
+		self._local = threading.local()
+
+	@property
+	def client(self) -> SyncCacheClient:
+		"""Client of the calling thread, the SQLite storage of the hishel cache cannot be shared between threads."""
+		if (client := getattr(self._local, "client", None)) is None:
+			client = self._local.client = SyncCacheClient()
+		return client
+
+	def phase(self, name: str):
+		"""Times a block in the sync run journal, if any."""
+		return self.journal.phase(name) if self.journal else nullcontext()
 
 	def getMe(self) -> Me:
 		"""Returns basic info for the user making the request."""
-		resp = self.rest.getMe(self.client).json()
-		return Me.model_validate(resp)
+		with self.phase("http"):
+			resp = self.rest.getMe(self.client).json()
+		with self.phase("validation"):
+			return Me.model_validate(resp)
 
 	def getUser(self, user_id: int) -> User:
 		"""
@@ -351,8 +747,10 @@ class EtsyAPI:
 		### query params:
 		- user_id: The numeric ID of a user.
 		"""
-		resp = self.rest.getUser(self.client, user_id).json()
-		return User.model_validate(resp)
+		with self.phase("http"):
+			resp = self.rest.getUser(self.client, user_id).json()
+		with self.phase("validation"):
+			return User.model_validate(resp)
 
 	def getUserAddress(self, user_address_id: int) -> Address:
 		"""
@@ -360,8 +758,10 @@ class EtsyAPI:
 		### query params:
 		- user_address_id: The numeric ID of the user's address.
 		"""
-		resp = self.rest.getUserAddress(self.client, user_address_id).json()
-		return Address.model_validate(resp)
+		with self.phase("http"):
+			resp = self.rest.getUserAddress(self.client, user_address_id).json()
+		with self.phase("validation"):
+			return Address.model_validate(resp)
 
 	def getShopPaymentByReceiptId(self, shop_id: int, receipt_id: int) -> tuple[int, list[Payment]]:
 		"""
@@ -370,42 +770,119 @@ class EtsyAPI:
 		- shop_id: The unique positive non-zero numeric ID for an Etsy Shop.
 		- receipt_id: The numeric ID for the receipt associated to this transaction.
 		"""
-		resp = self.rest.getShopPaymentByReceiptId(self.client, shop_id, receipt_id).json()
-		return (resp["count"], [Payment.model_validate(result) for result in resp["results"]])
+		with self.phase("http"):
+			resp = self.rest.getShopPaymentByReceiptId(self.client, shop_id, receipt_id).json()
+		with self.phase("validation"):
+			return (resp["count"], [Payment.model_validate(result) for result in resp["results"]])
+
+	def getShopPaymentsByReceiptIds(
+		self, shop_id: int, receipt_ids: list[int], max_workers: int = PAYMENT_FETCH_WORKERS
+	) -> dict[int, Payment]:
+		"""
+		Fetches the payments of `receipt_ids` concurrently, at most `max_workers` requests at a time.
+		Returns the payments by receipt ID; receipts whose payment could not be fetched are left out.
+		Each worker thread sends its requests through its own `client`.
+		"""
+		site, sites_path = frappe.local.site, frappe.local.sites_path
+
+		def fetch(receipt_id: int) -> list[Payment]:
+			# worker threads need a Frappe context for the metrics and the circuit breaker in Redis
+			frappe.init(site, sites_path=sites_path)
+			try:
+				resp = self.rest.getShopPaymentByReceiptId(self.client, shop_id, receipt_id).json()
+				return [Payment.model_validate(result) for result in resp["results"]]
+			finally:
+				frappe.destroy()
+
+		payments, failed = {}, []
+		with self.phase("payments"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+			for receipt_id, future in [(r, executor.submit(fetch, r)) for r in receipt_ids]:
+				try:
+					for payment in future.result():
+						payments[payment.receipt_id] = payment
+				except Exception:
+					failed.append(receipt_id)
+
+		if failed:
+			frappe.log_error(f"Etsy: Failed to fetch the payments of receipts {failed}")
+		return payments
+
+	def getShopReceipt(self, shop_id: int, receipt_id: int) -> ShopReceipt:
+		"""
+		Retrieves a receipt, identified by a receipt id, from an Etsy shop
+		### query params:
+		- shop_id: The unique positive non-zero numeric ID for an Etsy Shop.
+		- receipt_id: The numeric ID for the receipt associated to this transaction.
+		"""
+		with self.phase("http"):
+			resp = self.rest.getShopReceipt(self.client, shop_id, receipt_id).json()
+		with self.phase("validation"):
+			return ShopReceipt.model_validate(resp)
 
 	def getShopReceipts(self, query_params: QP_getShopReceipts) -> tuple[int, list[ShopReceipt]]:
 		"""Requests the Shop Receipts from a specific Shop, unfiltered or filtered by receipt id range or offset, date, paid, and/or shipped purchases."""
-		resp = self.rest.getShopReceipts(self.client, query_params).json()
-		return (resp["count"], [ShopReceipt.model_validate(result) for result in resp["results"]])
+		with self.phase("http"):
+			resp = self.rest.getShopReceipts(self.client, query_params).json()
+		with self.phase("validation"):
+			return (resp["count"], [ShopReceipt.model_validate(result) for result in resp["results"]])
 
 	def getShopPaymentAccountLedgerEntries(
 		self, query_params: QP_getShopPaymentAccountLedgerEntries
 	) -> tuple[int, list[LedgerEntry]]:
 		"""Get a Shop Payment Account Ledger's Entries"""
-		resp = self.rest.getShopPaymentAccountLedgerEntries(self.client, query_params).json()
-		return (resp["count"], [LedgerEntry.model_validate(result) for result in resp["results"]])
+		with self.phase("http"):
+			resp = self.rest.getShopPaymentAccountLedgerEntries(self.client, query_params).json()
+		with self.phase("validation"):
+			return (resp["count"], [LedgerEntry.model_validate(result) for result in resp["results"]])
 
 	def getListingsByShop(self, query_params: QP_getListingsByShop) -> tuple[int, list[Listing]]:
 		"""Endpoint to list Listings that belong to a Shop."""
-		resp = self.rest.getListingsByShop(self.client, query_params).json()
-		return (resp["count"], [Listing.model_validate(result) for result in resp["results"]])
+		with self.phase("http"):
+			resp = self.rest.getListingsByShop(self.client, query_params).json()
+		with self.phase("validation"):
+			return (resp["count"], [Listing.model_validate(result) for result in resp["results"]])
+
+	def getListingInventory(self, listing_id: int) -> Inventory:
+		"""Retrieves the inventory record for a listing."""
+		with self.phase("http"):
+			resp = self.rest.getListingInventory(self.client, listing_id).json()
+		with self.phase("validation"):
+			return Inventory.model_validate({"listing": None, **resp})
+
+	def updateListingInventory(self, listing_id: int, inventory: dict) -> Inventory:
+		"""Replaces the products of a listing with those of `inventory`, see `inventory_update`."""
+		with self.phase("http"):
+			resp = self.rest.updateListingInventory(self.client, listing_id, inventory)
+			resp.raise_for_status()
+		with self.phase("validation"):
+			return Inventory.model_validate({"listing": None, **resp.json()})
 
 
 ##########################################################################################################################################################
 
 
 def synchronise_receipts():
-	"""This function will be regularly executed by the Scheduler to synchronise Sales Orders."""
+	"""
+	This function will be regularly executed by the Scheduler to synchronise Sales Orders.
+	Every run polls only the shops that are due according to their `PollSchedule`.
+	"""
+	from .webhooks import safety_poll_due
 
 	shop_list = frappe.get_all("Etsy Shop", fields=["name", "status"])
 
 	for shop in shop_list:
-		if shop.status != "Connected":
+		if shop.status != "Connected" or CircuitBreaker(shop.name).is_open():
+			continue
+		schedule = PollSchedule.for_shop(shop.name)
+		if not schedule.is_due():
+			continue
+		if not safety_poll_due(shop.name):  # orders arrive by webhook
 			continue
 		try:
 			etsy_shop: EtsyShop = frappe.get_doc("Etsy Shop", shop.name)
-			etsy_shop.import_receipts(abort_on_exist=True)
+			journal = etsy_shop.import_receipts(abort_on_exist=True)
 			frappe.db.commit()
+			schedule.record_poll(journal.counts["created"])
 		except Exception:
 			frappe.db.rollback()
 			frappe.log_error(f"Etsy: Failed to sync receipts for shop {shop.name}")
@@ -417,7 +894,7 @@ def synchronise_listings():
 	shop_list = frappe.get_all("Etsy Shop", fields=["name", "status"])
 
 	for shop in shop_list:
-		if shop.status != "Connected":
+		if shop.status != "Connected" or CircuitBreaker(shop.name).is_open():
 			continue
 		try:
 			etsy_shop: EtsyShop = frappe.get_doc("Etsy Shop", shop.name)
@@ -426,3 +903,44 @@ def synchronise_listings():
 		except Exception:
 			frappe.db.rollback()
 			frappe.log_error(f"Etsy: Failed to sync listings for shop {shop.name}")
+
+
+def synchronise_receipt_changes():
+	"""
+	This function will be executed hourly by the Scheduler to apply changed receipts
+	to their Sales Orders and book their refunds as Credit Notes.
+	"""
+	if not frappe.db.get_single_value("Etsy Settings", "etsy_enabled"):
+		return
+
+	shop_list = frappe.get_all("Etsy Shop", fields=["name", "status"])
+
+	for shop in shop_list:
+		if shop.status != "Connected" or CircuitBreaker(shop.name).is_open():
+			continue
+		try:
+			etsy_shop: EtsyShop = frappe.get_doc("Etsy Shop", shop.name)
+			etsy_shop.import_receipt_changes()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(f"Etsy: Failed to sync receipt changes for shop {shop.name}")
+
+
+def synchronise_ledger():
+	"""This function will be executed daily by the Scheduler to book the payment account ledger."""
+	if not frappe.db.get_single_value("Etsy Settings", "etsy_enabled"):
+		return
+
+	shop_list = frappe.get_all(
+		"Etsy Shop", filters={"ledger_start_date": ("is", "set")}, fields=["name", "status"]
+	)
+
+	for shop in shop_list:
+		if shop.status != "Connected" or CircuitBreaker(shop.name).is_open():
+			continue
+		try:
+			etsy_shop: EtsyShop = frappe.get_doc("Etsy Shop", shop.name)
+			etsy_shop.import_ledger()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(f"Etsy: Failed to sync ledger for shop {shop.name}")
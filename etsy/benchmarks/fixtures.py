@@ -0,0 +1,482 @@
+"""
+Seeded synthetic Etsy shop data for benchmarks and load tests.
+
+Every record is derived from `(seed, index)` alone, so the stand-in server can
+serve any page of a 100k record shop without generating or holding the records before it,
+and `write_jsonl` streams datasets of millions of records with constant memory.
+`id_offset` shifts all IDs, so repeated runs against the same site create new documents.
+
+### Usage example:
+```
+python -m etsy.benchmarks.fixtures receipts 1000000 receipts.jsonl --seed 42
+```
+"""
+
+import argparse
+import itertools
+import json
+import random
+from collections.abc import Iterator
+
+from pydantic import BaseModel
+
+SHOP_ID = 10000001
+SELLER_USER_ID = 20000001
+LEDGER_ID = 30000001
+BASE_TIMESTAMP = 1735689600  # 2025-01-01 00:00:00 UTC
+RECEIPT_INTERVAL = 600  # seconds between two receipts
+COUNTRIES = ("DE", "AT", "FR", "NL", "US", "GB")
+PROPERTIES = (
+	(100, "Size", ("XS", "S", "M", "L", "XL", "XXL")),
+	(200, "Color", ("Black", "White", "Red", "Blue", "Green", "Sand")),
+	(513, "Material", ("Cotton", "Linen", "Wool")),
+)
+KINDS = ("receipts", "listings", "payments", "ledger_entries")
+
+
+class Distributions(BaseModel):
+	"""Weights (`value: weight`) and ratios the synthetic shop is drawn from."""
+
+	transactions_per_receipt: dict[int, float] = {1: 0.70, 2: 0.18, 3: 0.08, 8: 0.04}
+	quantity_per_transaction: dict[int, float] = {1: 0.85, 2: 0.12, 5: 0.03}
+	variants_per_listing: dict[int, float] = {1: 0.50, 3: 0.20, 12: 0.20, 36: 0.10}
+	tags_per_listing: dict[int, float] = {5: 0.20, 10: 0.30, 13: 0.50}
+	currencies: dict[str, float] = {"EUR": 0.80, "USD": 0.15, "GBP": 0.05}
+	repeat_buyer_ratio: float = 0.30
+	refund_ratio: float = 0.03  # half of them full refunds
+	digital_ratio: float = 0.10
+	shipped_ratio: float = 0.80
+	gift_ratio: float = 0.05
+	products: int | None = None  # distinct products in receipts, defaults to `count // 20`
+
+
+def money(amount: int, currency: str = "EUR") -> dict:
+	return {"amount": amount, "divisor": 100, "currency_code": currency}
+
+
+def weighted(rng: random.Random, weights: dict) -> int | str:
+	return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+class SyntheticShop:
+	"""
+	A shop with `count` receipts and `count` listings, newest receipt first.
+	Payments and ledger entries are derived from the receipts.
+	"""
+
+	def __init__(
+		self, count: int, seed: int = 0, id_offset: int = 0, distributions: Distributions | dict | None = None
+	):
+		self.count = count
+		self.seed = seed
+		self.id_offset = id_offset
+		self.distributions = Distributions.model_validate(distributions or {})
+		self.products = max(50, self.distributions.products or count // 20)
+
+	def rng(self, kind: str, index: int) -> random.Random:
+		return random.Random(f"{self.seed}:{kind}:{index}")
+
+	def created(self, index: int) -> int:
+		return BASE_TIMESTAMP + (self.count - index) * RECEIPT_INTERVAL
+
+	def buyer_user_id(self, rng: random.Random, index: int) -> int:
+		# repeat buyers re-use the ID of an older (higher index) receipt's buyer
+		if index < self.count - 1 and rng.random() < self.distributions.repeat_buyer_ratio:
+			index = rng.randrange(index + 1, self.count)
+		return 40_000_000 + self.id_offset + index
+
+	### receipts
+	def receipt_index(self, receipt_id: int) -> int:
+		"""Inverse of the `receipt_id` of `receipt`."""
+		return receipt_id - 3_000_000_000 - self.id_offset
+
+	def receipt(self, index: int) -> dict:
+		"""Returns receipt `index` as returned by `getShopReceipts`."""
+		d = self.distributions
+		rng = self.rng("receipt", index)
+		receipt_id = 3_000_000_000 + self.id_offset + index
+		buyer_user_id = self.buyer_user_id(rng, index)
+		currency = weighted(rng, d.currencies)
+		created = self.created(index)
+		is_shipped = rng.random() < d.shipped_ratio
+
+		transactions = []
+		for t in range(weighted(rng, d.transactions_per_receipt)):
+			product = self.id_offset + rng.randrange(self.products)
+			is_digital = self.rng("product", product).random() < d.digital_ratio
+			transactions.append(
+				{
+					"transaction_id": receipt_id * 10 + t,
+					"title": f"Synthetic Product {product}, handmade",
+					"description": "Synthetic product",
+					"seller_user_id": SELLER_USER_ID,
+					"buyer_user_id": buyer_user_id,
+					"create_timestamp": created,
+					"created_timestamp": created,
+					"paid_timestamp": created,
+					"shipped_timestamp": created + 86400 if is_shipped else None,
+					"quantity": weighted(rng, d.quantity_per_transaction),
+					"listing_image_id": 80_000_000 + product,
+					"receipt_id": receipt_id,
+					"is_digital": is_digital,
+					"file_data": "",
+					"listing_id": 60_000_000 + product,
+					"transaction_type": "listing",
+					"product_id": 70_000_000 + product,
+					"sku": f"SKU-{product}",
+					"price": money(500 + (product % 40) * 125, currency),
+					"shipping_cost": money(0, currency),
+					"variations": [
+						{
+							"property_id": PROPERTIES[0][0],
+							"value_id": None,
+							"formatted_name": PROPERTIES[0][1],
+							"formatted_value": PROPERTIES[0][2][product % len(PROPERTIES[0][2])],
+						}
+					],
+					"product_data": [],
+					"shipping_profile_id": None,
+					"min_processing_days": 1,
+					"max_processing_days": 3,
+					"shipping_method": None,
+					"shipping_upgrade": None,
+					"expected_ship_date": created + 3 * 86400,
+					"buyer_coupon": 0.0,
+					"shop_coupon": 0.0,
+				}
+			)
+
+		total_price = sum(t["price"]["amount"] * t["quantity"] for t in transactions)
+		shipping = 0 if all(t["is_digital"] for t in transactions) else 495
+		is_gift = rng.random() < d.gift_ratio
+		gift_wrap = 300 if is_gift else 0
+		grandtotal = total_price + shipping + gift_wrap
+
+		refunds, status = [], "completed" if is_shipped else "paid"
+		if rng.random() < d.refund_ratio:
+			full = rng.random() < 0.5
+			status = "fully refunded" if full else "partially refunded"
+			refunds.append(
+				{
+					"amount": money(grandtotal if full else grandtotal // 4, currency),
+					"created_timestamp": created + 5 * 86400,
+					"reason": "Synthetic refund",
+					"note_from_issuer": None,
+					"status": "OK",
+				}
+			)
+
+		return {
+			"receipt_id": receipt_id,
+			"receipt_type": 0,
+			"seller_user_id": SELLER_USER_ID,
+			"seller_email": "seller@example.com",
+			"buyer_user_id": buyer_user_id,
+			"buyer_email": f"buyer{buyer_user_id}@example.com",
+			"name": f"Buyer {buyer_user_id}",
+			"first_line": f"{buyer_user_id % 200 + 1} Synthetic Street",
+			"second_line": None,
+			"city": "Berlin",
+			"state": None,
+			"zip": f"{10000 + buyer_user_id % 90000}",
+			"status": status,
+			"formatted_address": "",
+			"country_iso": COUNTRIES[buyer_user_id % len(COUNTRIES)],
+			"payment_method": "cc",
+			"payment_email": None,
+			"message_from_seller": None,
+			"message_from_buyer": None,
+			"message_from_payment": None,
+			"is_paid": True,
+			"is_shipped": is_shipped,
+			"create_timestamp": created,
+			"created_timestamp": created,
+			"update_timestamp": created + (5 * 86400 if refunds else 0),
+			"updated_timestamp": created + (5 * 86400 if refunds else 0),
+			"is_gift": is_gift,
+			"gift_message": "Happy birthday!" if is_gift else None,
+			"grandtotal": money(grandtotal, currency),
+			"subtotal": money(total_price, currency),
+			"total_price": money(total_price, currency),
+			"total_shipping_cost": money(shipping, currency),
+			"total_tax_cost": money(0, currency),
+			"total_vat_cost": money(0, currency),
+			"discount_amt": money(0, currency),
+			"gift_wrap_price": money(gift_wrap, currency),
+			"shipments": [],
+			"transactions": transactions,
+			"refunds": refunds,
+		}
+
+	def payment(self, index: int, receipt: dict | None = None) -> dict:
+		"""Returns the payment of receipt `index` as returned by `getShopPaymentByReceiptId`."""
+		receipt = receipt or self.receipt(index)
+		currency = receipt["grandtotal"]["currency_code"]
+		gross = receipt["grandtotal"]["amount"]
+		fees = round(gross * 0.04) + 30  # processing fee
+		refunded = sum(r["amount"]["amount"] for r in receipt["refunds"])
+		adjusted_fees = round(fees * (gross - refunded) / gross) if gross else 0
+		created = receipt["created_timestamp"]
+
+		return {
+			"payment_id": 5_000_000_000 + self.id_offset + index,
+			"buyer_user_id": receipt["buyer_user_id"],
+			"shop_id": SHOP_ID,
+			"receipt_id": receipt["receipt_id"],
+			"amount_gross": money(gross, currency),
+			"amount_fees": money(fees, currency),
+			"amount_net": money(gross - fees, currency),
+			"posted_gross": money(gross, currency),
+			"posted_fees": money(fees, currency),
+			"posted_net": money(gross - fees, currency),
+			"adjusted_gross": money(gross - refunded, currency) if refunded else None,
+			"adjusted_fees": money(adjusted_fees, currency) if refunded else None,
+			"adjusted_net": money(gross - refunded - adjusted_fees, currency) if refunded else None,
+			"currency": currency,
+			"shop_currency": currency,
+			"buyer_currency": currency,
+			"shipping_user_id": receipt["buyer_user_id"],
+			"shipping_address_id": 6_000_000_000 + self.id_offset + index,
+			"billing_address_id": 6_000_000_000 + self.id_offset + index,
+			"status": "settled",
+			"shipped_timestamp": created + 86400 if receipt["is_shipped"] else None,
+			"create_timestamp": created,
+			"created_timestamp": created,
+			"update_timestamp": receipt["updated_timestamp"],
+			"updated_timestamp": receipt["updated_timestamp"],
+			"payment_adjustments": [],
+		}
+
+	def ledger_entries(self, index: int, receipt: dict | None = None) -> list[dict]:
+		"""
+		Returns the ledger entries (sale, fees and refunds) of receipt `index` as returned by
+		`getShopPaymentAccountLedgerEntries`. `balance` only covers this receipt, see `iter_ledger_entries`.
+		"""
+		receipt = receipt or self.receipt(index)
+		payment = self.payment(index, receipt)
+		created = receipt["created_timestamp"]
+		transaction_fee = round(receipt["total_price"]["amount"] * 0.065)
+
+		movements = [
+			("payment", "Payment", payment["amount_gross"]["amount"], created),
+			("transaction", "Transaction fee", -transaction_fee, created),
+			("processing_fee", "Processing fee", -payment["amount_fees"]["amount"], created),
+		]
+		movements += [
+			("refund", "Refund", -refund["amount"]["amount"], refund["created_timestamp"])
+			for refund in receipt["refunds"]
+		]
+
+		entries, balance = [], 0
+		for n, (ledger_type, description, amount, timestamp) in enumerate(movements):
+			balance += amount
+			entries.append(
+				{
+					"entry_id": 7_000_000_000 + (self.id_offset + index) * 10 + n,
+					"ledger_id": LEDGER_ID,
+					"sequence_number": (self.count - index) * 10 + n,
+					"amount": amount,
+					"currency": payment["currency"],
+					"description": description,
+					"balance": balance,
+					"create_date": timestamp,
+					"created_timestamp": timestamp,
+					"ledger_type": ledger_type,
+					"reference_type": "receipt",
+					"reference_id": receipt["receipt_id"],
+					"payment_adjustments": [],
+				}
+			)
+		return entries
+
+	def ledger_entries_between(self, min_created: int, max_created: int) -> list[dict]:
+		"""Ledger entries created between both timestamps (inclusive), as filtered by the ledger endpoint."""
+		refund_lag = 5 * 86400  # see `receipt`
+		first = max(0, self.count - (max_created - BASE_TIMESTAMP) // RECEIPT_INTERVAL)
+		last = min(
+			self.count - 1, self.count + (BASE_TIMESTAMP - min_created + refund_lag) // RECEIPT_INTERVAL
+		)
+		return [
+			entry
+			for index in range(first, last + 1)
+			for entry in self.ledger_entries(index)
+			if min_created <= entry["created_timestamp"] <= max_created
+		]
+
+	### listings
+	def listing(self, index: int, state: str = "active") -> dict:
+		"""Returns listing `index` as returned by `getListingsByShop` with Inventory and Images."""
+		d = self.distributions
+		rng = self.rng("listing", index)
+		listing_id = 60_000_000 + self.id_offset + index
+		created = self.created(index)
+		variants = weighted(rng, d.variants_per_listing)
+		currency = weighted(rng, d.currencies)
+		is_digital = rng.random() < d.digital_ratio
+
+		# enough properties for the number of variants, e.g. Size x Color for 12 variants
+		properties, combinations = [], 1
+		for prop in PROPERTIES:
+			if combinations >= variants:
+				break
+			properties.append(prop)
+			combinations *= len(prop[2])
+		values = list(itertools.islice(itertools.product(*[p[2] for p in properties]), variants))
+
+		products = []
+		for v, combination in enumerate(values):
+			products.append(
+				{
+					"product_id": 70_000_000 + (self.id_offset + index) * 100 + v,
+					"sku": f"SKU-{listing_id}-{v}",
+					"is_deleted": False,
+					"offerings": [
+						{
+							"offering_id": 90_000_000 + (self.id_offset + index) * 100 + v,
+							"quantity": rng.randrange(0, 20),
+							"is_enabled": True,
+							"is_deleted": False,
+							"price": money(1000 + v * 250, currency),
+							"readiness_state_id": None,
+						}
+					],
+					"property_values": [
+						{
+							"property_id": property_id,
+							"property_name": name,
+							"scale_id": None,
+							"scale_name": None,
+							"value_ids": [options.index(value) + 1],
+							"values": [value],
+						}
+						for (property_id, name, options), value in zip(properties, combination, strict=True)
+					],
+				}
+			)
+
+		property_ids = [p[0] for p in properties]
+		return {
+			"listing_id": listing_id,
+			"user_id": SELLER_USER_ID,
+			"shop_id": SHOP_ID,
+			"title": f"Synthetic Listing {index} | {PROPERTIES[1][2][index % 6]}, handmade gift",
+			"description": "Synthetic listing",
+			"state": state,
+			"creation_timestamp": created,
+			"created_timestamp": created,
+			"ending_timestamp": created + 120 * 86400,
+			"original_creation_timestamp": created,
+			"last_modified_timestamp": created,
+			"updated_timestamp": created,
+			"state_timestamp": created,
+			"quantity": sum(p["offerings"][0]["quantity"] for p in products),
+			"shop_section_id": None,
+			"featured_rank": -1,
+			"url": f"https://www.etsy.com/listing/{listing_id}",
+			"num_favorers": rng.randrange(0, 500),
+			"non_taxable": False,
+			"is_taxable": True,
+			"is_customizable": False,
+			"is_personalizable": False,
+			"personalization_is_required": False,
+			"personalization_char_count_max": None,
+			"personalization_instructions": None,
+			"listing_type": "download" if is_digital else "physical",
+			"tags": [f"synthetic tag {t}" for t in range(weighted(rng, d.tags_per_listing))],
+			"materials": [],
+			"shipping_profile_id": None,
+			"return_policy_id": None,
+			"processing_min": 1,
+			"processing_max": 3,
+			"who_made": "i_did",
+			"when_made": "made_to_order",
+			"is_supply": False,
+			"item_weight": None,
+			"item_weight_unit": None,
+			"item_length": None,
+			"item_width": None,
+			"item_height": None,
+			"item_dimensions_unit": None,
+			"is_private": False,
+			"style": [],
+			"file_data": None,
+			"has_variations": variants > 1,
+			"should_auto_renew": True,
+			"language": "de",
+			"price": money(1000, currency),
+			"taxonomy_id": None,
+			"readiness_state_id": None,
+			"suggested_title": None,
+			"shipping_profile": None,
+			"user": None,
+			"shop": None,
+			"images": [
+				{"listing_image_id": 80_000_000 + index, "url_170x135": f"https://example.com/{index}.jpg"}
+			],
+			"videos": None,
+			"inventory": {
+				"products": products,
+				"price_on_property": property_ids,
+				"quantity_on_property": property_ids,
+				"sku_on_property": property_ids,
+				"readiness_state_on_property": [],
+				"listing": None,
+			},
+			"production_partners": [],
+			"skus": [p["sku"] for p in products],
+			"translations": None,
+			"views": rng.randrange(0, 5000),
+		}
+
+	### streams
+	def iter_receipts(self) -> Iterator[dict]:
+		return map(self.receipt, range(self.count))
+
+	def iter_listings(self) -> Iterator[dict]:
+		return map(self.listing, range(self.count))
+
+	def iter_payments(self) -> Iterator[dict]:
+		return map(self.payment, range(self.count))
+
+	def iter_ledger_entries(self) -> Iterator[dict]:
+		"""Ledger entries of all receipts, oldest first, with a running `balance`."""
+		balance = 0
+		for index in reversed(range(self.count)):
+			for entry in self.ledger_entries(index):
+				balance += entry["amount"]
+				entry["balance"] = balance
+				yield entry
+
+
+def write_jsonl(
+	path: str,
+	kind: str,
+	count: int,
+	seed: int = 0,
+	id_offset: int = 0,
+	distributions: dict | None = None,
+) -> int:
+	"""Streams the `kind` records of a `count` receipt/listing shop to `path` as JSON lines."""
+	if kind not in KINDS:
+		raise ValueError(f"'kind' must be one of: {KINDS}")
+
+	shop = SyntheticShop(int(count), int(seed), int(id_offset), distributions)
+	written = 0
+	with open(path, "w") as f:
+		for record in getattr(shop, f"iter_{kind}")():
+			f.write(json.dumps(record, separators=(",", ":")))
+			f.write("\n")
+			written += 1
+	return written
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Write synthetic Etsy API records as JSON lines.")
+	parser.add_argument("kind", choices=KINDS)
+	parser.add_argument("count", type=int, help="number of receipts/listings")
+	parser.add_argument("path")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--id-offset", type=int, default=0)
+	parser.add_argument("--distributions", type=json.loads, default=None, help="JSON, see `Distributions`")
+	args = parser.parse_args()
+	print(write_jsonl(args.path, args.kind, args.count, args.seed, args.id_offset, args.distributions))
@@ -0,0 +1,114 @@
+"""
+End-to-end import benchmarks against the local Etsy stand-in server.
+
+Run them on a throwaway site, the imported documents are kept:
+```
+bench --site bench.localhost execute etsy.benchmarks.imports.run \
+    --kwargs "{'template_shop': 'My Shop', 'kind': 'receipts', 'sizes': [1000, 10000]}"
+```
+"""
+
+import datetime
+import json
+import resource
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe import _
+
+from etsy.benchmarks import fixtures
+from etsy.benchmarks.server import EtsyStandIn
+from etsy.query_recorder import QueryRecorder
+
+KINDS = ("receipts", "listings", "ledger")
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def peak_rss_mb() -> float:
+	"""Peak resident set size of this process (Linux reports KiB)."""
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def create_benchmark_shop(template_shop: str, label: str) -> "frappe.model.document.Document":
+	"""Copies the ERP settings of `template_shop` into a new, connected Etsy Shop with a dummy token."""
+	shop = frappe.copy_doc(frappe.get_doc("Etsy Shop", template_shop))
+	shop.shop_name = f"Benchmark {label}"
+	shop.client_id = shop.client_secret = shop.access_token = shop.refresh_token = "benchmark"
+	shop.status = "Connected"
+	shop.shop_id = str(fixtures.SHOP_ID)
+	shop.user_id = str(fixtures.SELLER_USER_ID)
+	shop.expires_in_datetime = frappe.utils.add_days(frappe.utils.now_datetime(), 1)
+	shop.ledger_start_date = datetime.date.fromtimestamp(fixtures.BASE_TIMESTAMP)
+	shop.ledger_imported_until = None
+	shop.insert(ignore_permissions=True)
+	frappe.db.commit()
+	return shop
+
+
+def run_once(
+	template_shop: str, kind: str, size: int, seed: int = 0, distributions: dict | None = None
+) -> dict:
+	id_offset = int(time.time()) * 1_000_000  # fresh IDs for every run
+	shop = create_benchmark_shop(template_shop, f"{kind} {size} {id_offset}")
+
+	with (
+		EtsyStandIn(size, seed, id_offset, distributions) as stand_in,
+		patch.dict(frappe.conf, {"etsy_api_base_url": stand_in.url}),
+		QueryRecorder() as recorder,
+	):
+		start = time.perf_counter()
+		if kind == "receipts":
+			journal = shop.import_receipts()
+		elif kind == "listings":
+			journal = shop.import_listings(include_items=1)
+		else:
+			journal = shop.import_ledger()
+		elapsed = time.perf_counter() - start
+
+	records = sum(journal.counts.values())
+	return {
+		"kind": kind,
+		"size": size,
+		"seconds": round(elapsed, 3),
+		"records_per_second": round(records / elapsed, 2) if elapsed else None,
+		"queries_per_record": round(recorder.total / records, 1) if records else None,
+		"query_summary": recorder.summary(records),
+		"peak_rss_mb": round(peak_rss_mb(), 1),
+		"failed": journal.counts["failed"],
+		"sync_run": journal.sync_run.name if journal.sync_run else None,
+	}
+
+
+def run(
+	template_shop: str,
+	kind: str = "receipts",
+	sizes: list[int] | tuple[int, ...] = DEFAULT_SIZES,
+	seed: int = 0,
+	distributions: dict | None = None,
+	output: str | None = None,
+) -> list[dict]:
+	"""
+	Imports `sizes` synthetic receipts, listings or the ledger of `sizes` receipts from the stand-in server and reports
+	throughput, SQL queries per record and peak memory for every size.
+	`distributions` overrides the defaults of `fixtures.Distributions`.
+	Results are printed and, if `output` is given, written there as JSON.
+	"""
+	if kind not in KINDS:
+		frappe.throw(_("'kind' must be one of: {0}").format(KINDS))
+
+	results = []
+	for size in sizes:
+		result = run_once(template_shop, kind, int(size), seed, distributions)
+		results.append(result)
+		print(
+			f"{kind:>9} {size:>7}: {result['records_per_second']:>8} records/s, "
+			f"{result['queries_per_record']:>6} queries/record, {result['peak_rss_mb']:>8} MB peak RSS, "
+			f"{result['failed']} failed"
+		)
+
+	if output:
+		with open(output, "w") as f:
+			json.dump(results, f, indent=1)
+
+	return results
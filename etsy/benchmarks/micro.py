@@ -0,0 +1,161 @@
+"""
+Micro-benchmarks for the pure-Python hot paths of an import.
+
+Timings are stored relative to a fixed calibration loop measured in the same run,
+so the baselines in `baselines.json` can be compared across machines (e.g. laptop and CI).
+
+### Usage example:
+```
+bench --site test_site execute etsy.benchmarks.micro.check
+bench --site test_site execute etsy.benchmarks.micro.check --kwargs "{'update_baseline': True}"
+```
+"""
+
+import json
+import os
+import timeit
+from collections.abc import Callable
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = 1.5  # fail if a case got slower than 1.5x its baseline
+REPEAT = 7
+TARGET_SECONDS = 0.2  # per repetition
+
+
+class MicroBenchmarkRegression(Exception):
+	"""Raised by `check` if a case is slower than its baseline by more than the threshold."""
+
+
+### Cases
+# Each case returns the callable to time, so setup is not measured.
+def case_calibration() -> Callable:
+	return lambda: sum(i * i for i in range(1000))
+
+
+def case_receipt_model_validate() -> Callable:
+	from etsy.benchmarks.fixtures import SyntheticShop
+	from etsy.datastruct import ShopReceipt
+
+	payload = SyntheticShop(100, seed=1, distributions={"transactions_per_receipt": {3: 1}}).receipt(0)
+	return lambda: ShopReceipt.model_validate(payload)
+
+
+def case_listing_model_validate() -> Callable:
+	from etsy.benchmarks.fixtures import SyntheticShop
+	from etsy.datastruct import Listing
+
+	payload = SyntheticShop(100, seed=1, distributions={"variants_per_listing": {12: 1}}).listing(0)
+	return lambda: Listing.model_validate(payload)
+
+
+def case_monetary_amount_arithmetic() -> Callable:
+	from etsy.datastruct import MonetaryAmount
+
+	amounts = [
+		MonetaryAmount(amount=100 + i, divisor=100 if i % 2 else 1000, currency_code="EUR") for i in range(20)
+	]
+
+	def run():
+		total = MonetaryAmount.zero()
+		for amount in amounts:
+			total = total + amount * 2 - amount
+		return total > amounts[0]
+
+	return run
+
+
+def case_rate_tag() -> Callable:
+	from etsy.etsy.doctype.etsy_listing.etsy_listing import rate_tag
+
+	tags = ["handmade gift", "a", "linen dress summer", "BOHO", "personalized necklace", "x  y", "wall art"]
+	return lambda: [rate_tag(tag) for tag in tags]
+
+
+def case_short_title() -> Callable:
+	from etsy.etsy.doctype.etsy_shop.etsy_shop import short_title
+
+	titles = [
+		"Linen Dress, Summer Dress; Boho | Handmade",
+		"Personalized &quot;Name&quot; Necklace • Gold - Gift for her",
+		"Simple Title",
+	]
+	return lambda: [short_title(title) for title in titles]
+
+
+def case_rest_args() -> Callable:
+	from etsy.api import EtsyRESTv3
+
+	rest = EtsyRESTv3({"x-api-key": "key", "Authorization": "Bearer token"}, base_url="https://api.etsy.com/")
+	params = {"limit": 100, "offset": 200, "min_created": None, "max_created": 1735689600}
+	return lambda: rest.args(
+		"/v3/application/shops/1/receipts", params=params, extensions={"force_cache": True}
+	)
+
+
+CASES = {
+	"receipt_model_validate": case_receipt_model_validate,
+	"listing_model_validate": case_listing_model_validate,
+	"monetary_amount_arithmetic": case_monetary_amount_arithmetic,
+	"rate_tag": case_rate_tag,
+	"short_title": case_short_title,
+	"rest_args": case_rest_args,
+}
+
+
+### Measuring
+def measure(func: Callable) -> float:
+	"""Returns the best seconds per call of `func` over `REPEAT` repetitions of about `TARGET_SECONDS`."""
+	timer = timeit.Timer(func)
+	number, elapsed = timer.autorange()
+	number = max(1, int(number * TARGET_SECONDS / elapsed)) if elapsed else number
+	return min(timer.repeat(repeat=REPEAT, number=number)) / number
+
+
+def run(cases: list[str] | None = None) -> dict[str, dict]:
+	"""Measures `cases` (default: all) and returns seconds per call and the time relative to the calibration."""
+	timings = {name: measure(CASES[name]()) for name in cases or CASES}
+	calibration = min(measure(case_calibration()) for _ in range(3))
+	return {
+		name: {"us_per_call": round(seconds * 1e6, 3), "relative": round(seconds / calibration, 4)}
+		for name, seconds in timings.items()
+	}
+
+
+def compare(results: dict[str, dict], baselines: dict[str, float], threshold: float) -> list[str]:
+	"""Returns a message for every case that is slower than `threshold` times its baseline."""
+	return [
+		f"{name}: {result['relative'] / baselines[name]:.2f}x baseline ({result['us_per_call']} µs per call)"
+		for name, result in results.items()
+		if name in baselines and result["relative"] > baselines[name] * threshold
+	]
+
+
+def load_baselines() -> dict[str, float]:
+	if not os.path.exists(BASELINE_FILE):
+		return {}
+	with open(BASELINE_FILE) as f:
+		return json.load(f)
+
+
+def check(threshold: float = DEFAULT_THRESHOLD, update_baseline: bool = False) -> dict[str, dict]:
+	"""
+	Runs all cases and raises `MicroBenchmarkRegression` if any is slower than `threshold` times its baseline.
+	With `update_baseline`, the current results are stored as the new baselines instead.
+	"""
+	results = run()
+	baselines = load_baselines()
+
+	for name, result in results.items():
+		ratio = f"{result['relative'] / baselines[name]:.2f}x" if name in baselines else "new"
+		print(f"{name:>28}: {result['us_per_call']:>10} µs per call, {ratio} baseline")
+
+	if update_baseline:
+		with open(BASELINE_FILE, "w") as f:
+			json.dump({name: result["relative"] for name, result in results.items()}, f, indent=1)
+			f.write("\n")
+		return results
+
+	if regressions := compare(results, baselines, float(threshold)):
+		raise MicroBenchmarkRegression("Micro-benchmark regressions:\n" + "\n".join(regressions))
+
+	return results
@@ -0,0 +1,159 @@
+"""
+Local stand-in for the Etsy Open API v3 endpoints used by the app.
+
+Serves a `fixtures.SyntheticShop` with a fixed number of receipts and listings.
+Point the app at it with the site config `etsy_api_base_url`, e.g. `http://127.0.0.1:8765/`.
+"""
+
+import json
+import multiprocessing
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from etsy.benchmarks import fixtures
+
+ROUTES = (
+	("me", re.compile(r"^/v3/application/users/me$")),
+	("receipts", re.compile(r"^/v3/application/shops/\d+/receipts$")),
+	("receipt", re.compile(r"^/v3/application/shops/\d+/receipts/(\d+)$")),
+	("payments", re.compile(r"^/v3/application/shops/\d+/receipts/(\d+)/payments$")),
+	("listings", re.compile(r"^/v3/application/shops/\d+/listings$")),
+	("ledger_entries", re.compile(r"^/v3/application/shops/\d+/payment-account/ledger-entries$")),
+	("listing_image", re.compile(r"^/v3/application/listings/(\d+)/images/(\d+)$")),
+)
+
+
+class EtsyStandInHandler(BaseHTTPRequestHandler):
+	server: "EtsyStandInServer"
+
+	def do_GET(self):
+		url = urlsplit(self.path)
+		query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+		for route, pattern in ROUTES:
+			if match := pattern.match(url.path):
+				return self.send_json(getattr(self, route)(query, *match.groups()))
+
+		self.send_json({"error": f"Unknown endpoint {url.path}"}, status=404)
+
+	def send_json(self, payload: dict, status: int = 200):
+		body = json.dumps(payload).encode()
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass  # keep benchmark output clean
+
+	def page(self, query: dict) -> range:
+		offset, limit = int(query.get("offset", 0)), int(query.get("limit", 25))
+		count = self.server.shop.count
+		return range(min(offset, count), min(offset + limit, count))
+
+	### endpoints
+	def me(self, query: dict) -> dict:
+		return {"user_id": fixtures.SELLER_USER_ID, "shop_id": fixtures.SHOP_ID}
+
+	def receipts(self, query: dict) -> dict:
+		shop = self.server.shop
+		return {"count": shop.count, "results": [shop.receipt(i) for i in self.page(query)]}
+
+	def receipt(self, query: dict, receipt_id: str) -> dict:
+		shop = self.server.shop
+		index = shop.receipt_index(int(receipt_id))
+		if not 0 <= index < shop.count:
+			return {"error": f"Receipt {receipt_id} not found"}
+		return shop.receipt(index)
+
+	def payments(self, query: dict, receipt_id: str) -> dict:
+		shop = self.server.shop
+		index = shop.receipt_index(int(receipt_id))
+		if not 0 <= index < shop.count:
+			return {"count": 0, "results": []}
+		return {"count": 1, "results": [shop.payment(index)]}
+
+	def listings(self, query: dict) -> dict:
+		shop = self.server.shop
+		if query.get("state", "active") != "active":  # all synthetic listings are active
+			return {"count": 0, "results": []}
+		return {"count": shop.count, "results": [shop.listing(i) for i in self.page(query)]}
+
+	def ledger_entries(self, query: dict) -> dict:
+		window = (int(query["min_created"]), int(query["max_created"]))
+		with self.server.lock:  # pages of the same window are served from one list
+			if self.server.ledger_window != window:
+				self.server.ledger_window = window
+				self.server.ledger = self.server.shop.ledger_entries_between(*window)
+			entries = self.server.ledger
+
+		offset, limit = int(query.get("offset", 0)), int(query.get("limit", 25))
+		return {"count": len(entries), "results": entries[offset : offset + limit]}
+
+	def listing_image(self, query: dict, listing_id: str, listing_image_id: str) -> dict:
+		return {
+			"listing_id": int(listing_id),
+			"listing_image_id": int(listing_image_id),
+			"url_170x135": f"https://example.com/{listing_image_id}.jpg",
+		}
+
+
+class EtsyStandInServer(ThreadingHTTPServer):
+	daemon_threads = True
+
+	def __init__(self, address: tuple[str, int], shop: fixtures.SyntheticShop):
+		super().__init__(address, EtsyStandInHandler)
+		self.shop = shop
+		self.lock = threading.Lock()
+		self.ledger_window: tuple[int, int] | None = None
+		self.ledger: list[dict] = []
+
+
+def _serve(address, shop_args, ready):
+	with EtsyStandInServer(address, fixtures.SyntheticShop(*shop_args)) as server:
+		ready.put(server.server_address[1])
+		server.serve_forever()
+
+
+class EtsyStandIn:
+	"""
+	Runs `EtsyStandInServer` in a separate process, so serving the fixtures
+	does not compete with the import for the GIL or inflate its memory.
+
+	### Usage example:
+	```
+	with EtsyStandIn(count=1000) as stand_in:
+	    frappe.conf.etsy_api_base_url = stand_in.url
+	    ...
+	```
+	"""
+
+	def __init__(
+		self,
+		count: int,
+		seed: int = 0,
+		id_offset: int = 0,
+		distributions: dict | None = None,
+		host: str = "127.0.0.1",
+		port: int = 0,
+	):
+		self.args = ((host, port), (count, seed, id_offset, distributions))
+		self.host = host
+		self.url: str | None = None
+		self.process: multiprocessing.Process | None = None
+
+	def __enter__(self) -> "EtsyStandIn":
+		context = multiprocessing.get_context("spawn")
+		ready = context.Queue()
+		self.process = context.Process(target=_serve, args=(*self.args, ready), daemon=True)
+		self.process.start()
+		self.url = f"http://{self.host}:{ready.get(timeout=30)}/"
+		return self
+
+	def __exit__(self, *exc):
+		self.process.terminate()
+		self.process.join()
+		return False
@@ -0,0 +1,6 @@
+frappe.provide("frappe.dashboards.chart_sources");
+
+frappe.dashboards.chart_sources["Etsy API Requests"] = {
+	method: "etsy.etsy.dashboard_chart_source.etsy_api_requests.etsy_api_requests.get",
+	filters: [],
+};
@@ -0,0 +1,30 @@
+import frappe
+from frappe import _
+
+from etsy.metrics import get_hourly_metrics
+
+
+@frappe.whitelist()
+def get(
+	chart_name=None,
+	chart=None,
+	no_cache=None,
+	filters=None,
+	from_date=None,
+	to_date=None,
+	timespan=None,
+	time_interval=None,
+	heatmap_year=None,
+):
+	"""Etsy API throughput of the last 24 hours: requests, errors and cache hits per hour."""
+	frappe.only_for("System Manager")
+	hourly = get_hourly_metrics()
+
+	return {
+		"labels": [h["hour"] for h in hourly],
+		"datasets": [
+			{"name": _("Requests"), "values": [h["requests"] for h in hourly]},
+			{"name": _("Errors"), "values": [h["errors"] for h in hourly]},
+			{"name": _("Cache Hits"), "values": [h["cache_hits"] for h in hourly]},
+		],
+	}
@@ -0,0 +1,9 @@
+frappe.ui.form.on("Etsy Import Checkpoint", {
+	refresh(frm) {
+		if (frm.doc.status !== "Completed") {
+			frm.add_custom_button(__("Resume"), () => {
+				frm.call("resume").then(() => frm.reload_doc());
+			});
+		}
+	},
+});
@@ -0,0 +1,207 @@
+import json
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import add_to_date, get_datetime, now_datetime
+
+from etsy.etsy.doctype.etsy_import_window.etsy_import_window import (
+	JOB_TIMEOUT,
+	MAX_ATTEMPTS,
+	STALE_AFTER,
+	dispatch,
+	resume_stale_windows,
+)
+
+UNFINISHED_STATUSES = ("Queued", "Running", "Interrupted")
+
+
+class EtsyImportCheckpoint(Document):
+	"""
+	Progress of one long-running import: per window (date range or listing state) the number of its
+	records that are processed and the last ID, and the snapshot timestamp of the first run.
+	An import started again with the same arguments continues from here, see `open_checkpoint`.
+	Windows that are imported at the same time (listing_state "all") keep their own offsets.
+
+	### Usage example:
+	```
+	checkpoint = open_checkpoint(shop.name, "Listings", {"listing_state": "active"})
+	with checkpoint.running():
+	    for offset, listing in enumerate(fetch_all(..., start_offset=checkpoint.start_offset("active")), ...):
+	        ...
+	        checkpoint.advance("active", offset + 1, listing.listing_id)
+	        frappe.db.commit()
+	    checkpoint.complete_window("active")
+	```
+	"""
+
+	@staticmethod
+	def clear_old_logs(days: int = 90):
+		"""Called by Log Settings, see `default_log_clearing_doctypes` in hooks.py."""
+		from frappe.query_builder import Interval
+		from frappe.query_builder.functions import Now
+
+		checkpoint = frappe.qb.DocType("Etsy Import Checkpoint")
+		frappe.db.delete(
+			checkpoint,
+			filters=(checkpoint.modified < (Now() - Interval(days=days)))
+			& checkpoint.status.isin(("Interrupted", "Completed")),
+		)
+
+	@property
+	def is_stale(self) -> bool:
+		return get_datetime(self.modified) < add_to_date(now_datetime(), seconds=-STALE_AFTER)
+
+	@property
+	def progress(self) -> dict[str, dict]:
+		"""Offset, last ID and completion per window."""
+		if self.flags.progress is None:
+			self.flags.progress = json.loads(self.window_progress or "{}")
+		return self.flags.progress
+
+	def start_offset(self, window: str) -> int:
+		"""Offset to continue `window` from, 0 unless the checkpoint stopped within `window`."""
+		return self.progress.get(window, {}).get("offset", 0)
+
+	def last_id_of(self, window: str) -> str | None:
+		return self.progress.get(window, {}).get("last_id")
+
+	def is_completed(self, window: str) -> bool:
+		return bool(self.progress.get(window, {}).get("completed"))
+
+	@contextmanager
+	def running(self):
+		"""Marks the checkpoint as running, then as completed or, if the block raises, as interrupted."""
+		self.db_set({"status": "Running", "attempts": self.attempts + 1, "error": None})
+		frappe.db.commit()
+		try:
+			yield self
+		except Exception:
+			frappe.db.rollback()
+			self.db_set({"status": "Interrupted", "error": frappe.get_traceback()})
+			frappe.db.commit()
+			raise
+		self.db_set("status", "Completed")
+		frappe.db.commit()
+
+	def advance(self, window: str, offset: int, last_id: int | str):
+		"""Records that the first `offset` records of `window` are processed. Committed with the caller's next commit."""
+		self.progress[window] = {"offset": offset, "last_id": str(last_id)}
+		self.db_set(
+			{
+				"window": window,
+				"committed_offset": offset,
+				"last_id": str(last_id),
+				"window_progress": json.dumps(self.progress),
+			}
+		)
+
+	def complete_window(self, window: str):
+		"""Records that all records of `window` are processed, a resumed import skips it."""
+		self.progress.setdefault(window, {})["completed"] = 1
+		self.db_set("window_progress", json.dumps(self.progress))
+
+	@frappe.whitelist()
+	def resume(self):
+		"""Queues the import again, it continues after the last committed record."""
+		if self.status == "Completed":
+			frappe.throw(_("This import is already completed."))
+		if self.status in ("Queued", "Running") and not self.is_stale:
+			frappe.throw(_("This import is still running."))
+
+		self.enqueue()
+
+	def enqueue(self):
+		if self.import_window:
+			# the window's job resumes this checkpoint, see EtsyShop.import_receipts
+			frappe.db.set_value(
+				"Etsy Import Window", self.import_window, {"status": "Pending", "error": None}
+			)
+			self.db_set("status", "Queued")
+			dispatch(frappe.db.get_value("Etsy Import Window", self.import_window, "backfill"))
+			return
+
+		method = {
+			"Receipts": "etsy.etsy.doctype.etsy_shop.etsy_shop.run_import_receipts",
+			"Listings": "etsy.etsy.doctype.etsy_shop.etsy_shop.run_import_listings",
+		}[self.kind]
+		self.db_set("status", "Queued")
+		frappe.enqueue(
+			method,
+			queue="long",
+			timeout=JOB_TIMEOUT,
+			enqueue_after_commit=True,
+			user=self.owner,
+			etsy_shop=self.etsy_shop,
+			**json.loads(self.arguments),
+		)
+
+
+def open_checkpoint(
+	etsy_shop: str, kind: str, arguments: dict, window: str = "", import_window: str | None = None
+) -> EtsyImportCheckpoint:
+	"""
+	Returns the unfinished checkpoint of an import of `etsy_shop` with the same `kind` and `arguments`,
+	unless it is still running, or a new checkpoint that starts at `window`.
+	"""
+	arguments = json.dumps(arguments, sort_keys=True, default=str)
+	for name in frappe.get_all(
+		"Etsy Import Checkpoint",
+		filters={
+			"etsy_shop": etsy_shop,
+			"kind": kind,
+			"arguments": arguments,
+			"import_window": import_window or ("is", "not set"),
+			"status": ("in", UNFINISHED_STATUSES),
+		},
+		order_by="creation desc",
+		pluck="name",
+	):
+		checkpoint: EtsyImportCheckpoint = frappe.get_doc("Etsy Import Checkpoint", name)
+		if checkpoint.status != "Running" or checkpoint.is_stale:
+			return checkpoint
+
+	return frappe.get_doc(
+		{
+			"doctype": "Etsy Import Checkpoint",
+			"etsy_shop": etsy_shop,
+			"kind": kind,
+			"import_window": import_window,
+			"arguments": arguments,
+			"snapshot_timestamp": int(now_datetime().timestamp()),
+			"window": window,
+		}
+	).insert(ignore_permissions=True)
+
+
+def resume_interrupted_imports():
+	"""
+	This function will be executed hourly by the Scheduler. Resumes imports that failed
+	or whose job died (timeout, worker restart), at most `MAX_ATTEMPTS` times each.
+	"""
+	from etsy.api import CircuitBreaker
+
+	if not frappe.db.get_single_value("Etsy Settings", "etsy_enabled"):
+		return
+
+	for name in frappe.get_all(
+		"Etsy Import Checkpoint",
+		filters={"status": ("in", UNFINISHED_STATUSES), "attempts": ("<", MAX_ATTEMPTS)},
+		order_by="creation asc",
+		pluck="name",
+	):
+		checkpoint: EtsyImportCheckpoint = frappe.get_doc("Etsy Import Checkpoint", name)
+		if checkpoint.status != "Interrupted" and not checkpoint.is_stale:
+			continue
+		if CircuitBreaker(checkpoint.etsy_shop).is_open():
+			continue
+		try:
+			checkpoint.enqueue()
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(f"Etsy: Failed to resume import {name}")
+
+	resume_stale_windows()
+	frappe.db.commit()
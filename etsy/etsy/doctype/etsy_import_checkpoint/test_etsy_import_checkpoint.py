@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.etsy.doctype.etsy_import_checkpoint.etsy_import_checkpoint import (
+	MAX_ATTEMPTS,
+	STALE_AFTER,
+	open_checkpoint,
+	resume_interrupted_imports,
+)
+
+ARGUMENTS = {"listing_state": "active", "include_attributes": 1, "include_items": 0}
+
+
+@patch("etsy.etsy.doctype.etsy_import_checkpoint.etsy_import_checkpoint.frappe.enqueue")
+class TestEtsyImportCheckpoint(FrappeTestCase):
+	def setUp(self):
+		rollback = frappe.db.rollback
+		for method in ("commit", "rollback"):  # keep the checkpoints in the test transaction
+			transaction = patch.object(frappe.db, method)
+			transaction.start()
+			self.addCleanup(transaction.stop)
+		self.addCleanup(rollback)
+
+		self.shop = frappe.get_doc({"doctype": "Etsy Shop", "shop_name": "_Test Checkpoint Shop"})
+		self.shop.insert(ignore_permissions=True, ignore_mandatory=True)
+		frappe.db.set_single_value("Etsy Settings", "etsy_enabled", 1)
+
+	def interrupt_after(self, records: int, arguments: dict = ARGUMENTS):
+		checkpoint = open_checkpoint(self.shop.name, "Listings", arguments, window="active")
+		with self.assertRaises(ValueError), checkpoint.running():
+			for offset in range(records):
+				checkpoint.advance("active", offset + 1, 1000 + offset)
+			raise ValueError("worker died")
+		return checkpoint
+
+	def test_interrupted_import_is_resumed(self, enqueue):
+		checkpoint = self.interrupt_after(3)
+		checkpoint.reload()
+		self.assertEqual(checkpoint.status, "Interrupted")
+		self.assertIn("worker died", checkpoint.error)
+
+		resumed = open_checkpoint(self.shop.name, "Listings", ARGUMENTS, window="active")
+		self.assertEqual(resumed.name, checkpoint.name)
+		self.assertEqual(resumed.start_offset("active"), 3)
+		self.assertEqual(resumed.start_offset("draft"), 0)
+		self.assertEqual(resumed.last_id_of("active"), "1002")
+
+		other = open_checkpoint(self.shop.name, "Listings", {**ARGUMENTS, "listing_state": "draft"})
+		self.assertNotEqual(other.name, checkpoint.name)
+
+	def test_windows_keep_their_own_progress(self, enqueue):
+		arguments = {**ARGUMENTS, "listing_state": "all"}
+		checkpoint = open_checkpoint(self.shop.name, "Listings", arguments)
+		with self.assertRaises(ValueError), checkpoint.running():
+			checkpoint.advance("active", 100, 1099)
+			checkpoint.advance("draft", 3, 2002)
+			checkpoint.complete_window("draft")
+			checkpoint.advance("active", 101, 1100)
+			raise ValueError("worker died")
+
+		resumed = open_checkpoint(self.shop.name, "Listings", arguments)
+		self.assertEqual(resumed.name, checkpoint.name)
+		self.assertEqual(resumed.start_offset("active"), 101)
+		self.assertEqual(resumed.last_id_of("active"), "1100")
+		self.assertTrue(resumed.is_completed("draft"))
+		self.assertFalse(resumed.is_completed("active"))
+
+	def test_completed_import_starts_over(self, enqueue):
+		checkpoint = open_checkpoint(self.shop.name, "Listings", ARGUMENTS, window="active")
+		with checkpoint.running():
+			checkpoint.advance("active", 5, 1004)
+
+		self.assertEqual(checkpoint.status, "Completed")
+		self.assertNotEqual(open_checkpoint(self.shop.name, "Listings", ARGUMENTS).name, checkpoint.name)
+
+	def test_automatic_resumption(self, enqueue):
+		interrupted = self.interrupt_after(2)
+		stale = open_checkpoint(self.shop.name, "Receipts", {"min_date": "2024-01-01", "max_date": None})
+		stale.db_set("status", "Running")
+		frappe.db.set_value(
+			"Etsy Import Checkpoint",
+			stale.name,
+			"modified",
+			add_to_date(now_datetime(), seconds=-STALE_AFTER - 60),
+			update_modified=False,
+		)
+		exhausted = self.interrupt_after(1, {**ARGUMENTS, "listing_state": "expired"})
+		exhausted.db_set("attempts", MAX_ATTEMPTS)
+		running = open_checkpoint(self.shop.name, "Receipts", {"min_date": "2025-01-01", "max_date": None})
+
+		resume_interrupted_imports()
+
+		resumed = {
+			call.kwargs.get("listing_state") or call.kwargs["min_date"] for call in enqueue.call_args_list
+		}
+		self.assertEqual(resumed, {"active", "2024-01-01"})
+		self.assertEqual(frappe.db.get_value("Etsy Import Checkpoint", interrupted.name, "status"), "Queued")
+		self.assertEqual(frappe.db.get_value("Etsy Import Checkpoint", running.name, "status"), "Running")
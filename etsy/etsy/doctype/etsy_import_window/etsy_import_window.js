@@ -0,0 +1,9 @@
+frappe.ui.form.on("Etsy Import Window", {
+	refresh(frm) {
+		if (frm.doc.status === "Failed") {
+			frm.add_custom_button(__("Retry"), () => {
+				frm.call("retry").then(() => frm.reload_doc());
+			});
+		}
+	},
+});
@@ -0,0 +1,191 @@
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.query_builder.functions import Count, Sum
+from frappe.utils import add_days, add_to_date, getdate, now_datetime
+
+from etsy.utils import date_windows
+
+BACKFILL_WINDOW_DAYS = 30  # days of receipts imported by one background job
+BACKFILL_PARALLEL_JOBS = 3  # windows of one backfill that are queued or running at the same time
+JOB_TIMEOUT = 3600  # seconds
+STALE_AFTER = JOB_TIMEOUT + 600  # seconds without progress after which a running import is considered dead
+MAX_ATTEMPTS = 4  # first run and automatic resumptions, see `resume_interrupted_imports`
+ACTIVE_STATUSES = ("Pending", "Queued", "Running")
+
+
+class EtsyImportWindow(Document):
+	@staticmethod
+	def clear_old_logs(days: int = 90):
+		"""Called by Log Settings, see `default_log_clearing_doctypes` in hooks.py."""
+		from frappe.query_builder import Interval
+		from frappe.query_builder.functions import Now
+
+		window = frappe.qb.DocType("Etsy Import Window")
+		frappe.db.delete(
+			window,
+			filters=(window.creation < (Now() - Interval(days=days)))
+			& window.status.isin(("Completed", "Failed")),
+		)
+
+	@frappe.whitelist()
+	def retry(self):
+		"""Queues a failed window again, the other windows of its backfill are not touched."""
+		if self.status != "Failed":
+			frappe.throw(_("Only failed windows can be retried."))
+
+		self.db_set({"status": "Pending", "error": None})
+		dispatch(self.backfill)
+
+
+def create_backfill(etsy_shop: str, min_date: str, max_date: str) -> str:
+	"""
+	Splits the receipt import from `min_date` to `max_date` (inclusive) into non-overlapping windows
+	of `BACKFILL_WINDOW_DAYS`, each imported by its own background job. Returns the backfill ID.
+	"""
+	backfill = frappe.generate_hash(length=10)
+	for start, end in date_windows(getdate(min_date), add_days(getdate(max_date), 1), BACKFILL_WINDOW_DAYS):
+		frappe.get_doc(
+			{
+				"doctype": "Etsy Import Window",
+				"etsy_shop": etsy_shop,
+				"backfill": backfill,
+				"status": "Pending",
+				"min_date": start,
+				"max_date": add_days(end, -1),
+			}
+		).insert(ignore_permissions=True)
+
+	dispatch(backfill)
+	return backfill
+
+
+def dispatch(backfill: str):
+	"""Queues the oldest pending windows of `backfill` until `BACKFILL_PARALLEL_JOBS` are queued or running."""
+	windows = frappe.db.get_values(
+		"Etsy Import Window",
+		{"backfill": backfill, "status": ("in", ACTIVE_STATUSES)},
+		["name", "status"],
+		order_by="min_date asc",
+		for_update=True,  # finishing jobs dispatch concurrently
+		as_dict=True,
+	)
+	free = BACKFILL_PARALLEL_JOBS - sum(window.status != "Pending" for window in windows)
+	for window in [window for window in windows if window.status == "Pending"][: max(0, free)]:
+		frappe.db.set_value("Etsy Import Window", window.name, "status", "Queued")
+		frappe.enqueue(
+			"etsy.etsy.doctype.etsy_import_window.etsy_import_window.run_import_window",
+			queue="long",
+			timeout=JOB_TIMEOUT,
+			enqueue_after_commit=True,
+			window=window.name,
+		)
+
+
+def run_import_window(window: str):
+	"""Background job: imports the receipts of one window, then queues the next pending window."""
+	doc: EtsyImportWindow = frappe.get_doc("Etsy Import Window", window)
+	doc.db_set({"status": "Running", "attempts": doc.attempts + 1, "error": None})
+	frappe.db.commit()
+
+	try:
+		shop = frappe.get_doc("Etsy Shop", doc.etsy_shop)
+		journal = shop.import_receipts(
+			min_date=str(doc.min_date), max_date=str(doc.max_date), import_window=doc.name
+		)
+		doc.db_set(
+			{
+				"status": "Completed",
+				"sync_run": journal.sync_run.name if journal.sync_run else None,
+				**{
+					f"records_{outcome}": journal.counts[outcome]
+					for outcome in ("created", "skipped", "failed")
+				},
+			}
+		)
+	except Exception:
+		frappe.db.rollback()
+		doc.db_set({"status": "Failed", "error": frappe.get_traceback()})
+		frappe.log_error(f"Etsy: Failed to import receipts from {doc.min_date} to {doc.max_date}")
+	frappe.db.commit()
+
+	dispatch(doc.backfill)
+	frappe.db.commit()
+
+	progress = get_progress(doc.backfill)
+	if not any(progress[status] for status in ACTIVE_STATUSES):
+		frappe.publish_realtime(
+			"msgprint",
+			{
+				"message": _("Etsy sales import completed for {0}: {1} created, {2} failed windows.").format(
+					doc.etsy_shop, progress["records_created"], progress["Failed"]
+				),
+				"indicator": "red" if progress["Failed"] else "green",
+				"alert": True,
+			},
+			user=doc.owner,
+		)
+
+
+def resume_stale_windows():
+	"""
+	Queues windows again whose job died without finishing (timeout, worker restart),
+	so they no longer block the parallel jobs of their backfill. Windows out of attempts fail.
+	"""
+	backfills = set()
+	for window in frappe.get_all(
+		"Etsy Import Window",
+		filters={
+			"status": "Running",
+			"modified": ("<", add_to_date(now_datetime(), seconds=-STALE_AFTER)),
+		},
+		fields=["name", "backfill", "attempts"],
+	):
+		if window.attempts < MAX_ATTEMPTS:
+			frappe.db.set_value("Etsy Import Window", window.name, "status", "Pending")
+		else:
+			frappe.db.set_value(
+				"Etsy Import Window",
+				window.name,
+				{
+					"status": "Failed",
+					"error": _("The import job did not finish within {0} seconds.").format(JOB_TIMEOUT),
+				},
+			)
+		backfills.add(window.backfill)
+
+	for backfill in backfills:
+		dispatch(backfill)
+
+
+def get_progress(backfill: str) -> dict:
+	"""Windows per status and the records of all windows of `backfill`."""
+	window = frappe.qb.DocType("Etsy Import Window")
+	rows = (
+		frappe.qb.from_(window)
+		.select(
+			window.status,
+			Count("*").as_("windows"),
+			Sum(window.records_created).as_("records_created"),
+			Sum(window.records_failed).as_("records_failed"),
+		)
+		.where(window.backfill == backfill)
+		.groupby(window.status)
+		.run(as_dict=True)
+	)
+	progress = dict.fromkeys(("Pending", "Queued", "Running", "Completed", "Failed"), 0)
+	progress.update({row.status: row.windows for row in rows})
+	progress["windows"] = sum(row.windows for row in rows)
+	progress["records_created"] = sum(row.records_created or 0 for row in rows)
+	progress["records_failed"] = sum(row.records_failed or 0 for row in rows)
+	return progress
+
+
+@frappe.whitelist()
+def get_backfill_progress(etsy_shop: str) -> dict | None:
+	"""Progress of the latest backfill of `etsy_shop`, for the Etsy Shop form."""
+	frappe.has_permission("Etsy Import Window", throw=True)
+	backfill = frappe.db.get_value(
+		"Etsy Import Window", {"etsy_shop": etsy_shop}, "backfill", order_by="creation desc"
+	)
+	return get_progress(backfill) | {"backfill": backfill} if backfill else None
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from itertools import pairwise
+from unittest.mock import patch
+
+import frappe
+from frappe.utils import getdate
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.etsy.doctype.etsy_import_window.etsy_import_window import (
+	BACKFILL_PARALLEL_JOBS,
+	create_backfill,
+	dispatch,
+	get_progress,
+)
+
+
+@patch("etsy.etsy.doctype.etsy_import_window.etsy_import_window.frappe.enqueue")
+class TestEtsyImportWindow(FrappeTestCase):
+	def setUp(self):
+		self.shop = frappe.get_doc({"doctype": "Etsy Shop", "shop_name": "_Test Backfill Shop"})
+		self.shop.insert(ignore_permissions=True, ignore_mandatory=True)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def windows(self, backfill: str) -> list[dict]:
+		return frappe.get_all(
+			"Etsy Import Window",
+			filters={"backfill": backfill},
+			fields=["name", "min_date", "max_date", "status"],
+			order_by="min_date asc",
+		)
+
+	def test_windows_cover_the_range(self, enqueue):
+		windows = self.windows(create_backfill(self.shop.name, "2024-01-01", "2024-12-31"))
+
+		self.assertEqual(len(windows), 13)  # 366 days in windows of 30 days
+		self.assertEqual(windows[0].min_date, getdate("2024-01-01"))
+		self.assertEqual(windows[-1].max_date, getdate("2024-12-31"))
+		for previous, window in pairwise(windows):
+			self.assertEqual(window.min_date, previous.max_date + timedelta(days=1))
+
+	def test_parallelism_is_limited(self, enqueue):
+		backfill = create_backfill(self.shop.name, "2024-01-01", "2024-12-31")
+		self.assertEqual(enqueue.call_count, BACKFILL_PARALLEL_JOBS)
+		self.assertEqual(get_progress(backfill)["Queued"], BACKFILL_PARALLEL_JOBS)
+
+		first = self.windows(backfill)[0]
+		frappe.db.set_value("Etsy Import Window", first.name, {"status": "Completed", "records_created": 7})
+		dispatch(backfill)
+
+		progress = get_progress(backfill)
+		self.assertEqual(enqueue.call_count, BACKFILL_PARALLEL_JOBS + 1)
+		self.assertEqual(progress["Queued"], BACKFILL_PARALLEL_JOBS)
+		self.assertEqual(progress["Completed"], 1)
+		self.assertEqual(progress["records_created"], 7)
@@ -2,7 +2,7 @@ import re
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import cstr
+from frappe.utils import cstr, now_datetime
 
 from etsy.datastruct import Listing, Property
 
@@ -13,7 +13,82 @@ class EtsyListing(Document):
 		for tag in self.tags:
 			tag.quality, tag.comment = rate_tag(tag.tag)
 
-			### public
+	### public
+
+	def sync_tags(self, tags: list[str]) -> bool:
+		"""
+		Writes the difference between the stored tags and `tags` without saving the listing:
+		rows of removed (or repeated) tags are deleted, new tags are rated and inserted in one statement.
+		Unchanged tags keep their rows and ratings. Returns whether a tag was added or removed.
+		"""
+		tags = list(dict.fromkeys(tags))
+		kept, removed = {}, []
+		for row in self.tags:
+			if row.tag in tags and row.tag not in kept:
+				kept[row.tag] = row
+			else:
+				removed.append(row.name)
+		added = [tag for tag in tags if tag not in kept]
+
+		if removed:
+			frappe.db.delete("Etsy Listing Tag", {"name": ("in", removed)})
+
+		rows = []
+		last_idx = max((row.idx for row in kept.values()), default=0)
+		for idx, tag in enumerate(added, last_idx + 1):
+			quality, comment = rate_tag(tag)
+			rows.append(
+				{
+					"name": frappe.generate_hash(length=10),
+					"idx": idx,
+					"tag": tag,
+					"quality": quality,
+					"comment": comment,
+				}
+			)
+		if rows:
+			now, user = now_datetime(), frappe.session.user
+			frappe.db.bulk_insert(
+				"Etsy Listing Tag",
+				(
+					"name",
+					"creation",
+					"modified",
+					"owner",
+					"modified_by",
+					"docstatus",
+					"parent",
+					"parenttype",
+					"parentfield",
+					"idx",
+					"tag",
+					"quality",
+					"comment",
+				),
+				[
+					(
+						row["name"],
+						now,
+						now,
+						user,
+						user,
+						0,
+						self.name,
+						self.doctype,
+						"tags",
+						row["idx"],
+						row["tag"],
+						row["quality"],
+						row["comment"],
+					)
+					for row in rows
+				],
+			)
+
+		self.set("tags", list(kept.values()))
+		for row in rows:
+			self.append("tags", row)
+		return bool(removed or added)
 
 	def get_attribute(self, property: Property, listing: Listing) -> Document:
 		etsy_listing = self.name or str(listing.listing_id)
@@ -1,3 +1,5 @@
+import frappe
+
 try:
 	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
 except ImportError:
@@ -5,4 +7,31 @@ except ImportError:
 
 
 class TestEtsyListing(FrappeTestCase):
-	pass
+	def setUp(self):
+		self.listing = frappe.get_doc(
+			{
+				"doctype": "Etsy Listing",
+				"listing_id": "_Test Tags",
+				"tags": [{"tag": "linen"}, {"tag": "handmade apron"}, {"tag": "linen"}],
+			}
+		).insert(ignore_permissions=True, ignore_mandatory=True)
+		self.addCleanup(frappe.delete_doc, "Etsy Listing", self.listing.name, force=True)
+
+	def test_sync_tags_writes_only_differences(self):
+		kept = self.listing.tags[1]
+		frappe.db.set_value("Etsy Listing Tag", kept.name, "quality", 0.123)  # not rated again
+
+		self.assertTrue(self.listing.sync_tags(["handmade apron", "kitchen gift"]))
+
+		rows = frappe.get_all(
+			"Etsy Listing Tag",
+			{"parent": self.listing.name},
+			["name", "tag", "quality", "idx"],
+			order_by="idx",
+		)
+		self.assertEqual([row.tag for row in rows], ["handmade apron", "kitchen gift"])
+		self.assertEqual((rows[0].name, rows[0].quality), (kept.name, 0.123))
+		self.assertGreater(rows[1].idx, kept.idx)
+		self.assertEqual([row.tag for row in self.listing.tags], ["handmade apron", "kitchen gift"])
+
+		self.assertFalse(self.listing.sync_tags(["handmade apron", "kitchen gift"]))
@@ -1,6 +1,8 @@
 import frappe
 from frappe.model.document import Document
 
+from etsy.posting import POSTING_MAX_JOBS
+
 RECEIPTS_SCHEDULED_JOB_TYPE_METHOD = "etsy.api.synchronise_receipts"
 LISTINGS_SCHEDULED_JOB_TYPE_METHOD = "etsy.api.synchronise_listings"
 
@@ -26,6 +28,13 @@ class EtsySettings(Document):
 		### receipts
 		sales_order_interval = min(max(0, self.sales_order_sync_interval), 60)
 		self.sales_order_sync_interval = sales_order_interval
+		# quiet shops are polled less often, see `etsy.api.PollSchedule`
+		self.sales_order_max_interval = min(
+			max(sales_order_interval, self.sales_order_max_interval or 0), 1440
+		)
+
+		# receipts of manual and historic imports are posted in parallel, see `etsy.posting`
+		self.posting_jobs = min(max(1, self.posting_jobs or 1), POSTING_MAX_JOBS)
 
 		sales_order_job = self.get_scheduler(self.sales_order_scheduler_link)
 		sales_order_job.method = RECEIPTS_SCHEDULED_JOB_TYPE_METHOD
@@ -162,6 +162,44 @@ frappe.ui.form.on("Etsy Shop", {
 					},
 					__("Import")
 				);
+				frm.add_custom_button(
+					__("Payment Ledger"),
+					async () => {
+						frappe.call({
+							method: "enqueue_import_ledger",
+							doc: frm.doc,
+							callback: () => {
+								frappe.show_alert(
+									{
+										message: __("Ledger import has been queued."),
+										indicator: "blue",
+									},
+									5
+								);
+							},
+						});
+					},
+					__("Import")
+				);
+				frm.add_custom_button(
+					__("Receipt Changes"),
+					async () => {
+						frappe.call({
+							method: "enqueue_import_receipt_changes",
+							doc: frm.doc,
+							callback: () => {
+								frappe.show_alert(
+									{
+										message: __("Sync of receipt changes has been queued."),
+										indicator: "blue",
+									},
+									5
+								);
+							},
+						});
+					},
+					__("Import")
+				);
 
 				frm.add_custom_button(__("Disconnect"), async () => {
 					frappe.warn(
@@ -196,6 +234,25 @@ frappe.ui.form.on("Etsy Shop", {
 							);
 						}
 					});
+
+				frappe
+					.call(
+						"etsy.etsy.doctype.etsy_import_window.etsy_import_window.get_backfill_progress",
+						{ etsy_shop: frm.doc.name }
+					)
+					.then((r) => {
+						const progress = r.message;
+						if (progress && progress.Pending + progress.Queued + progress.Running > 0) {
+							frm.set_intro(
+								__("Sales import running: {0} of {1} windows completed, {2} failed.", [
+									progress.Completed,
+									progress.windows,
+									progress.Failed,
+								]),
+								"blue"
+							);
+						}
+					});
 			}
 		}
 
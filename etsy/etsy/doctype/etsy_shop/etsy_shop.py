@@ -3,25 +3,99 @@ import datetime
 import hashlib
 import os
 import secrets
+from collections.abc import Iterator
+from contextlib import nullcontext
+from functools import partial
 from urllib.parse import quote_plus, unquote_plus, urlencode, urljoin
 
 import frappe
 import pytz
 from erpnext.accounts.doctype.payment_entry.payment_entry import get_payment_entry
+from erpnext.accounts.doctype.sales_invoice.sales_invoice import make_sales_return
 from erpnext.selling.doctype.sales_order.sales_order import close_or_unclose_sales_orders, make_sales_invoice
 from frappe import _
+from frappe.contacts.doctype.address.address import get_address_display
 from frappe.model.document import Document
-from frappe.utils import cint, cstr, get_system_timezone
+from frappe.query_builder.functions import IfNull
+from frappe.utils import (
+	add_days,
+	cint,
+	create_batch,
+	cstr,
+	flt,
+	get_datetime,
+	get_system_timezone,
+	getdate,
+	now_datetime,
+	today,
+)
 from requests_oauthlib import OAuth2Session
 
-from etsy.api import EtsyAPI, QP_getListingsByShop, QP_getShopReceipts, fetch_all
-from etsy.datastruct import ListingType
+from etsy.api import (
+	EtsyAPI,
+	PollSchedule,
+	QP_getListingsByShop,
+	QP_getShopPaymentAccountLedgerEntries,
+	QP_getShopReceipts,
+	fetch_all,
+	fetch_concurrently,
+	page_throttle,
+)
+from etsy.datastruct import (
+	Inventory,
+	Listing,
+	ListingType,
+	MonetaryAmount,
+	Offering,
+	Payment,
+	Refund,
+	ShopReceipt,
+)
+from etsy.etsy.doctype.etsy_import_checkpoint.etsy_import_checkpoint import (
+	EtsyImportCheckpoint,
+	open_checkpoint,
+)
+from etsy.etsy.doctype.etsy_import_window.etsy_import_window import create_backfill
+from etsy.etsy.doctype.etsy_sync_run.etsy_sync_run import SyncRunJournal
+from etsy.ledger import LEDGER_WINDOW_DAYS, LedgerAggregate, window_timestamps
+from etsy.posting import POSTING_BATCH_SIZE, PostingBatch, buyer_lock, partition, posting_jobs
+from etsy.utils import date_windows
 
 AUTHORIZATION_URI = "https://www.etsy.com/oauth/connect"
 TOKEN_URI = "https://api.etsy.com/v3/public/oauth/token"
-SCOPES = ["address_r", "email_r", "listings_r", "shops_r", "transactions_r"]
+SCOPES = ["address_r", "billing_r", "email_r", "listings_r", "listings_w", "shops_r", "transactions_r"]
 QUERY_PARAMS = {}
 LISTING_STATES = ("active", "inactive", "sold_out", "draft", "expired")
+RECEIPT_CHANGES_LOOKBACK = 30  # days of receipt changes the first sync of a shop applies
+RECEIPT_CHANGE_SAVEPOINT = "etsy_receipt_change"  # rolls back the change of a single receipt or refund
+ADDRESS_FIELDS = ("address_line1", "address_line2", "city", "state", "pincode", "country")
+ORDER_STATE_FIELDS = (
+	"name",
+	"etsy_order_id",
+	"customer",
+	"customer_address",
+	"status",
+	"etsy_status",
+	"etsy_shipments",
+	"etsy_last_modified",
+)
+PAID_STATUSES = ("paid", "completed", "fully refunded", "partially refunded")
+MAX_LISTING_QUANTITY = 999  # upper bound of an offering's quantity on Etsy
+ACCOUNT_FIELDS = (
+	"vat_account",
+	"shipping_income_account",
+	"income_account_physical",
+	"income_account_digital",
+	"discount_account",
+	"payment_fee_account",
+	"bank_account",
+)
+COST_CENTER_FIELDS = ("cost_center_physical", "cost_center_digital", "payment_fee_cost_center")
+NAMING_SERIES_FIELDS = {  # naming series field: placeholder
+	"customer_naming_series": "{ETSY_BUYER_ID}",
+	"sales_order_naming_series": "{ETSY_ORDER_ID}",
+	"sales_invoice_naming_series": "{ETSY_ORDER_ID}",
+}
 
 
 if any((os.getenv("CI"), frappe.conf.developer_mode, frappe.conf.allow_tests)):
@@ -31,6 +105,191 @@ if any((os.getenv("CI"), frappe.conf.developer_mode, frappe.conf.allow_tests)):
 os.environ["OAUTHLIB_RELAX_TOKEN_SCOPE"] = "1"
 
 
+def receipt_address(receipt: ShopReceipt) -> dict:
+	"""Billing address fields of `receipt`, as stored on the customer's Address."""
+	return {
+		"address_line1": receipt.first_line,
+		"address_line2": receipt.second_line,
+		"city": receipt.city,
+		"state": receipt.state,
+		"pincode": receipt.zip,
+		"country": frappe.db.get_value("Country", {"code": receipt.country_iso.lower()}),
+	}
+
+
+def update_doc(doc: Document, values: dict) -> bool:
+	"""Sets `values` on `doc`. Returns whether `doc` is new or any of the values changed."""
+	changed = doc.is_new()
+	for fieldname, value in values.items():
+		if cstr(doc.get(fieldname)) != cstr(value):
+			doc.set(fieldname, value)
+			changed = True
+	return changed
+
+
+def ensure_row(doc: Document, table: str, values: dict) -> bool:
+	"""
+	Appends a row with `values` to the child table `table` of `doc` unless there is one, and drops rows
+	that repeat an earlier row in the fields of `values`. Returns whether the table changed.
+	"""
+
+	def key(row) -> tuple:
+		return tuple(cstr(row.get(fieldname)) for fieldname in values)
+
+	rows, seen = [], set()
+	for row in doc.get(table):
+		if key(row) not in seen:
+			seen.add(key(row))
+			rows.append(row)
+
+	changed = len(rows) != len(doc.get(table))
+	if changed:
+		for idx, row in enumerate(rows, 1):
+			row.idx = idx
+		doc.set(table, rows)
+	if key(values) not in seen:
+		doc.append(table, values)
+		changed = True
+	return changed
+
+
+def order_state(receipt: ShopReceipt) -> dict:
+	"""Etsy state of `receipt` that is stored on its Sales Order, compared by `EtsyShop.update_order`."""
+	return {
+		"etsy_status": receipt.status.value,
+		"etsy_shipments": "\n".join(
+			f"{shipment.carrier_name}: {shipment.tracking_code}" for shipment in receipt.shipments
+		),
+		"etsy_last_modified": receipt.updated_timestamp,
+	}
+
+
+def latest_order_of(customer: str) -> str | None:
+	return frappe.db.get_value(
+		"Sales Order",
+		{"customer": customer, "docstatus": 1, "etsy_order_id": ("is", "set")},
+		"name",
+		order_by="transaction_date desc, creation desc",
+	)
+
+
+def enabled_offerings(listing: Listing) -> Iterator[tuple[str, Offering]]:
+	"""Yields the product ID and offering of the products of `listing` that are neither deleted nor disabled."""
+	for product in listing.inventory.products if listing.inventory else []:
+		if (
+			not product.is_deleted
+			and product.offerings
+			and not product.offerings[0].is_deleted
+			and product.offerings[0].is_enabled
+		):
+			yield cstr(product.product_id), product.offerings[0]
+
+
+def listing_quantities(listing: Listing) -> dict[str, int]:
+	"""Etsy quantity by product ID. Deleted and disabled products are left out, their stock is kept."""
+	return {product_id: offering.quantity for product_id, offering in enabled_offerings(listing)}
+
+
+def listing_prices(listing: Listing) -> dict[str, MonetaryAmount]:
+	"""Etsy price by product ID. Deleted and disabled products are left out, their price is kept."""
+	return {product_id: offering.price for product_id, offering in enabled_offerings(listing)}
+
+
+def stock_differences(quantities: dict[str, int], rows: list[dict]) -> list[dict]:
+	"""
+	Stock Reconciliation rows for the Items (`rows` with their Bin) whose actual quantity differs from
+	the Etsy quantity plus the reserved quantity. Items without a valuation rate are valued at zero.
+	"""
+	differences = []
+	for row in rows:
+		qty = quantities[row.etsy_product_id] + flt(row.reserved_qty)
+		if flt(row.actual_qty) == qty:
+			continue
+		valuation_rate = flt(row.valuation_rate) or flt(row.item_valuation_rate)
+		differences.append(
+			{
+				"item_code": row.item_code,
+				"qty": qty,
+				"valuation_rate": valuation_rate,
+				"allow_zero_valuation_rate": int(not valuation_rate),
+			}
+		)
+	return differences
+
+
+def price_differences(
+	prices: dict[str, MonetaryAmount], rows: list[dict], currency: str
+) -> tuple[list[dict], dict[str, dict]]:
+	"""
+	New and changed Item Prices for the Items (`rows` with their Item Price, if any) whose price differs
+	from the Etsy price. Prices in another currency than `currency` (of the Price List) are left out.
+	Returns the new Item Prices and the changes by Item Price name.
+	"""
+	new, changed = [], {}
+	for row in rows:
+		price = prices[row.etsy_product_id]
+		if price.currency_code.value != currency:
+			continue
+		rate = price.as_float()
+		if not row.item_price:
+			new.append({"item_code": row.item_code, "item_name": row.item_name, "price_list_rate": rate})
+		elif flt(row.price_list_rate) != rate:
+			changed[row.item_price] = {"price_list_rate": rate}
+	return new, changed
+
+
+def inventory_update(inventory: Inventory, quantities: dict[str, int]) -> dict | None:
+	"""
+	Request body of `updateListingInventory` that sets the offerings of `inventory` to `quantities`
+	(by product ID) and keeps everything else, `None` if no quantity changes.
+	Deleted products are dropped, Etsy does not accept them.
+	"""
+	products, changed = [], False
+	for product in inventory.products:
+		if product.is_deleted:
+			continue
+		offerings = []
+		for offering in product.offerings:
+			if offering.is_deleted:
+				continue
+			quantity = min(quantities.get(cstr(product.product_id), offering.quantity), MAX_LISTING_QUANTITY)
+			changed |= quantity != offering.quantity
+			offerings.append(
+				{
+					"price": offering.price.as_float(),
+					"quantity": quantity,
+					"is_enabled": offering.is_enabled,
+				}
+				| ({"readiness_state_id": offering.readiness_state_id} if offering.readiness_state_id else {})
+			)
+		products.append(
+			{
+				"sku": product.sku,
+				"property_values": [
+					value.model_dump(
+						include={"property_id", "property_name", "scale_id", "value_ids", "values"}
+					)
+					for value in product.property_values
+				],
+				"offerings": offerings,
+			}
+		)
+	if not changed:
+		return None
+	return {
+		"products": products,
+		"price_on_property": inventory.price_on_property,
+		"quantity_on_property": inventory.quantity_on_property,
+		"sku_on_property": inventory.sku_on_property,
+		"readiness_state_on_property": inventory.readiness_state_on_property,
+	}
+
+
+def refund_key(receipt_id: int, refund: Refund) -> str:
+	"""Identifies a refund, Etsy has no refund IDs: receipt ID, refund timestamp and amount in the smallest unit."""
+	return f"{receipt_id}:{int(refund.created_timestamp.timestamp())}:{refund.amount.amount}"
+
+
 def short_title(title: str) -> str:  # TODO: move to utils
 	return (
 		title.replace("&quot;", '"')
@@ -44,7 +303,15 @@ def short_title(title: str) -> str:  # TODO: move to utils
 	)
 
 
+class EtsyConfigurationError(frappe.ValidationError):
+	"""Raised before a receipt import if the shop's accounting configuration would make it fail."""
+
+
 class EtsyShop(Document):
+	@property
+	def next_receipt_sync(self):
+		return PollSchedule.for_shop(self.name).next_poll()
+
 	### hooks
 	def validate(self):
 		# redirect_uri
@@ -54,6 +321,7 @@ class EtsyShop(Document):
 			base_url = f"{splt[0]}://localhost:{splt[-1]}"
 		callback_path = f"/api/method/etsy.etsy.doctype.etsy_shop.etsy_shop.callback/{quote_plus(self.name)}"
 		self.redirect_uri = urljoin(base_url, callback_path)
+		self.webhook_url = urljoin(base_url, "/api/method/etsy.webhooks.receive")
 
 	### public
 	def get_auth_header(self) -> dict:
@@ -80,6 +348,81 @@ class EtsyShop(Document):
 			"Authorization": f"Bearer {self.get_password('access_token')}",
 		}
 
+	def preflight(self):
+		"""Raises `EtsyConfigurationError` with all problems of `preflight_errors`, before any receipt is imported."""
+		if errors := self.preflight_errors():
+			frappe.throw(
+				"<br>".join(errors),
+				EtsyConfigurationError,
+				title=_("Etsy Shop {0} cannot import receipts").format(self.name),
+			)
+
+	def preflight_errors(self) -> list[str]:
+		"""
+		Problems of the company, accounts, cost centers, warehouse and naming series that would let every
+		receipt import fail at the submit of its Sales Order or Sales Invoice. One query per doctype.
+		"""
+
+		def label(fieldname: str) -> str:
+			return _(self.meta.get_label(fieldname))
+
+		if not (self.company and frappe.db.exists("Company", self.company)):
+			return [_("{0} is not set or does not exist.").format(label("company"))]
+
+		errors = [
+			_("{0} is not set.").format(label(fieldname))
+			for fieldname in ("shipping_income_account", "bank_account")
+			if not self.get(fieldname)
+		]
+		for doctype, fieldnames, extra_fields in (
+			("Account", ACCOUNT_FIELDS, ["account_type"]),
+			("Cost Center", COST_CENTER_FIELDS, []),
+			("Warehouse", ("warehouse",), []),
+		):
+			names = {self.get(fieldname) for fieldname in fieldnames if self.get(fieldname)}
+			if not names:
+				continue
+			records = {
+				record.name: record
+				for record in frappe.get_all(
+					doctype,
+					filters={"name": ("in", list(names))},
+					fields=["name", "company", "is_group", "disabled", *extra_fields],
+				)
+			}
+			for fieldname in fieldnames:
+				if not (name := self.get(fieldname)):
+					continue
+				record = records.get(name)
+				if not record:
+					errors.append(_("{0}: {1} does not exist.").format(label(fieldname), name))
+				elif record.company != self.company:
+					errors.append(
+						_("{0}: {1} belongs to company {2}, not {3}.").format(
+							label(fieldname), name, record.company, self.company
+						)
+					)
+				elif record.is_group:
+					errors.append(_("{0}: {1} is a group.").format(label(fieldname), name))
+				elif record.disabled:
+					errors.append(_("{0}: {1} is disabled.").format(label(fieldname), name))
+				elif fieldname == "bank_account" and record.account_type not in ("Bank", "Cash"):
+					errors.append(_("{0}: {1} is not a Bank or Cash account.").format(label(fieldname), name))
+
+		from frappe.model.naming import NamingSeries
+
+		for fieldname, placeholder in NAMING_SERIES_FIELDS.items():
+			if not (series := self.get(fieldname)):
+				continue
+			try:
+				# Frappe appends the counter to the naming series of a document, see `set_name_by_naming_series`
+				NamingSeries(cstr(series).replace(placeholder, "0") + ".#####").validate()
+			except frappe.ValidationError:
+				frappe.clear_last_message()
+				errors.append(_("{0}: {1} is not a valid naming series.").format(label(fieldname), series))
+
+		return errors
+
 	### private
 	# Token
 	def token_exists(self) -> bool:
@@ -230,17 +573,48 @@ class EtsyShop(Document):
 		)
 
 	@frappe.whitelist()
-	def enqueue_import_receipts(self, min_date: str | None = None, max_date: str | None = None):
-		"""Enqueue receipt import as a background job to avoid request timeouts."""
+	def enqueue_import_receipts(self, min_date: str | None = None, max_date: str | None = None) -> str:
+		"""
+		Enqueue receipt import as background jobs to avoid request timeouts.
+		The date range is split into Etsy Import Windows that are imported in parallel, see `create_backfill`.
+		Without `min_date`, the import starts at the shop's oldest receipt.
+		"""
+		self.preflight()
+		self.get_auth_header()  # refresh an expired token once, not in every window's job
+		return create_backfill(self.name, min_date or self.first_receipt_date(), max_date or today())
+
+	def first_receipt_date(self) -> str:
+		"""Creation date of the shop's oldest receipt, today if it has none."""
+		_count, receipts = EtsyAPI(self).getShopReceipts(
+			QP_getShopReceipts(shop_id=self.shop_id, limit=1, sort_on="created", sort_order="asc")
+		)
+		return str(receipts[0].created_timestamp.date()) if receipts else today()
+
+	@frappe.whitelist()
+	def enqueue_import_ledger(self):
+		"""Enqueue ledger import as a background job to avoid request timeouts."""
+		if not self.ledger_start_date:
+			frappe.throw(_("Please set 'Import Ledger from' first."))
+
+		frappe.enqueue(
+			"etsy.etsy.doctype.etsy_shop.etsy_shop.run_import_ledger",
+			queue="long",
+			timeout=3600,
+			enqueue_after_commit=True,
+			user=frappe.session.user,
+			etsy_shop=self.name,
+		)
+
+	@frappe.whitelist()
+	def enqueue_import_receipt_changes(self):
+		"""Enqueue the sync of changed receipts as a background job to avoid request timeouts."""
 		frappe.enqueue(
-			"etsy.etsy.doctype.etsy_shop.etsy_shop.run_import_receipts",
+			"etsy.etsy.doctype.etsy_shop.etsy_shop.run_import_receipt_changes",
 			queue="long",
 			timeout=3600,
 			enqueue_after_commit=True,
 			user=frappe.session.user,
 			etsy_shop=self.name,
-			min_date=min_date,
-			max_date=max_date,
 		)
 
 	def import_listings(
@@ -249,194 +623,653 @@ class EtsyShop(Document):
 		include_attributes: int = 1,
 		include_items: int = 0,
 		etsy_api: EtsyAPI | None = None,
-	):
-		api = etsy_api or EtsyAPI(self)
-
-		if listing_state == "all":
-			for state in LISTING_STATES:
-				self.import_listings(
-					listing_state=state,
-					include_attributes=include_attributes,
-					include_items=include_items,
-					etsy_api=api,
+		journal: SyncRunJournal | None = None,
+		checkpoint: EtsyImportCheckpoint | None = None,
+	) -> SyncRunJournal:
+		"""
+		Imports the listings of `listing_state` ("all" for every state).
+		An import that was interrupted with the same arguments is continued from its Etsy Import Checkpoint.
+		"""
+		if journal is None:
+			with SyncRunJournal(self.name, "Listings") as journal:
+				checkpoint = open_checkpoint(
+					self.name,
+					"Listings",
+					{
+						"listing_state": listing_state,
+						"include_attributes": cint(include_attributes),
+						"include_items": cint(include_items),
+					},
 				)
-			return
+				with checkpoint.running():
+					self.import_listings(
+						listing_state, include_attributes, include_items, etsy_api, journal, checkpoint
+					)
+			return journal
+
+		api = etsy_api or EtsyAPI(self, journal=journal)
 
-		if listing_state not in LISTING_STATES:
+		if listing_state == "all":  # states completed before an interruption are skipped
+			states = [
+				state for state in LISTING_STATES if not (checkpoint and checkpoint.is_completed(state))
+			]
+		elif listing_state in LISTING_STATES:
+			states = [listing_state]
+		else:
 			frappe.throw(_("'listing_state' must be one of: {0}").format(LISTING_STATES))
 
-		for listing in fetch_all(
-			lambda o: api.getListingsByShop(
-				QP_getListingsByShop(
-					shop_id=self.shop_id,
-					state=listing_state,
-					limit=100,
-					offset=o,
-					includes=["Inventory", "Images"],
-				)
-			)
+		quantities: dict[str, int] = {}  # Etsy quantity by product ID, for `sync_stock`
+		prices: dict[str, MonetaryAmount] = {}  # Etsy price by product ID, for `price_list`
+
+		# the states are fetched concurrently, the listings are written here
+		for state, record in fetch_concurrently(
+			{state: partial(self.fetch_listings, api, journal, state, checkpoint) for state in states}
 		):
+			if record is None:  # all listings of `state` are imported
+				if checkpoint:
+					checkpoint.complete_window(state)
+				continue
+
+			offset, listing = record
 			try:
-				### Etsy Listing
-				if frappe.db.exists("Etsy Listing", cstr(listing.listing_id)):
-					etsy_listing = frappe.get_doc("Etsy Listing", cstr(listing.listing_id))
-				else:
-					etsy_listing = frappe.new_doc("Etsy Listing")
-					etsy_listing.listing_id = cstr(listing.listing_id)
-					etsy_listing.etsy_shop = self.name
-					# Etsy Listing Settings
-					etsy_listing.item_name = short_title(listing.title)
-					etsy_listing.item_group = self.item_group or frappe.defaults.get_global_default(
-						"item_group"
-					)
-					etsy_listing.stock_uom = self.stock_uom or frappe.defaults.get_global_default("stock_uom")
-					etsy_listing.is_stock_item = 1 - int(listing.listing_type is ListingType.DOWNLOAD)
+				exists = self.import_listing(listing, state, include_attributes, include_items, journal)
+				with journal.phase("commit"):
+					if checkpoint:
+						checkpoint.advance(state, offset + 1, listing.listing_id)
+					frappe.db.commit()
+				journal.count("updated" if exists else "created")
+				quantities.update(listing_quantities(listing))
+				prices.update(listing_prices(listing))
+			except Exception:
+				frappe.db.rollback()
+				journal.count("failed")
+				frappe.log_error(f"Etsy: Failed to import listing {listing.listing_id}")
 
-				etsy_listing.status = listing_state.replace("_", " ").title()
-				etsy_listing.views = listing.views
-				etsy_listing.likes = listing.num_favorers
+		if self.sync_stock and quantities:
+			try:
+				with journal.phase("stock"):
+					self.sync_stock_levels(quantities)
+				frappe.db.commit()
+			except Exception:
+				frappe.db.rollback()
+				frappe.log_error(f"Etsy: Failed to sync stock levels for shop {self.name}")
+
+		if self.price_list and prices:
+			try:
+				with journal.phase("prices"):
+					self.sync_item_prices(prices)
+				frappe.db.commit()
+			except Exception:
+				frappe.db.rollback()
+				frappe.log_error(f"Etsy: Failed to sync item prices for shop {self.name}")
+
+		return journal
 
-				etsy_listing.title = listing.title
-				etsy_listing.description = listing.description
+	def sync_stock_levels(self, quantities: dict[str, int]) -> Document | None:
+		"""
+		Sets the stock of the Items of `quantities` (Etsy quantity by product ID) in the shop's warehouse
+		with one Stock Reconciliation that only contains the Items whose stock differs.
+		The stock of all Items is read in one query. Quantities reserved by undelivered Sales Orders are
+		already deducted on Etsy, so they are added to the Etsy quantity.
+		"""
+		warehouse = self.stock_warehouse
+		if not warehouse:
+			return None
 
-				etsy_listing.set("tags", [])
-				for tag in listing.tags:
-					etsy_listing.append("tags", {"tag": tag})
+		item = frappe.qb.DocType("Item")
+		bin_ = frappe.qb.DocType("Bin")
+		rows = (
+			frappe.qb.from_(item)
+			.left_join(bin_)
+			.on((bin_.item_code == item.name) & (bin_.warehouse == warehouse))
+			.select(
+				item.name.as_("item_code"),
+				item.etsy_product_id,
+				item.valuation_rate.as_("item_valuation_rate"),
+				bin_.actual_qty,
+				bin_.reserved_qty,
+				bin_.valuation_rate,
+			)
+			.where(
+				item.etsy_product_id.isin(list(quantities))
+				& (item.is_stock_item == 1)
+				& (item.has_variants == 0)
+			)
+			.run(as_dict=True)
+		)
+		differences = stock_differences(quantities, rows)
+		if not differences:
+			return None
 
-				if listing.images:
-					etsy_listing.image = listing.images[0].get("url_170x135")
+		reconciliation: Document = frappe.new_doc("Stock Reconciliation")
+		reconciliation.company = self.company
+		reconciliation.purpose = "Stock Reconciliation"
+		for row in differences:
+			reconciliation.append("items", {**row, "warehouse": warehouse})
+		reconciliation.insert(ignore_permissions=True)
+		frappe.flags.etsy_stock_sync = True  # not pushed back to Etsy, see `record_stock_change`
+		try:
+			reconciliation.submit()
+		finally:
+			frappe.flags.etsy_stock_sync = False
+		return reconciliation
 
+	@property
+	def stock_warehouse(self) -> str | None:
+		"""Warehouse whose stock is synced with Etsy."""
+		return self.warehouse or frappe.db.get_single_value("Stock Settings", "default_warehouse")
+
+	def push_listing_stock(self, listing_id: str, api: EtsyAPI) -> bool:
+		"""
+		Sets the Etsy quantities of the products of `listing_id` to the stock of their Items in the shop's
+		warehouse, minus the quantity reserved by undelivered Sales Orders. Products without an Item keep
+		their quantity. Sends the update only if a quantity differs. Returns whether it was sent.
+		"""
+		item = frappe.qb.DocType("Item")
+		bin_ = frappe.qb.DocType("Bin")
+		rows = (
+			frappe.qb.from_(item)
+			.left_join(bin_)
+			.on((bin_.item_code == item.name) & (bin_.warehouse == self.stock_warehouse))
+			.select(item.etsy_product_id, bin_.actual_qty, bin_.reserved_qty)
+			.where(
+				(item.etsy_listing == listing_id)
+				& item.etsy_product_id.isnotnull()
+				& (item.is_stock_item == 1)
+				& (item.has_variants == 0)
+			)
+			.run(as_dict=True)
+		)
+		quantities = {
+			row.etsy_product_id: max(0, cint(flt(row.actual_qty) - flt(row.reserved_qty))) for row in rows
+		}
+
+		inventory = inventory_update(api.getListingInventory(int(listing_id)), quantities)
+		if inventory is None:
+			return False
+		page_throttle()  # shares the request rate of the listing and receipt imports
+		api.updateListingInventory(int(listing_id), inventory)
+		return True
+
+	def sync_item_prices(self, prices: dict[str, MonetaryAmount]) -> int:
+		"""
+		Sets the Item Prices of the Items of `prices` (Etsy price by product ID) in the shop's Price List.
+		The existing Item Prices are read in one query, only new and changed prices are written, in bulk.
+		Prices in another currency than the Price List's are left out. Returns the number of written prices.
+		"""
+		price_list = frappe.db.get_value(
+			"Price List", self.price_list, ["currency", "selling", "buying"], as_dict=True
+		)
+		item = frappe.qb.DocType("Item")
+		item_price = frappe.qb.DocType("Item Price")
+		rows = (
+			frappe.qb.from_(item)
+			.left_join(item_price)
+			.on(
+				(item_price.item_code == item.name)
+				& (item_price.price_list == self.price_list)
+				& (IfNull(item_price.uom, item.stock_uom) == item.stock_uom)
+				& (IfNull(item_price.customer, "") == "")
+				& (IfNull(item_price.supplier, "") == "")
+				& (IfNull(item_price.batch_no, "") == "")
+			)
+			.select(
+				item.name.as_("item_code"),
+				item.item_name,
+				item.stock_uom,
+				item.etsy_product_id,
+				item_price.name.as_("item_price"),
+				item_price.price_list_rate,
+			)
+			.where(item.etsy_product_id.isin(list(prices)) & (item.has_variants == 0))
+			.run(as_dict=True)
+		)
+		rows = list({row.item_code: row for row in reversed(rows)}.values())  # one Item Price per Item
+
+		skipped = {price.currency_code.value for price in prices.values()} - {price_list.currency}
+		if skipped:
+			frappe.log_error(
+				f"Etsy: Prices in {', '.join(sorted(skipped))} not synced to Price List {self.price_list}",
+				_("The Price List of shop {0} is in {1}.").format(self.name, price_list.currency),
+			)
+
+		new, changed = price_differences(prices, rows, price_list.currency)
+		if changed:
+			frappe.db.bulk_update("Item Price", changed)
+		if new:
+			stock_uom = {row.item_code: row.stock_uom for row in rows}
+			now, user = now_datetime(), frappe.session.user
+			frappe.db.bulk_insert(
+				"Item Price",
+				(
+					"name",
+					"creation",
+					"modified",
+					"owner",
+					"modified_by",
+					"item_code",
+					"item_name",
+					"uom",
+					"price_list",
+					"currency",
+					"selling",
+					"buying",
+					"valid_from",
+					"price_list_rate",
+				),
+				[
+					(
+						frappe.generate_hash(length=10),
+						now,
+						now,
+						user,
+						user,
+						row["item_code"],
+						row["item_name"],
+						stock_uom[row["item_code"]],
+						self.price_list,
+						price_list.currency,
+						price_list.selling,
+						price_list.buying,
+						today(),
+						row["price_list_rate"],
+					)
+					for row in new
+				],
+			)
+		return len(new) + len(changed)
+
+	def fetch_listings(
+		self,
+		api: EtsyAPI,
+		journal: SyncRunJournal,
+		listing_state: str,
+		checkpoint: EtsyImportCheckpoint | None = None,
+	) -> Iterator[tuple[int, Listing]]:
+		"""Yields the listings of `listing_state` with their offset, from the checkpoint on."""
+		start_offset = checkpoint.start_offset(listing_state) if checkpoint else 0
+		yield from enumerate(
+			fetch_all(
+				journal.paged(
+					lambda o: api.getListingsByShop(
+						QP_getListingsByShop(
+							shop_id=self.shop_id,
+							state=listing_state,
+							limit=100,
+							offset=o,
+							includes=["Inventory", "Images"],
+						)
+					)
+				),
+				start_offset=start_offset,
+				key=lambda listing: cstr(listing.listing_id),
+				anchor=checkpoint.last_id_of(listing_state) if start_offset else None,
+			),
+			start_offset,
+		)
+
+	def import_listing(
+		self,
+		listing: Listing,
+		listing_state: str,
+		include_attributes: int,
+		include_items: int,
+		journal: SyncRunJournal,
+	) -> bool:
+		"""Creates or updates the Etsy Listing of `listing`. Returns whether it existed before."""
+		with journal.phase("etsy_listing"):
+			### Etsy Listing
+			if exists := frappe.db.exists("Etsy Listing", cstr(listing.listing_id)):
+				etsy_listing = frappe.get_doc("Etsy Listing", cstr(listing.listing_id))
+			else:
+				etsy_listing = frappe.new_doc("Etsy Listing")
+				etsy_listing.listing_id = cstr(listing.listing_id)
+				etsy_listing.etsy_shop = self.name
+				# Etsy Listing Settings
+				etsy_listing.item_name = short_title(listing.title)
+				etsy_listing.item_group = self.item_group or frappe.defaults.get_global_default("item_group")
+				etsy_listing.stock_uom = self.stock_uom or frappe.defaults.get_global_default("stock_uom")
+				etsy_listing.is_stock_item = 1 - int(listing.listing_type is ListingType.DOWNLOAD)
+
+			values = {
+				"status": listing_state.replace("_", " ").title(),
+				"views": listing.views,
+				"likes": listing.num_favorers,
+				"title": listing.title,
+				"description": listing.description,
+			}
+			if listing.images:
+				values["image"] = listing.images[0].get("url_170x135")
+
+			# the tags are written by `sync_tags`, not by saving the listing with all its tag rows
+			if exists:
+				if changes := {
+					fieldname: value
+					for fieldname, value in values.items()
+					if cstr(etsy_listing.get(fieldname)) != cstr(value)
+				}:
+					etsy_listing.db_set(changes)
+			else:
+				etsy_listing.update(values)
 				etsy_listing.flags.ignore_mandatory = True
-				etsy_listing.save()
+				etsy_listing.insert()
+			etsy_listing.sync_tags(listing.tags)
 
-				if int(include_items):
-					etsy_listing.update_items(listing)  # create items and attributes
-				elif int(include_attributes):
-					etsy_listing.update_attributes(listing)  # just create attributes
+		with journal.phase("items" if int(include_items) else "attributes"):
+			if int(include_items):
+				etsy_listing.update_items(listing)  # create items and attributes
+			elif int(include_attributes):
+				etsy_listing.update_attributes(listing)  # just create attributes
 
-				frappe.db.commit()
-			except Exception:
-				frappe.db.rollback()
-				frappe.log_error(f"Etsy: Failed to import listing {listing.listing_id}")
+		return bool(exists)
 
 	def import_receipts(
-		self, min_date: str | None = None, max_date: str | None = None, abort_on_exist: bool = False
-	):
-		api = EtsyAPI(self)
-
-		for receipt in fetch_all(
-			lambda o: api.getShopReceipts(
-				QP_getShopReceipts(
-					shop_id=self.shop_id,
-					min_created=int(frappe.utils.get_datetime(f"{min_date} 00:00:00").timestamp())
-					if min_date
-					else None,
-					max_created=int(frappe.utils.get_datetime(f"{max_date} 23:59:59").timestamp())
-					if max_date
-					else None,
-					limit=100,
-					offset=o,
+		self,
+		min_date: str | None = None,
+		max_date: str | None = None,
+		abort_on_exist: bool = False,
+		import_window: str | None = None,
+	) -> SyncRunJournal:
+		"""
+		Imports the receipts created from `min_date` to `max_date`, newest first.
+		Unless `abort_on_exist` is set, progress is kept in an Etsy Import Checkpoint and an interrupted
+		import with the same dates continues after its last committed receipt.
+		"""
+		trigger = "Scheduled" if abort_on_exist else "Backfill" if import_window else "Manual"
+		with SyncRunJournal(self.name, "Receipts", trigger=trigger) as journal:
+			self.preflight()  # before any API call, the run fails with one error
+			api = EtsyAPI(self, journal=journal)
+			existing: set[str] = set()  # receipt IDs of the current page that are already imported
+			payments: dict[int, Payment] = {}  # payments of the current page by receipt ID
+			window = f"{min_date or ''}..{max_date or ''}"
+			checkpoint = (
+				None
+				if abort_on_exist
+				else open_checkpoint(
+					self.name,
+					"Receipts",
+					{"min_date": min_date, "max_date": max_date},
+					window=window,
+					import_window=import_window,
 				)
 			)
-		):
-			if frappe.db.exists("Sales Order", {"etsy_order_id": receipt.receipt_id}):
-				if abort_on_exist:
-					break
-				else:
-					continue
+			# receipts created during the run (or after the first run of a checkpoint) would shift the pages
+			snapshot = checkpoint.snapshot_timestamp if checkpoint else int(now_datetime().timestamp())
+			max_created = (
+				min(int(frappe.utils.get_datetime(f"{max_date} 23:59:59").timestamp()), snapshot)
+				if max_date
+				else snapshot
+			)
 
-			try:
-				### Customer
-				if customer_name := frappe.db.exists("Customer", {"etsy_customer_id": receipt.buyer_user_id}):
-					customer = frappe.get_doc("Customer", customer_name)
-				else:
-					customer = frappe.new_doc("Customer")
-					if naming_series := self.customer_naming_series:
-						customer.naming_series = str(naming_series).replace(
-							"{ETSY_BUYER_ID}", str(receipt.buyer_user_id)
+			def fetch_page(offset: int) -> tuple[int, list[ShopReceipt]]:
+				count, receipts = api.getShopReceipts(
+					QP_getShopReceipts(
+						shop_id=self.shop_id,
+						min_created=int(frappe.utils.get_datetime(f"{min_date} 00:00:00").timestamp())
+						if min_date
+						else None,
+						max_created=max_created,
+						limit=100,
+						offset=offset,
+					)
+				)
+				existing.clear()
+				existing.update(
+					frappe.get_all(
+						"Sales Order",
+						filters={"etsy_order_id": ("in", [cstr(r.receipt_id) for r in receipts])},
+						pluck="etsy_order_id",
+					)
+					if receipts
+					else []
+				)
+				payments.clear()
+				if self.payment_fee_account:
+					payments.update(
+						api.getShopPaymentsByReceiptIds(
+							self.shop_id,
+							[
+								r.receipt_id
+								for r in receipts
+								if r.is_paid and cstr(r.receipt_id) not in existing
+							],
 						)
-					customer.etsy_customer_id = receipt.buyer_user_id
-
-				customer.customer_name = receipt.name
-				customer.customer_type = self.customer_type or "Individual"
-				customer.customer_group = self.customer_group or frappe.defaults.get_global_default(
-					"customer_group"
+					)
+				return count, receipts
+
+			with checkpoint.running() if checkpoint else nullcontext():
+				start_offset = checkpoint.start_offset(window) if checkpoint else 0
+				records = enumerate(
+					fetch_all(
+						journal.paged(fetch_page),
+						start_offset=start_offset,
+						key=lambda receipt: cstr(receipt.receipt_id),
+						anchor=checkpoint.last_id_of(window) if start_offset else None,
+					),
+					start_offset,
 				)
+				# scheduled polls import few receipts, they are posted here
+				if not abort_on_exist and (jobs := posting_jobs()) > 1:
+					self.post_in_parallel(records, existing, payments, jobs, journal, checkpoint, window)
+					return journal
+
+				for offset, receipt in records:
+					if cstr(receipt.receipt_id) in existing:
+						journal.count("skipped")
+						if abort_on_exist:
+							break
+						if checkpoint:  # committed with the next imported receipt
+							checkpoint.advance(window, offset + 1, receipt.receipt_id)
+						continue
+
+					try:
+						with buyer_lock(self.name, receipt.buyer_user_id):
+							self.import_receipt(receipt, api, payments.get(receipt.receipt_id))
+							with journal.phase("commit"):
+								if checkpoint:
+									checkpoint.advance(window, offset + 1, receipt.receipt_id)
+								frappe.db.commit()
+						journal.count("created")
+					except Exception:
+						frappe.db.rollback()
+						journal.count("failed")
+						frappe.log_error(f"Etsy: Failed to import receipt {receipt.receipt_id}")
+
+		return journal
+
+	def post_in_parallel(
+		self,
+		records: Iterator[tuple[int, ShopReceipt]],
+		existing: set[str],
+		payments: dict[int, Payment],
+		jobs: int,
+		journal: SyncRunJournal,
+		checkpoint: EtsyImportCheckpoint | None,
+		window: str,
+	):
+		"""
+		Posts the receipts of `records` in batches of `POSTING_BATCH_SIZE` by up to `jobs` background jobs,
+		partitioned by buyer, see `etsy.posting`. The checkpoint advances after each completed batch.
+		"""
+		pending: list[ShopReceipt] = []
+		batch_payments: dict[int, Payment] = {}  # `payments` only holds those of the current page
+		last: tuple[int, int] | None = None  # offset and ID of the last record of the batch
+
+		def flush():
+			if pending:
+				batch = PostingBatch()
+				with journal.phase("posting"):
+					batch.dispatch(self.name, partition(pending, jobs), batch_payments)
+					counts = batch.wait()
+				for outcome, n in counts.items():
+					journal.count(outcome, n)
+				pending.clear()
+				batch_payments.clear()
+			if checkpoint and last:
+				checkpoint.advance(window, last[0] + 1, last[1])
+				frappe.db.commit()
 
-				customer.flags.ignore_mandatory = True
-				customer.save()
+		for offset, receipt in records:
+			last = (offset, receipt.receipt_id)
+			if cstr(receipt.receipt_id) in existing:
+				journal.count("skipped")
+				continue
+			pending.append(receipt)
+			if receipt.receipt_id in payments:
+				batch_payments[receipt.receipt_id] = payments[receipt.receipt_id]
+			if len(pending) >= POSTING_BATCH_SIZE:
+				flush()
+		flush()
+
+	def import_receipt_by_id(self, receipt_id: int) -> SyncRunJournal:
+		"""Fetches and imports a single receipt, e.g. after Etsy sent a webhook for it."""
+		with SyncRunJournal(self.name, "Receipts", trigger="Webhook") as journal:
+			if frappe.db.exists("Sales Order", {"etsy_order_id": cstr(receipt_id)}):
+				journal.count("skipped")
+				return journal
+
+			self.preflight()
+			api = EtsyAPI(self, journal=journal)
+			receipt = api.getShopReceipt(self.shop_id, receipt_id)
+			payment = None
+			if self.payment_fee_account and receipt.is_paid:
+				_count, payments = api.getShopPaymentByReceiptId(self.shop_id, receipt_id)
+				payment = payments[0] if payments else None
 
-				### Address
-				if address_name := frappe.db.exists("Address", f"{customer.name}-Billing"):
-					address = frappe.get_doc("Address", address_name)
-				else:
-					address = frappe.new_doc("Address")
-
-				address.address_title = customer.name
-				address.address_type = "Billing"
-				address.address_line1 = receipt.first_line
-				address.address_line2 = receipt.second_line
-				address.city = receipt.city
-				address.state = receipt.state
-				address.pincode = receipt.zip
-				address.country = frappe.db.get_value("Country", {"code": receipt.country_iso.lower()})
-				address.email_id = receipt.buyer_email
-				address.is_primary_address = 1
-				address.is_shipping_address = 1
-
-				address.append("links", {"link_doctype": "Customer", "link_name": customer.name})
+			try:
+				with buyer_lock(self.name, receipt.buyer_user_id):
+					self.import_receipt(receipt, api, payment)
+					with journal.phase("commit"):
+						frappe.db.commit()
+				journal.count("created")
+			except Exception:
+				frappe.db.rollback()
+				journal.count("failed")
+				frappe.log_error(f"Etsy: Failed to import receipt {receipt_id}")
+
+		return journal
 
+	def import_receipt(self, receipt: ShopReceipt, api: EtsyAPI, payment: Payment | None = None):
+		"""
+		Creates Customer, Address, Contact, Sales Order, Sales Invoice and Payment Entry for a single receipt.
+		With `payment` and a 'Payment Fee Account', the Etsy fees are deducted on the Payment Entry.
+		The caller is responsible for committing or rolling back.
+		"""
+		### Customer
+		with api.phase("customer"):
+			if customer_name := frappe.db.exists("Customer", {"etsy_customer_id": receipt.buyer_user_id}):
+				customer = frappe.get_doc("Customer", customer_name)
+			else:
+				customer = frappe.new_doc("Customer")
+				if naming_series := self.customer_naming_series:
+					customer.naming_series = str(naming_series).replace(
+						"{ETSY_BUYER_ID}", str(receipt.buyer_user_id)
+					)
+				customer.etsy_customer_id = receipt.buyer_user_id
+
+			changed = update_doc(
+				customer,
+				{
+					"customer_name": receipt.name,
+					"customer_type": self.customer_type or "Individual",
+					"customer_group": self.customer_group
+					or frappe.defaults.get_global_default("customer_group"),
+				},
+			)
+			if customer.is_new():  # the Address and Contact link to it
+				customer.flags.ignore_mandatory = True
+				customer.insert()
+				changed = False
+
+			### Address
+			if address_name := frappe.db.exists("Address", f"{customer.name}-Billing"):
+				address = frappe.get_doc("Address", address_name)
+			else:
+				address = frappe.new_doc("Address")
+
+			address_changed = update_doc(
+				address,
+				{
+					"address_title": customer.name,
+					"address_type": "Billing",
+					**receipt_address(receipt),
+					"email_id": receipt.buyer_email,
+					"is_primary_address": 1,
+					"is_shipping_address": 1,
+				},
+			)
+			address_changed |= ensure_row(
+				address, "links", {"link_doctype": "Customer", "link_name": customer.name}
+			)
+			if address_changed:
 				address.flags.ignore_mandatory = True
 				address.save()
 
-				### Contact - makes no sense without email address
-				if receipt.buyer_email:
-					if contact_name := frappe.db.exists(
-						"Contact", {"etsy_customer_id": receipt.buyer_user_id}
-					):
-						contact = frappe.get_doc("Contact", contact_name)
-					else:
-						contact = frappe.new_doc("Contact")
-						contact.etsy_customer_id = receipt.buyer_user_id
-
-					contact.first_name = receipt.name.split(" ", 1)[0]
-					contact.last_name = receipt.name.split(" ", 1)[-1]
-					contact.email_id = receipt.buyer_email
-					contact.add_email(receipt.buyer_email, is_primary=1)
-					contact.is_primary_contact = 1
-					contact.is_billing_contact = 1
-
-					contact.append("links", {"link_doctype": "Customer", "link_name": customer.name})
-
+			### Contact - makes no sense without email address
+			if receipt.buyer_email:
+				if contact_name := frappe.db.exists("Contact", {"etsy_customer_id": receipt.buyer_user_id}):
+					contact = frappe.get_doc("Contact", contact_name)
+				else:
+					contact = frappe.new_doc("Contact")
+					contact.etsy_customer_id = receipt.buyer_user_id
+
+				contact_changed = update_doc(
+					contact,
+					{
+						"first_name": receipt.name.split(" ", 1)[0],
+						"last_name": receipt.name.split(" ", 1)[-1],
+						"email_id": receipt.buyer_email,
+						"is_primary_contact": 1,
+						"is_billing_contact": 1,
+					},
+				)
+				contact_changed |= ensure_row(contact, "email_ids", {"email_id": receipt.buyer_email})
+				for email in contact.email_ids:  # only the current email address is primary
+					is_primary = int(email.email_id == receipt.buyer_email)
+					if email.is_primary != is_primary:
+						email.is_primary = is_primary
+						contact_changed = True
+				contact_changed |= ensure_row(
+					contact, "links", {"link_doctype": "Customer", "link_name": customer.name}
+				)
+				if contact_changed:
 					contact.flags.ignore_mandatory = True
 					contact.save()
 
-					# update customer - only if contact is created
-					customer.customer_primary_address = address.name
-					customer.customer_primary_contact = contact.name
-					customer.save()
+				# update customer - only if contact is created
+				changed |= update_doc(
+					customer,
+					{"customer_primary_address": address.name, "customer_primary_contact": contact.name},
+				)
 
-				### Sales Order
-				sales_order: Document = frappe.new_doc("Sales Order")
-				if naming_series := self.sales_order_naming_series:
-					sales_order.naming_series = str(naming_series).replace(
-						"{ETSY_ORDER_ID}", str(receipt.receipt_id)
-					)
-				sales_order.etsy_order_id = sales_order.po_no = receipt.receipt_id
-				sales_order.customer = customer
-				sales_order.company = self.company
-
-				sales_order.transaction_date = sales_order.po_date = receipt.created_timestamp.date()
-				sales_order.delivery_date = max(
-					[t.expected_ship_date.date() for t in receipt.transactions if t.expected_ship_date]
-					+ [receipt.create_timestamp.date()]
+			if changed:
+				customer.flags.ignore_mandatory = True
+				customer.save()
+
+		### Sales Order
+		with api.phase("sales_order"):
+			sales_order: Document = frappe.new_doc("Sales Order")
+			if naming_series := self.sales_order_naming_series:
+				sales_order.naming_series = str(naming_series).replace(
+					"{ETSY_ORDER_ID}", str(receipt.receipt_id)
 				)
+			sales_order.etsy_order_id = sales_order.po_no = receipt.receipt_id
+			sales_order.update(order_state(receipt))
+			sales_order.customer = customer
+			sales_order.company = self.company
+
+			sales_order.transaction_date = sales_order.po_date = receipt.created_timestamp.date()
+			sales_order.delivery_date = max(
+				[t.expected_ship_date.date() for t in receipt.transactions if t.expected_ship_date]
+				+ [receipt.create_timestamp.date()]
+			)
 
-				# Items
-				for transaction in receipt.transactions:
-					if item_name := frappe.db.exists("Item", {"etsy_product_id": transaction.product_id}):
-						item = frappe.get_doc("Item", item_name)
-					else:
+			# Items
+			for transaction in receipt.transactions:
+				if item_name := frappe.db.exists("Item", {"etsy_product_id": transaction.product_id}):
+					item = frappe.get_doc("Item", item_name)
+				else:
+					with api.phase("item"):
 						item = frappe.new_doc("Item")
 						item.item_code = f"{transaction.product_id}"
 						item.etsy_product_id = cstr(transaction.product_id)
@@ -444,136 +1277,512 @@ class EtsyShop(Document):
 						item.item_group = self.item_group or frappe.defaults.get_global_default("item_group")
 						item.stock_uom = self.stock_uom or frappe.defaults.get_global_default("stock_uom")
 						item.is_stock_item = 1 - int(transaction.is_digital)
-						item.image = (
-							api.rest.getListingImage(
-								api.client, transaction.listing_id, transaction.listing_image_id
+						with api.phase("http"):
+							item.image = (
+								api.rest.getListingImage(
+									api.client, transaction.listing_id, transaction.listing_image_id
+								)
+								.json()
+								.get("url_170x135")
 							)
-							.json()
-							.get("url_170x135")
-						)
 						item.flags.ignore_mandatory = True
 						item.save()
 
-					sales_order_item = {
-						"item_code": item.name,
-						"item_name": item.item_name,
-						"delivery_date": transaction.expected_ship_date.date()
-						if transaction.expected_ship_date
-						else sales_order.delivery_date,
-						"uom": item.stock_uom,
-						"qty": transaction.quantity,
-						"rate": transaction.price.as_float(),
-						"description": "".join(
-							[
-								f"<b>{v.formatted_name}:</b> {v.formatted_value}<br>"
-								for v in transaction.variations
-							]
-						),
-					}
-					# Cost Center
-					cost_center = (
-						self.cost_center_digital if transaction.is_digital else self.cost_center_physical
-					)
-					if cost_center:
-						sales_order_item["cost_center"] = cost_center
-
-					# Warehouse (physical items only)
-					if not transaction.is_digital and self.warehouse:
-						sales_order_item["warehouse"] = self.warehouse
-
-					sales_order.append("items", sales_order_item)
-
-				# VAT and Shipping
-				# Note: total_tax_cost (US/non-EU marketplace facilitator tax) is intentionally excluded —
-				# Etsy collects and remits it directly and deducts it from the seller's payout, so it is
-				# never the seller's revenue and must not appear as a receivable.
-				if self.vat_account and receipt.total_vat_cost.as_float() > 0.0:
-					sales_order.append(
-						"taxes",
-						{
-							"charge_type": "Actual",
-							"account_head": self.vat_account,
-							"tax_amount": receipt.total_vat_cost.as_float(),
-							"description": "VAT Total",
-						},
-					)
-				if receipt.total_shipping_cost.as_float() > 0.0:
-					sales_order.append(
-						"taxes",
-						{
-							"charge_type": "Actual",
-							"account_head": self.shipping_income_account,
-							"tax_amount": receipt.total_shipping_cost.as_float(),
-							"description": "Shipping Cost",
-						},
-					)
-				if receipt.gift_wrap_price.as_float() > 0.0:
-					sales_order.append(
-						"taxes",
-						{
-							"charge_type": "Actual",
-							"account_head": self.shipping_income_account,
-							"tax_amount": receipt.gift_wrap_price.as_float(),
-							"description": "Gift Wrap",
-						},
+				sales_order_item = {
+					"item_code": item.name,
+					"item_name": item.item_name,
+					"delivery_date": transaction.expected_ship_date.date()
+					if transaction.expected_ship_date
+					else sales_order.delivery_date,
+					"uom": item.stock_uom,
+					"qty": transaction.quantity,
+					"rate": transaction.price.as_float(),
+					"description": "".join(
+						[
+							f"<b>{v.formatted_name}:</b> {v.formatted_value}<br>"
+							for v in transaction.variations
+						]
+					),
+				}
+				# Cost Center
+				cost_center = (
+					self.cost_center_digital if transaction.is_digital else self.cost_center_physical
+				)
+				if cost_center:
+					sales_order_item["cost_center"] = cost_center
+
+				# Warehouse (physical items only)
+				if not transaction.is_digital and self.warehouse:
+					sales_order_item["warehouse"] = self.warehouse
+
+				sales_order.append("items", sales_order_item)
+
+			# VAT and Shipping
+			# Note: total_tax_cost (US/non-EU marketplace facilitator tax) is intentionally excluded —
+			# Etsy collects and remits it directly and deducts it from the seller's payout, so it is
+			# never the seller's revenue and must not appear as a receivable.
+			if self.vat_account and receipt.total_vat_cost.as_float() > 0.0:
+				sales_order.append(
+					"taxes",
+					{
+						"charge_type": "Actual",
+						"account_head": self.vat_account,
+						"tax_amount": receipt.total_vat_cost.as_float(),
+						"description": "VAT Total",
+					},
+				)
+			if receipt.total_shipping_cost.as_float() > 0.0:
+				sales_order.append(
+					"taxes",
+					{
+						"charge_type": "Actual",
+						"account_head": self.shipping_income_account,
+						"tax_amount": receipt.total_shipping_cost.as_float(),
+						"description": "Shipping Cost",
+					},
+				)
+			if receipt.gift_wrap_price.as_float() > 0.0:
+				sales_order.append(
+					"taxes",
+					{
+						"charge_type": "Actual",
+						"account_head": self.shipping_income_account,
+						"tax_amount": receipt.gift_wrap_price.as_float(),
+						"description": "Gift Wrap",
+					},
+				)
+
+			# Discount
+			if receipt.discount_amt.as_float() > 0.0:
+				sales_order.discount_amount = receipt.discount_amt.as_float()
+				sales_order.apply_discount_on = "Grand Total"
+
+			sales_order.flags.ignore_mandatory = True
+			sales_order.insert(ignore_permissions=True)
+			sales_order.submit()
+
+		### Sales Invoice
+		with api.phase("sales_invoice"):
+			sales_invoice: Document = make_sales_invoice(sales_order.name)
+			if naming_series := self.sales_invoice_naming_series:
+				sales_invoice.naming_series = str(naming_series).replace(
+					"{ETSY_ORDER_ID}", str(receipt.receipt_id)
+				)
+			sales_invoice.etsy_order_id = receipt.receipt_id
+			sales_invoice.set_posting_time = 1
+			sales_invoice.posting_date = receipt.created_timestamp.date()
+			sales_invoice.due_date = receipt.created_timestamp.date()
+
+			# Income Accounts
+			if self.income_account_physical or self.income_account_digital:
+				for invoice_item in sales_invoice.items:
+					is_stock = frappe.db.get_value("Item", invoice_item.item_code, "is_stock_item")
+					income_account = (
+						self.income_account_digital if not is_stock else self.income_account_physical
 					)
+					if income_account:
+						invoice_item.income_account = income_account
+
+			# Discount Account
+			if self.discount_account and sales_invoice.discount_amount:
+				sales_invoice.discount_account = self.discount_account
+
+			sales_invoice.insert(ignore_permissions=True)
+			sales_invoice.submit()
+
+		### Payment
+		with api.phase("payment_entry"):
+			if receipt.is_paid:
+				self.create_payment_entry(sales_invoice.name, receipt, payment)
+
+				# close Sales Order if is_shipped or everything is_digital
+				if receipt.is_shipped or all([t.is_digital for t in receipt.transactions]):
+					close_or_unclose_sales_orders(f'["{sales_order.name}"]', "Closed")
+
+		### Refunds
+		if self.refunds_start_date and receipt.refunds:
+			self.credit_refunds(receipt, sales_invoice.name, api)
+
+	def create_payment_entry(
+		self, sales_invoice: str, receipt: ShopReceipt, payment: Payment | None = None
+	) -> Document:
+		"""Books the payment of `receipt` against `sales_invoice`, less the Etsy fees of `payment`."""
+		payment_entry: Document = get_payment_entry(
+			"Sales Invoice", sales_invoice, bank_account=self.bank_account
+		)
+		payment_entry.reference_no = sales_invoice
+		payment_entry.posting_date = receipt.created_timestamp.date()
+		payment_entry.reference_date = receipt.created_timestamp.date()
+		if payment:
+			self.deduct_payment_fees(payment_entry, payment)
+		payment_entry.insert(ignore_permissions=True)
+		payment_entry.submit()
+		return payment_entry
+
+	def deduct_payment_fees(self, payment_entry: Document, payment: Payment):
+		"""
+		Books the Etsy fees of `payment` as a deduction, so the Payment Entry receives the net amount.
+		Skipped if the payment is not in the company currency, the Payment Entry would need exchange rates.
+		"""
+		fees = payment.amount_fees.as_float()
+		company_currency = frappe.get_cached_value("Company", self.company, "default_currency")
+		if (
+			not fees
+			or payment.currency != company_currency
+			or payment_entry.paid_to_account_currency != company_currency
+		):
+			return
 
-				# Discount
-				if receipt.discount_amt.as_float() > 0.0:
-					sales_order.discount_amount = receipt.discount_amt.as_float()
-					sales_order.apply_discount_on = "Grand Total"
+		payment_entry.paid_amount = payment_entry.received_amount = flt(payment_entry.paid_amount - fees, 2)
+		payment_entry.base_paid_amount = payment_entry.base_received_amount = payment_entry.paid_amount
+		payment_entry.append(
+			"deductions",
+			{
+				"account": self.payment_fee_account,
+				"cost_center": self.payment_fee_cost_center
+				or frappe.get_cached_value("Company", self.company, "cost_center"),
+				"amount": fees,
+				"description": f"Etsy fees of payment {payment.payment_id}",
+			},
+		)
 
-				sales_order.flags.ignore_mandatory = True
-				sales_order.insert(ignore_permissions=True)
-				sales_order.submit()
+	def import_receipt_changes(self, etsy_api: EtsyAPI | None = None) -> SyncRunJournal:
+		"""
+		Applies the receipts that changed since 'Receipt changes synced until' to their Sales Orders, see
+		`update_order`, and with 'Sync Refunds from' creates Credit Notes for their refunds.
+		Receipts are fetched by `min_last_modified`, oldest change first, so unchanged receipts are never
+		fetched again. Each batch of 100 receipts is committed together with the watermark.
+		A receipt or refund that fails is rolled back alone and logged, the watermark moves past it.
+		It is applied again with the next change of the receipt.
+		"""
+		with SyncRunJournal(self.name, "Receipt Changes") as journal:
+			start = self.receipt_changes_synced_until
+			if not start:  # first sync: the recent changes, and every refund to credit
+				start = min(
+					getdate(add_days(today(), -RECEIPT_CHANGES_LOOKBACK)),
+					getdate(self.refunds_start_date or today()),
+				)
 
-				### Sales Invoice
-				sales_invoice: Document = make_sales_invoice(sales_order.name)
-				if naming_series := self.sales_invoice_naming_series:
-					sales_invoice.naming_series = str(naming_series).replace(
-						"{ETSY_ORDER_ID}", str(receipt.receipt_id)
+			api = etsy_api or EtsyAPI(self, journal=journal)
+			min_last_modified = max(int(get_datetime(start).timestamp()), 946684800)
+			# receipts changed during the sync would shift the pages, they follow with the next sync
+			snapshot = now_datetime().replace(microsecond=0)
+
+			receipts = fetch_all(
+				journal.paged(
+					lambda o: api.getShopReceipts(
+						QP_getShopReceipts(
+							shop_id=self.shop_id,
+							min_last_modified=min_last_modified,
+							max_last_modified=int(snapshot.timestamp()),
+							sort_on="updated",
+							sort_order="asc",
+							limit=100,
+							offset=o,
+						)
 					)
-				sales_invoice.etsy_order_id = receipt.receipt_id
-				sales_invoice.set_posting_time = 1
-				sales_invoice.posting_date = receipt.created_timestamp.date()
-				sales_invoice.due_date = receipt.created_timestamp.date()
-
-				# Income Accounts
-				if self.income_account_physical or self.income_account_digital:
-					for invoice_item in sales_invoice.items:
-						is_stock = frappe.db.get_value("Item", invoice_item.item_code, "is_stock_item")
-						income_account = (
-							self.income_account_digital if not is_stock else self.income_account_physical
+				),
+				key=lambda receipt: cstr(receipt.receipt_id),
+			)
+			for batch in create_batch(receipts, 100):
+				try:
+					orders = {
+						order.etsy_order_id: order
+						for order in frappe.get_all(
+							"Sales Order",
+							filters={
+								"etsy_order_id": ("in", [cstr(r.receipt_id) for r in batch]),
+								"docstatus": 1,
+							},
+							fields=ORDER_STATE_FIELDS,
 						)
-						if income_account:
-							invoice_item.income_account = income_account
+					}
+					with journal.phase("order_update"):
+						for receipt in batch:
+							order = orders.get(cstr(receipt.receipt_id))
+							if not order:
+								journal.count("skipped")  # receipt not imported
+								continue
+							frappe.db.savepoint(RECEIPT_CHANGE_SAVEPOINT)
+							try:
+								updated = self.update_order(receipt, order, api)
+							except Exception:
+								frappe.db.rollback(save_point=RECEIPT_CHANGE_SAVEPOINT)
+								journal.count("failed")
+								frappe.log_error(
+									f"Etsy: Failed to apply changes of receipt {receipt.receipt_id}"
+								)
+								continue
+							journal.count("updated" if updated else "skipped")
+
+					if refunded := [r for r in batch if r.refunds and self.refunds_start_date]:
+						invoices = dict(
+							frappe.get_all(
+								"Sales Invoice",
+								filters={
+									"etsy_order_id": ("in", [cstr(r.receipt_id) for r in refunded]),
+									"docstatus": 1,
+								},
+								fields=["etsy_order_id", "name"],
+								as_list=True,
+							)
+						)
+						with journal.phase("credit_note"):
+							for receipt in refunded:
+								if sales_invoice := invoices.get(cstr(receipt.receipt_id)):
+									for outcome, n in self.credit_refunds(
+										receipt, sales_invoice, api
+									).items():
+										journal.count(outcome, n)
+					# watermark
+					self.db_set(
+						"receipt_changes_synced_until", batch[-1].updated_timestamp, update_modified=False
+					)
+					with journal.phase("commit"):
+						frappe.db.commit()
+				except Exception:
+					frappe.db.rollback()
+					journal.count("failed", len(batch))
+					frappe.log_error(f"Etsy: Failed to import receipt changes for shop {self.name}")
+					return journal  # keep the watermark, the next run retries this batch
 
-				# Discount Account
-				if self.discount_account and sales_invoice.discount_amount:
-					sales_invoice.discount_account = self.discount_account
+			self.db_set("receipt_changes_synced_until", snapshot, update_modified=False)
+			frappe.db.commit()
 
-				sales_invoice.insert(ignore_permissions=True)
-				sales_invoice.submit()
+		return journal
 
-				### Payment
-				if receipt.is_paid:
-					payment_entry: Document = get_payment_entry(
-						sales_invoice.doctype, sales_invoice.name, bank_account=self.bank_account
-					)
-					payment_entry.reference_no = sales_invoice.name
-					payment_entry.posting_date = receipt.created_timestamp.date()
-					payment_entry.reference_date = receipt.created_timestamp.date()
-					payment_entry.insert(ignore_permissions=True)
-					payment_entry.submit()
+	def update_order(self, receipt: ShopReceipt, order: frappe._dict, api: EtsyAPI) -> bool:
+		"""
+		Applies the changes of `receipt` to its submitted Sales Order, given as a row of `ORDER_STATE_FIELDS`.
+		The state stored at the import is compared field by field and only the differences are written:
+		billing address, shipments, Etsy status, a payment that arrived later and closing.
+		The order is neither loaded nor resubmitted. Returns whether anything but the timestamp changed.
+		The caller is responsible for committing or rolling back.
+		"""
+		if order.etsy_last_modified and get_datetime(order.etsy_last_modified) >= receipt.updated_timestamp:
+			return False
+
+		state = order_state(receipt)
+		changes = {field: value for field, value in state.items() if cstr(order.get(field)) != cstr(value)}
+		changed = bool(changes.keys() - {"etsy_last_modified"})
+
+		### Address - shared by the customer's orders, only the latest order may change it
+		address = order.customer_address or frappe.db.exists("Address", f"{order.customer}-Billing")
+		if address:
+			stored = frappe.db.get_value("Address", address, list(ADDRESS_FIELDS), as_dict=True) or {}
+			address_changes = {
+				field: value
+				for field, value in receipt_address(receipt).items()
+				if cstr(stored.get(field)) != cstr(value)
+			}
+			if address_changes and order.name == latest_order_of(order.customer):
+				with api.phase("address"):
+					frappe.db.set_value("Address", address, address_changes)
+					changes["address_display"] = get_address_display(address)
+				changed = True
+
+		### Payment
+		if receipt.is_paid and order.etsy_status not in PAID_STATUSES:
+			sales_invoice = frappe.db.get_value(
+				"Sales Invoice",
+				{"etsy_order_id": cstr(receipt.receipt_id), "docstatus": 1, "outstanding_amount": (">", 0)},
+			)
+			if sales_invoice:
+				payment = None
+				if self.payment_fee_account:
+					_count, payments = api.getShopPaymentByReceiptId(self.shop_id, receipt.receipt_id)
+					payment = payments[0] if payments else None
+				with api.phase("payment_entry"):
+					self.create_payment_entry(sales_invoice, receipt, payment)
+				changed = True
+
+		frappe.db.set_value("Sales Order", order.name, changes, update_modified=changed)
+
+		### Closing
+		if (
+			receipt.is_paid
+			and (receipt.is_shipped or all(t.is_digital for t in receipt.transactions))
+			and order.status not in ("Closed", "Completed")
+		):
+			close_or_unclose_sales_orders(f'["{order.name}"]', "Closed")
+			changed = True
 
-					# close Sales Order if is_shipped or everything is_digital
-					if receipt.is_shipped or all([t.is_digital for t in receipt.transactions]):
-						close_or_unclose_sales_orders(f'["{sales_order.name}"]', "Closed")
+		return changed
 
-				frappe.db.commit()
+	def credit_refunds(self, receipt: ShopReceipt, sales_invoice: str, api: EtsyAPI) -> dict[str, int]:
+		"""
+		Creates a Credit Note against `sales_invoice` for every refund of `receipt` that has none yet,
+		keyed by `refund_key`. A refund that fails is rolled back alone and logged.
+		The caller is responsible for committing. Returns the number of created, skipped and failed refunds.
+		"""
+		counts = {"created": 0, "skipped": 0, "failed": 0}
+		keys = {refund_key(receipt.receipt_id, refund): refund for refund in receipt.refunds}
+		credited = set(
+			frappe.get_all(
+				"Sales Invoice", filters={"etsy_refund_key": ("in", list(keys))}, pluck="etsy_refund_key"
+			)
+		)
+		for key, refund in sorted(keys.items(), key=lambda item: item[1].created_timestamp):
+			if key in credited or refund.created_timestamp.date() < getdate(self.refunds_start_date):
+				counts["skipped"] += 1
+				continue
+			frappe.db.savepoint(RECEIPT_CHANGE_SAVEPOINT)
+			try:
+				with api.phase("credit_note"):
+					self.create_credit_note(sales_invoice, refund, key)
 			except Exception:
-				frappe.db.rollback()
-				frappe.log_error(f"Etsy: Failed to import receipt {receipt.receipt_id}")
+				frappe.db.rollback(save_point=RECEIPT_CHANGE_SAVEPOINT)
+				counts["failed"] += 1
+				frappe.log_error(f"Etsy: Failed to credit refund {key}")
+				continue
+			counts["created"] += 1
+		return counts
+
+	def create_credit_note(self, sales_invoice: str, refund: Refund, key: str) -> Document:
+		"""
+		Books `refund` as a return of `sales_invoice`. A refund of the whole invoice returns all items,
+		a partial refund credits every item and charge in proportion to the refunded amount.
+		If the invoice was paid, the refund is paid out from the Bank Account (the Etsy balance).
+		"""
+		invoice = frappe.get_doc("Sales Invoice", sales_invoice)
+		amount = refund.amount.as_float()
+		credit_note: Document = make_sales_return(sales_invoice)
+		credit_note.etsy_order_id = None  # unique, stays with the invoice
+		credit_note.etsy_refund_key = key
+		credit_note.set_posting_time = 1
+		credit_note.posting_date = credit_note.due_date = refund.created_timestamp.date()
+		credit_note.update_outstanding_for_self = (
+			1  # the refund's Payment Entry is made against the Credit Note
+		)
+		credit_note.remarks = refund.reason or refund.note_from_issuer
+
+		if abs(amount - invoice.grand_total) >= 0.01 or frappe.db.exists(
+			"Sales Invoice", {"return_against": sales_invoice, "is_return": 1, "docstatus": 1}
+		):
+			# standalone, so the quantities of the invoice remain returnable by a refund of the whole invoice
+			ratio = amount / invoice.grand_total if invoice.grand_total else 0
+			sources = {item.name: item for item in invoice.items}
+			credit_note.return_against = None
+			for item in credit_note.items:
+				source = sources[item.sales_invoice_item]
+				item.qty, item.stock_qty = -source.qty, -source.stock_qty
+				item.price_list_rate = flt(source.price_list_rate * ratio, item.precision("rate"))
+				item.rate = flt(source.rate * ratio, item.precision("rate"))
+			for tax in credit_note.taxes:
+				tax.tax_amount = flt(tax.tax_amount * ratio, tax.precision("tax_amount"))
+			credit_note.discount_amount = flt(credit_note.discount_amount * ratio)
+
+		credit_note.insert(ignore_permissions=True)
+		credit_note.submit()
+
+		if self.bank_account and flt(invoice.outstanding_amount) < flt(invoice.grand_total):
+			payment_entry: Document = get_payment_entry(
+				credit_note.doctype, credit_note.name, bank_account=self.bank_account
+			)
+			payment_entry.reference_no = credit_note.name
+			payment_entry.posting_date = payment_entry.reference_date = refund.created_timestamp.date()
+			payment_entry.insert(ignore_permissions=True)
+			payment_entry.submit()
+
+		return credit_note
+
+	def import_ledger(self, until: str | None = None, etsy_api: EtsyAPI | None = None) -> SyncRunJournal:
+		"""
+		Books the payment account ledger from 'Ledger imported until' (or 'Import Ledger from') up to,
+		but excluding, `until` (default: today) as one Journal Entry per day and account.
+		Entries are fetched in windows of whole days; each window is committed together with the watermark,
+		so an interrupted import continues with the first unbooked window.
+		"""
+		with SyncRunJournal(self.name, "Ledger") as journal:
+			start = self.ledger_imported_until or self.ledger_start_date
+			if not start:
+				return journal
+
+			api = etsy_api or EtsyAPI(self, journal=journal)
+			accounts = {row.ledger_type.strip().lower(): row.account for row in self.ledger_accounts}
+			cost_centers = {row.account: row.cost_center for row in reversed(self.ledger_accounts)}
+			default_cost_center = frappe.get_cached_value("Company", self.company, "cost_center")
+
+			for window_start, window_end in date_windows(
+				getdate(start), getdate(until or today()), LEDGER_WINDOW_DAYS
+			):
+				min_created, max_created = window_timestamps(window_start, window_end)
+				aggregate = LedgerAggregate()
+				for entry in fetch_all(
+					journal.paged(
+						lambda o: api.getShopPaymentAccountLedgerEntries(
+							QP_getShopPaymentAccountLedgerEntries(
+								shop_id=self.shop_id,
+								min_created=min_created,
+								max_created=max_created,
+								limit=100,
+								offset=o,
+							)
+						)
+					),
+					key=lambda entry: entry.entry_id,
+				):
+					aggregate.add(entry)
+
+				days = aggregate.by_account(accounts)
+				try:
+					with journal.phase("journal_entry"):
+						for (day, account), totals in days.items():
+							self.post_ledger_day(
+								day, account, totals, cost_centers.get(account) or default_cost_center
+							)
+					# watermark
+					self.db_set("ledger_imported_until", window_end, update_modified=False)
+					with journal.phase("commit"):
+						frappe.db.commit()
+					journal.count("created", len(days))
+					journal.count("skipped", aggregate.unmapped(accounts))
+				except Exception:
+					frappe.db.rollback()
+					journal.count("failed", len(days))
+					frappe.log_error(
+						f"Etsy: Failed to import ledger from {window_start} for shop {self.name}"
+					)
+					break  # keep the watermark, the next run retries this window
+
+		return journal
+
+	def post_ledger_day(
+		self, day: datetime.date, account: str, totals: dict[str, list[int]], cost_center: str | None
+	) -> Document | None:
+		"""Books the summed ledger entries of one day and account against the Bank Account (the Etsy balance)."""
+		amount = flt(sum(amount for amount, _ in totals.values()) / 100, 2)
+		if not amount:
+			return None
+
+		journal_entry: Document = frappe.new_doc("Journal Entry")
+		journal_entry.company = self.company
+		journal_entry.posting_date = journal_entry.cheque_date = day
+		journal_entry.cheque_no = f"Etsy Ledger {self.shop_id} {day}"
+		journal_entry.user_remark = "Etsy ledger: " + ", ".join(
+			f"{ledger_type} ({entries})" for ledger_type, (_, entries) in totals.items()
+		)
+		# positive amounts were credited to the Etsy balance, negative amounts (fees, payouts) taken from it
+		journal_entry.append(
+			"accounts",
+			{
+				"account": self.bank_account,
+				"debit_in_account_currency": max(amount, 0),
+				"credit_in_account_currency": max(-amount, 0),
+			},
+		)
+		journal_entry.append(
+			"accounts",
+			{
+				"account": account,
+				"debit_in_account_currency": max(-amount, 0),
+				"credit_in_account_currency": max(amount, 0),
+				"cost_center": cost_center,
+			},
+		)
+		journal_entry.insert(ignore_permissions=True)
+		journal_entry.submit()
+		return journal_entry
 
 
 ### background job entry points for enqueued imports
@@ -593,6 +1802,34 @@ def run_import_listings(user, etsy_shop, listing_state="active", include_attribu
 	)
 
 
+def run_import_ledger(user, etsy_shop):
+	shop: EtsyShop = frappe.get_doc("Etsy Shop", etsy_shop)
+	shop.import_ledger()
+	frappe.publish_realtime(
+		"msgprint",
+		{
+			"message": _("Etsy ledger import completed for {0}.").format(etsy_shop),
+			"indicator": "green",
+			"alert": True,
+		},
+		user=user,
+	)
+
+
+def run_import_receipt_changes(user, etsy_shop):
+	shop: EtsyShop = frappe.get_doc("Etsy Shop", etsy_shop)
+	shop.import_receipt_changes()
+	frappe.publish_realtime(
+		"msgprint",
+		{
+			"message": _("Etsy receipt changes synced for {0}.").format(etsy_shop),
+			"indicator": "green",
+			"alert": True,
+		},
+		user=user,
+	)
+
+
 def run_import_receipts(user, etsy_shop, min_date=None, max_date=None):
 	shop: EtsyShop = frappe.get_doc("Etsy Shop", etsy_shop)
 	shop.import_receipts(min_date=min_date, max_date=max_date)
@@ -607,6 +1844,13 @@ def run_import_receipts(user, etsy_shop, min_date=None, max_date=None):
 	)
 
 
+def run_import_receipt(etsy_shop, receipt_id):
+	# queued by the webhook receiver, i.e. as Guest, who may not create Customers, Addresses or Items
+	frappe.set_user("Administrator")
+	shop: EtsyShop = frappe.get_doc("Etsy Shop", etsy_shop)
+	shop.import_receipt_by_id(int(receipt_id))
+
+
 ### public functions
 @frappe.whitelist(
 	methods=["GET"], allow_guest=True
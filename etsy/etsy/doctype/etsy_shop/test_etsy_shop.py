@@ -1,12 +1,31 @@
+from contextlib import nullcontext
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
 import frappe
+from frappe.model.document import Document
+from frappe.utils import get_datetime
 
 try:
 	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
 except ImportError:
 	from frappe.tests.utils import FrappeTestCase  # Frappe v15
 
+from etsy.benchmarks.fixtures import SyntheticShop
+from etsy.datastruct import Inventory, Listing, MonetaryAmount, OrderStatus, Refund, ShopReceipt
 from etsy.etsy.doctype.etsy_shop.etsy_shop import (
+	EtsyConfigurationError,
+	EtsyShop,
+	ensure_row,
+	inventory_update,
+	listing_prices,
+	listing_quantities,
+	order_state,
+	price_differences,
+	refund_key,
 	short_title,
+	stock_differences,
+	update_doc,
 )
 
 
@@ -45,3 +64,478 @@ class TestShortTitle(FrappeTestCase):
 
 	def test_strips_whitespace(self):
 		self.assertEqual(short_title("  Hello World  , more stuff"), "Hello World")
+
+
+class TestRefundKey(FrappeTestCase):
+	"""Tests for the refund_key utility function."""
+
+	def refund(self, amount: int, created: int = 1_700_000_000) -> Refund:
+		return Refund.model_validate(
+			{
+				"amount": {"amount": amount, "divisor": 100, "currency_code": "EUR"},
+				"created_timestamp": created,
+				"reason": None,
+				"note_from_issuer": None,
+				"status": "OK",
+			}
+		)
+
+	def test_same_refund_same_key(self):
+		self.assertEqual(refund_key(42, self.refund(1250)), refund_key(42, self.refund(1250)))
+		self.assertEqual(refund_key(42, self.refund(1250)), "42:1700000000:1250")
+
+	def test_distinct_refunds(self):
+		keys = {
+			refund_key(42, self.refund(1250)),
+			refund_key(42, self.refund(1250, created=1_700_000_060)),  # refunded twice
+			refund_key(42, self.refund(500)),
+			refund_key(43, self.refund(1250)),
+		}
+		self.assertEqual(len(keys), 4)
+
+
+class TestReceiptChanges(FrappeTestCase):
+	"""Tests for the order updates and Credit Notes of receipt changes, on imported receipts."""
+
+	def setUp(self):
+		self.company = frappe.db.get_value(
+			"Company",
+			{"default_income_account": ("is", "set"), "default_cash_account": ("is", "set")},
+			["name", "default_currency", "default_income_account", "default_cash_account"],
+			as_dict=True,
+		)
+		if not self.company:
+			self.skipTest("Needs a company with default income and cash accounts")
+
+		# a commit of the sync is a savepoint and its rollback returns to it, the test rolls back everything
+		self.addCleanup(frappe.db.rollback)
+		rollback = frappe.db.rollback
+		for name, side_effect in (
+			("commit", lambda: frappe.db.savepoint("etsy_test_commit")),
+			(
+				"rollback",
+				lambda save_point=None, **kwargs: rollback(save_point=save_point or "etsy_test_commit"),
+			),
+		):
+			patcher = patch.object(frappe.db, name, side_effect=side_effect)
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+		self.shop = frappe.get_doc(
+			{
+				"doctype": "Etsy Shop",
+				"shop_name": "_Test Refund Credit",
+				"shop_id": "1",
+				"company": self.company.name,
+				"shipping_income_account": self.company.default_income_account,
+				"bank_account": self.company.default_cash_account,
+				"refunds_start_date": "2000-01-01",
+			}
+		).insert(ignore_permissions=True, ignore_mandatory=True)
+		self.api = MagicMock()
+		self.api.phase.return_value = nullcontext()
+		self.api.rest.getListingImage.return_value.json.return_value = {"url_170x135": None}
+		frappe.db.commit()
+
+	def import_receipt(self, seed: int) -> tuple[ShopReceipt, Document]:
+		"""Imports a paid receipt without refunds, returns it with its Sales Invoice."""
+		fixtures = SyntheticShop(
+			1,
+			seed=seed,
+			id_offset=42_000_000 + seed,
+			distributions={
+				"transactions_per_receipt": {2: 1},
+				"currencies": {self.company.default_currency: 1},
+				"refund_ratio": 0,
+			},
+		)
+		receipt = ShopReceipt.model_validate(fixtures.receipt(0))
+		self.shop.import_receipt(receipt, self.api)
+		frappe.db.commit()
+		invoice = frappe.db.get_value("Sales Invoice", {"etsy_order_id": str(receipt.receipt_id)})
+		return receipt, frappe.get_doc("Sales Invoice", invoice)
+
+	def refund(self, receipt: ShopReceipt, amount: float, days: int) -> Refund:
+		return Refund.model_validate(
+			{
+				"amount": {
+					"amount": round(amount * 100),
+					"divisor": 100,
+					"currency_code": self.company.default_currency,
+				},
+				"created_timestamp": int(receipt.created_timestamp.timestamp()) + days * 86400,
+				"reason": "Damaged in transit",
+				"note_from_issuer": None,
+				"status": "OK",
+			}
+		)
+
+	def credit_notes(self, invoice: Document) -> list[Document]:
+		names = frappe.get_all(
+			"Sales Invoice",
+			filters={"etsy_refund_key": ("like", f"{invoice.etsy_order_id}:%"), "docstatus": 1},
+			order_by="etsy_refund_key asc",
+			pluck="name",
+		)
+		return [frappe.get_doc("Sales Invoice", name) for name in names]
+
+	def refund_payments(self, credit_note: Document) -> int:
+		return frappe.db.count(
+			"Payment Entry Reference", {"reference_name": credit_note.name, "docstatus": 1}
+		)
+
+	def test_partial_then_remaining_refund(self):
+		receipt, invoice = self.import_receipt(seed=1)
+		partial = self.refund(receipt, invoice.grand_total * 0.3, days=2)
+		remaining = self.refund(receipt, invoice.grand_total - partial.amount.as_float(), days=4)
+
+		receipt.refunds = [partial]
+		self.assertEqual(
+			self.shop.credit_refunds(receipt, invoice.name, self.api), {"created": 1, "skipped": 0}
+		)
+		[credit_note] = self.credit_notes(invoice)
+
+		# standalone, the items of the invoice remain returnable
+		ratio = partial.amount.as_float() / invoice.grand_total
+		self.assertTrue(credit_note.is_return)
+		self.assertFalse(credit_note.return_against)
+		self.assertEqual(credit_note.etsy_refund_key, refund_key(receipt.receipt_id, partial))
+		for item, source in zip(credit_note.items, invoice.items, strict=True):
+			self.assertEqual(item.qty, -source.qty)
+			self.assertAlmostEqual(item.rate, source.rate * ratio, delta=0.01)
+		for tax, source in zip(credit_note.taxes, invoice.taxes, strict=True):
+			self.assertAlmostEqual(tax.tax_amount, -source.tax_amount * ratio, delta=0.01)
+		self.assertAlmostEqual(credit_note.grand_total, -partial.amount.as_float(), delta=0.05)
+		self.assertEqual(self.refund_payments(credit_note), 1)  # the invoice was paid
+
+		receipt.refunds = [partial, remaining]
+		self.assertEqual(
+			self.shop.credit_refunds(receipt, invoice.name, self.api), {"created": 1, "skipped": 1}
+		)
+		credit_notes = self.credit_notes(invoice)
+		self.assertEqual(len(credit_notes), 2)
+		self.assertAlmostEqual(sum(cn.grand_total for cn in credit_notes), -invoice.grand_total, delta=0.05)
+		self.assertTrue(all(self.refund_payments(cn) == 1 for cn in credit_notes))
+
+		# credited refunds are skipped, e.g. by the next sync of the receipt
+		payments = frappe.db.count("Payment Entry", {"docstatus": 1})
+		self.assertEqual(
+			self.shop.credit_refunds(receipt, invoice.name, self.api), {"created": 0, "skipped": 2}
+		)
+		self.assertEqual(len(self.credit_notes(invoice)), 2)
+		self.assertEqual(frappe.db.count("Payment Entry", {"docstatus": 1}), payments)
+
+	def test_full_refund_returns_invoice(self):
+		receipt, invoice = self.import_receipt(seed=2)
+		receipt.refunds = [self.refund(receipt, invoice.grand_total, days=1)]
+
+		self.shop.credit_refunds(receipt, invoice.name, self.api)
+
+		[credit_note] = self.credit_notes(invoice)
+		self.assertEqual(credit_note.return_against, invoice.name)
+		self.assertEqual([item.qty for item in credit_note.items], [-item.qty for item in invoice.items])
+		self.assertAlmostEqual(credit_note.grand_total, -invoice.grand_total, delta=0.01)
+		self.assertEqual(self.refund_payments(credit_note), 1)
+
+	@patch("etsy.etsy.doctype.etsy_shop.etsy_shop.frappe.log_error")
+	def test_failed_refund_is_isolated(self, log_error):
+		failing, failing_invoice = self.import_receipt(seed=3)
+		receipt, invoice = self.import_receipt(seed=6)
+		for refunded, refunded_invoice in ((failing, failing_invoice), (receipt, invoice)):
+			refunded.refunds = [self.refund(refunded, refunded_invoice.grand_total * 0.5, days=3)]
+		self.api.getShopReceipts.return_value = (2, [failing, receipt])
+		self.shop.db_set("receipt_changes_synced_until", "2001-01-01 00:00:00", update_modified=False)
+		frappe.db.commit()
+
+		create_credit_note = EtsyShop.create_credit_note
+
+		def credit_or_fail(shop, sales_invoice, refund, key):
+			if sales_invoice == failing_invoice.name:
+				raise frappe.ValidationError("Accounting period is closed")
+			return create_credit_note(shop, sales_invoice, refund, key)
+
+		with patch.object(EtsyShop, "create_credit_note", autospec=True, side_effect=credit_or_fail):
+			journal = self.shop.import_receipt_changes(etsy_api=self.api)
+
+		self.assertEqual((journal.counts["failed"], journal.counts["created"]), (1, 1))
+		log_error.assert_called_once()
+		self.assertIn(refund_key(failing.receipt_id, failing.refunds[0]), log_error.call_args.args[0])
+		self.assertEqual(len(self.credit_notes(failing_invoice)), 0)
+		self.assertEqual(len(self.credit_notes(invoice)), 1)
+		self.assertGreater(
+			get_datetime(frappe.db.get_value("Etsy Shop", self.shop.name, "receipt_changes_synced_until")),
+			failing.updated_timestamp,
+		)
+
+		# with the next change of the receipts, only the failed refund is credited
+		journal = self.shop.import_receipt_changes(etsy_api=self.api)
+		self.assertEqual((journal.counts["created"], journal.counts["failed"]), (1, 0))
+		self.assertEqual(len(self.credit_notes(failing_invoice)), 1)
+		self.assertEqual(len(self.credit_notes(invoice)), 1)
+
+	@patch("etsy.etsy.doctype.etsy_shop.etsy_shop.frappe.log_error")
+	def test_failed_order_update_is_isolated(self, log_error):
+		failing, _invoice = self.import_receipt(seed=4)
+		receipt, _invoice = self.import_receipt(seed=5)
+		for changed in (failing, receipt):
+			changed.status = OrderStatus.COMPLETED
+			changed.updated_timestamp += timedelta(hours=1)
+		self.api.getShopReceipts.return_value = (2, [failing, receipt])
+		self.shop.db_set("receipt_changes_synced_until", "2001-01-01 00:00:00", update_modified=False)
+		frappe.db.commit()
+
+		update_order = EtsyShop.update_order
+
+		def update_or_fail(shop, receipt, order, api):
+			if receipt is failing:  # fails after a write, which must be rolled back
+				frappe.db.set_value("Sales Order", order.name, "etsy_status", "written before failure")
+				raise frappe.ValidationError("Invalid shipment")
+			return update_order(shop, receipt, order, api)
+
+		with patch.object(EtsyShop, "update_order", autospec=True, side_effect=update_or_fail):
+			journal = self.shop.import_receipt_changes(etsy_api=self.api)
+
+		self.assertEqual((journal.counts["failed"], journal.counts["updated"]), (1, 1))
+		log_error.assert_called_once()
+		self.assertIn(str(failing.receipt_id), log_error.call_args.args[0])
+
+		def status(receipt: ShopReceipt) -> str:
+			return frappe.db.get_value(
+				"Sales Order", {"etsy_order_id": str(receipt.receipt_id)}, "etsy_status"
+			)
+
+		self.assertEqual(status(receipt), "completed")
+		self.assertNotEqual(status(failing), "written before failure")
+		self.assertGreater(
+			get_datetime(frappe.db.get_value("Etsy Shop", self.shop.name, "receipt_changes_synced_until")),
+			failing.updated_timestamp,
+		)
+
+
+class TestBackfillRange(FrappeTestCase):
+	@patch("etsy.etsy.doctype.etsy_shop.etsy_shop.create_backfill")
+	@patch("etsy.etsy.doctype.etsy_shop.etsy_shop.EtsyAPI")
+	def test_starts_at_oldest_receipt(self, api, create_backfill):
+		receipt = ShopReceipt.model_validate(SyntheticShop(1).receipt(0))
+		api.return_value.getShopReceipts.return_value = (250, [receipt])
+		shop = frappe.get_doc({"doctype": "Etsy Shop", "shop_name": "_Test Backfill Range", "shop_id": "1"})
+
+		with patch.object(EtsyShop, "preflight"), patch.object(EtsyShop, "get_auth_header"):
+			shop.enqueue_import_receipts(max_date="2025-06-30")
+
+		query = api.return_value.getShopReceipts.call_args.args[0]
+		self.assertEqual((query.limit, query.sort_on, query.sort_order), (1, "created", "asc"))
+		create_backfill.assert_called_once_with(
+			shop.name, str(receipt.created_timestamp.date()), "2025-06-30"
+		)
+
+
+class TestOrderState(FrappeTestCase):
+	"""Tests for the order_state utility function."""
+
+	def test_state_of_shipped_receipt(self):
+		receipt = SyntheticShop(1).receipt(0)
+		receipt.update(
+			status="completed",
+			is_shipped=True,
+			shipments=[
+				{
+					"receipt_shipping_id": 1,
+					"shipment_notification_timestamp": receipt["updated_timestamp"],
+					"carrier_name": "DHL",
+					"tracking_code": "00340434161094000000",
+				}
+			],
+		)
+		state = order_state(ShopReceipt.model_validate(receipt))
+
+		self.assertEqual(state["etsy_status"], "completed")
+		self.assertEqual(state["etsy_shipments"], "DHL: 00340434161094000000")
+		self.assertEqual(int(state["etsy_last_modified"].timestamp()), receipt["updated_timestamp"])
+
+	def test_unchanged_receipt_has_same_state(self):
+		receipt = SyntheticShop(1).receipt(0)
+		self.assertEqual(
+			order_state(ShopReceipt.model_validate(receipt)), order_state(ShopReceipt.model_validate(receipt))
+		)
+
+
+class TestStockLevels(FrappeTestCase):
+	"""Tests for the listing_quantities and stock_differences utility functions."""
+
+	def test_quantities_of_enabled_products(self):
+		listing = SyntheticShop(1, distributions={"variants_per_listing": {3: 1}}).listing(0)
+		products = listing["inventory"]["products"]
+		products[1]["offerings"][0]["is_enabled"] = False
+		products[2]["is_deleted"] = True
+
+		quantities = listing_quantities(Listing.model_validate(listing))
+
+		self.assertEqual(
+			quantities, {str(products[0]["product_id"]): products[0]["offerings"][0]["quantity"]}
+		)
+
+	def test_only_differences(self):
+		rows = [
+			frappe._dict(item_code="A", etsy_product_id="1", actual_qty=5, reserved_qty=0, valuation_rate=2),
+			frappe._dict(item_code="B", etsy_product_id="2", actual_qty=7, reserved_qty=2, valuation_rate=3),
+			frappe._dict(item_code="C", etsy_product_id="3", actual_qty=None, item_valuation_rate=None),
+		]
+		differences = stock_differences({"1": 4, "2": 5, "3": 1}, rows)
+
+		self.assertEqual(
+			differences,
+			[
+				{"item_code": "A", "qty": 4, "valuation_rate": 2, "allow_zero_valuation_rate": 0},
+				{"item_code": "C", "qty": 1, "valuation_rate": 0, "allow_zero_valuation_rate": 1},
+			],
+		)
+
+
+class TestItemPrices(FrappeTestCase):
+	"""Tests for the listing_prices and price_differences utility functions."""
+
+	def price(self, amount: int, currency: str = "EUR") -> MonetaryAmount:
+		return MonetaryAmount.model_validate({"amount": amount, "divisor": 100, "currency_code": currency})
+
+	def test_prices_of_enabled_products(self):
+		listing = SyntheticShop(1, distributions={"variants_per_listing": {2: 1}}).listing(0)
+		products = listing["inventory"]["products"]
+		products[1]["offerings"][0]["is_deleted"] = True
+
+		prices = listing_prices(Listing.model_validate(listing))
+
+		self.assertEqual(list(prices), [str(products[0]["product_id"])])
+		self.assertEqual(
+			prices[str(products[0]["product_id"])].amount, products[0]["offerings"][0]["price"]["amount"]
+		)
+
+	def test_only_differences(self):
+		rows = [
+			frappe._dict(
+				item_code="A", item_name="A", etsy_product_id="1", item_price="p1", price_list_rate=12.5
+			),
+			frappe._dict(
+				item_code="B", item_name="B", etsy_product_id="2", item_price="p2", price_list_rate=10
+			),
+			frappe._dict(item_code="C", item_name="C", etsy_product_id="3", item_price=None),
+			frappe._dict(item_code="D", item_name="D", etsy_product_id="4", item_price=None),
+		]
+		prices = {
+			"1": self.price(1250),
+			"2": self.price(1199),
+			"3": self.price(500),
+			"4": self.price(500, "USD"),
+		}
+
+		new, changed = price_differences(prices, rows, "EUR")
+
+		self.assertEqual(new, [{"item_code": "C", "item_name": "C", "price_list_rate": 5.0}])
+		self.assertEqual(changed, {"p2": {"price_list_rate": 11.99}})
+
+
+class TestInventoryUpdate(FrappeTestCase):
+	"""Tests for the inventory_update utility function."""
+
+	def setUp(self):
+		listing = SyntheticShop(1, distributions={"variants_per_listing": {3: 1}}).listing(0)
+		self.inventory = Inventory.model_validate({"listing": None, **listing["inventory"]})
+		self.product_ids = [str(product.product_id) for product in self.inventory.products]
+
+	def test_unchanged_quantities(self):
+		quantities = {
+			product_id: product.offerings[0].quantity
+			for product_id, product in zip(self.product_ids, self.inventory.products, strict=True)
+		}
+		self.assertIsNone(inventory_update(self.inventory, quantities))
+		self.assertIsNone(inventory_update(self.inventory, {}))
+
+	def test_sets_quantities_and_keeps_the_rest(self):
+		self.inventory.products[2].is_deleted = True
+
+		body = inventory_update(self.inventory, {self.product_ids[0]: 5000, self.product_ids[2]: 1})
+
+		self.assertEqual(len(body["products"]), 2)
+		first, second = body["products"]
+		self.assertEqual(first["offerings"][0]["quantity"], 999)
+		self.assertEqual(
+			first["offerings"][0]["price"], self.inventory.products[0].offerings[0].price.as_float()
+		)
+		self.assertEqual(second["offerings"][0]["quantity"], self.inventory.products[1].offerings[0].quantity)
+		self.assertEqual(body["quantity_on_property"], self.inventory.quantity_on_property)
+
+
+class TestUpsert(FrappeTestCase):
+	"""Tests for the update_doc and ensure_row utility functions."""
+
+	def setUp(self):
+		self.contact = frappe.get_doc(
+			{
+				"doctype": "Contact",
+				"first_name": "Jane",
+				"email_ids": [{"email_id": "jane@example.com"}, {"email_id": "jane@example.com"}],
+				"links": [{"link_doctype": "Customer", "link_name": "Jane"}],
+			}
+		)  # not inserted, like a Contact loaded with `get_doc`
+
+	def test_update_doc_only_reports_changes(self):
+		self.assertFalse(update_doc(self.contact, {"first_name": "Jane", "last_name": None}))
+		self.assertTrue(update_doc(self.contact, {"first_name": "Janet"}))
+		self.assertEqual(self.contact.first_name, "Janet")
+
+	def test_ensure_row_appends_once(self):
+		link = {"link_doctype": "Customer", "link_name": "Jane"}
+		self.assertFalse(ensure_row(self.contact, "links", link))
+		self.assertTrue(ensure_row(self.contact, "links", {**link, "link_name": "Janet"}))
+		self.assertFalse(ensure_row(self.contact, "links", {**link, "link_name": "Janet"}))
+		self.assertEqual([row.link_name for row in self.contact.links], ["Jane", "Janet"])
+
+	def test_ensure_row_drops_duplicates(self):
+		self.assertTrue(ensure_row(self.contact, "email_ids", {"email_id": "jane@example.com"}))
+		self.assertEqual(
+			[(row.idx, row.email_id) for row in self.contact.email_ids], [(1, "jane@example.com")]
+		)
+
+
+class TestPreflight(FrappeTestCase):
+	"""Tests for the preflight validation of the accounting configuration."""
+
+	def setUp(self):
+		company = frappe.db.get_value(
+			"Company",
+			{"default_income_account": ("is", "set"), "default_cash_account": ("is", "set")},
+			["name", "default_income_account", "default_cash_account"],
+			as_dict=True,
+		)
+		if not company:
+			self.skipTest("Needs a company with default income and cash accounts")
+
+		self.shop = frappe.get_doc(
+			{
+				"doctype": "Etsy Shop",
+				"shop_name": "_Test Preflight",
+				"company": company.name,
+				"shipping_income_account": company.default_income_account,
+				"bank_account": company.default_cash_account,
+				"sales_order_naming_series": "EtsyOrder-{ETSY_ORDER_ID}",
+			}
+		)
+
+	def test_valid_configuration(self):
+		self.assertEqual(self.shop.preflight_errors(), [])
+		self.shop.preflight()
+
+	def test_all_problems_at_once(self):
+		self.shop.shipping_income_account = "_Test Missing Account"
+		self.shop.bank_account = None
+		self.shop.cost_center_physical = frappe.db.get_value(
+			"Cost Center", {"company": self.shop.company, "is_group": 1}
+		)
+		self.shop.sales_order_naming_series = "SO {ETSY_ORDER_ID} !"
+
+		errors = self.shop.preflight_errors()
+
+		self.assertEqual(len(errors), 3 + bool(self.shop.cost_center_physical))
+		self.assertTrue(any("_Test Missing Account" in error for error in errors))
+		with self.assertRaises(EtsyConfigurationError):
+			self.shop.preflight()
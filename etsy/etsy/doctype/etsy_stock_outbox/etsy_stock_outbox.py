@@ -0,0 +1,77 @@
+from collections import defaultdict
+
+import frappe
+from frappe.model.document import Document
+
+from etsy.api import CircuitBreaker, EtsyAPI, EtsyCircuitOpenError
+
+
+class EtsyStockOutbox(Document):
+	"""
+	A stock change of an Item of an Etsy listing, recorded in the transaction of its Stock Ledger Entry
+	by `record_stock_change`. `flush_stock_outbox` pushes the stock of each listing with changes
+	to Etsy once per run, however many changes it has, and then deletes them.
+	"""
+
+
+def record_stock_change(doc: Document, method: str | None = None):
+	"""Called on submit of a Stock Ledger Entry, see `doc_events` in hooks.py."""
+	if frappe.flags.etsy_stock_sync:  # the change comes from Etsy
+		return
+
+	item = frappe.get_cached_value("Item", doc.item_code, ["etsy_listing", "etsy_product_id"], as_dict=True)
+	if not (item and item.etsy_listing and item.etsy_product_id):
+		return
+	etsy_shop = frappe.get_cached_value("Etsy Listing", item.etsy_listing, "etsy_shop")
+	if not etsy_shop:
+		return
+	shop = frappe.get_cached_doc("Etsy Shop", etsy_shop)
+	if not shop.push_stock or doc.warehouse != shop.stock_warehouse:
+		return
+
+	outbox = frappe.new_doc("Etsy Stock Outbox")
+	outbox.update({"etsy_shop": etsy_shop, "etsy_listing": item.etsy_listing, "item_code": doc.item_code})
+	outbox.name = frappe.generate_hash(length=10)
+	outbox.db_insert()  # no validation, it runs within every stock transaction
+
+
+def flush_stock_outbox():
+	"""
+	This function will be executed every 5 minutes by the Scheduler. Pushes the stock of every listing
+	with recorded changes to Etsy with one inventory update. Changes recorded while a listing is pushed
+	are kept for the next run. Failed pushes are retried by the next run as well.
+	"""
+	if not frappe.db.get_single_value("Etsy Settings", "etsy_enabled"):
+		return
+
+	outbox = frappe.qb.DocType("Etsy Stock Outbox")
+	changes = defaultdict(lambda: defaultdict(list))  # outbox names by listing by shop
+	for row in (
+		frappe.qb.from_(outbox)
+		.select(outbox.name, outbox.etsy_shop, outbox.etsy_listing)
+		.orderby(outbox.creation)
+		.run(as_dict=True)
+	):
+		changes[row.etsy_shop][row.etsy_listing].append(row.name)
+
+	for etsy_shop, listings in changes.items():
+		shop = frappe.get_doc("Etsy Shop", etsy_shop)
+		if not shop.push_stock:  # pushing was disabled after the changes were recorded
+			frappe.db.delete("Etsy Stock Outbox", {"etsy_shop": etsy_shop})
+			frappe.db.commit()
+			continue
+		if shop.status != "Connected" or CircuitBreaker(etsy_shop).is_open():
+			continue
+
+		api = EtsyAPI(shop)
+		for listing_id, names in listings.items():
+			try:
+				shop.push_listing_stock(listing_id, api)
+				frappe.db.delete("Etsy Stock Outbox", {"name": ("in", names)})
+				frappe.db.commit()
+			except EtsyCircuitOpenError:
+				frappe.db.rollback()
+				break
+			except Exception:
+				frappe.db.rollback()
+				frappe.log_error(f"Etsy: Failed to push the stock of listing {listing_id}")
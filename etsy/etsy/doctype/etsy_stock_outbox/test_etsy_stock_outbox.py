@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+import frappe
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.etsy.doctype.etsy_shop.etsy_shop import EtsyShop
+from etsy.etsy.doctype.etsy_stock_outbox.etsy_stock_outbox import flush_stock_outbox
+
+
+@patch("etsy.etsy.doctype.etsy_stock_outbox.etsy_stock_outbox.EtsyAPI")
+@patch.object(EtsyShop, "push_listing_stock")
+class TestEtsyStockOutbox(FrappeTestCase):
+	def setUp(self):
+		rollback = frappe.db.rollback
+		for method in ("commit", "rollback"):  # keep the outbox in the test transaction
+			transaction = patch.object(frappe.db, method)
+			transaction.start()
+			self.addCleanup(transaction.stop)
+		self.addCleanup(rollback)
+
+		self.shop = frappe.get_doc(
+			{"doctype": "Etsy Shop", "shop_name": "_Test Outbox Shop", "status": "Connected", "push_stock": 1}
+		)
+		self.shop.insert(ignore_permissions=True, ignore_mandatory=True)
+		frappe.db.set_single_value("Etsy Settings", "etsy_enabled", 1)
+		for listing_id in ("1001", "1002"):
+			frappe.get_doc(
+				{"doctype": "Etsy Listing", "listing_id": listing_id, "etsy_shop": self.shop.name}
+			).insert(ignore_permissions=True, ignore_mandatory=True)
+
+	def record(self, *listings: str):
+		for listing_id in listings:
+			outbox = frappe.new_doc("Etsy Stock Outbox")
+			outbox.update({"etsy_shop": self.shop.name, "etsy_listing": listing_id})
+			outbox.name = frappe.generate_hash(length=10)
+			outbox.db_insert()
+
+	def test_one_push_per_listing(self, push_listing_stock, api):
+		self.record("1001", "1001", "1002", "1001")
+
+		flush_stock_outbox()
+
+		self.assertEqual(sorted(call.args[0] for call in push_listing_stock.call_args_list), ["1001", "1002"])
+		self.assertFalse(frappe.db.count("Etsy Stock Outbox", {"etsy_shop": self.shop.name}))
+
+	def test_failed_push_is_kept(self, push_listing_stock, api):
+		push_listing_stock.side_effect = lambda listing_id, api: listing_id == "1002" and 1 / 0
+		self.record("1001", "1002", "1002")
+
+		with patch("etsy.etsy.doctype.etsy_stock_outbox.etsy_stock_outbox.frappe.log_error") as log_error:
+			flush_stock_outbox()
+
+		log_error.assert_called_once()
+		self.assertEqual(
+			frappe.get_all("Etsy Stock Outbox", {"etsy_shop": self.shop.name}, pluck="etsy_listing"),
+			["1002", "1002"],
+		)
@@ -0,0 +1,203 @@
+import threading
+import time
+import traceback
+from collections.abc import Callable
+from contextlib import contextmanager
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import now_datetime
+
+from etsy.profiling import RunProfiler, claim_profiling_run
+from etsy.query_recorder import QueryRecorder
+
+RECORD_OUTCOMES = ("created", "updated", "skipped", "failed")
+
+
+class EtsySyncRun(Document):
+	@staticmethod
+	def clear_old_logs(days: int = 90):
+		"""Called by Log Settings, see `default_log_clearing_doctypes` in hooks.py."""
+		from frappe.query_builder import Interval
+		from frappe.query_builder.functions import Now
+
+		run = frappe.qb.DocType("Etsy Sync Run")
+		phase = frappe.qb.DocType("Etsy Sync Run Phase")
+		old_runs = frappe.qb.from_(run).select(run.name).where(run.creation < (Now() - Interval(days=days)))
+
+		# profiles attached by SyncRunJournal
+		file = frappe.qb.DocType("File")
+		for name in (
+			frappe.qb.from_(file)
+			.select(file.name)
+			.where((file.attached_to_doctype == "Etsy Sync Run") & file.attached_to_name.isin(old_runs))
+			.run(pluck=True)
+		):
+			frappe.delete_doc("File", name, ignore_permissions=True)
+
+		frappe.db.delete(phase, filters=phase.parent.isin(old_runs))
+		frappe.db.delete(run, filters=run.creation < (Now() - Interval(days=days)))
+
+
+class SyncRunJournal:
+	"""
+	Collects the counters and per-phase timings of one import run in memory
+	and writes them as a single `Etsy Sync Run` when the run finishes.
+	With `record_queries` (or 'Etsy Settings > Record SQL Queries' for profiled runs),
+	the SQL queries of the run are counted by statement type and table.
+
+	### Usage example:
+	```
+	with SyncRunJournal(shop.name, "Receipts") as journal:
+	    with journal.phase("sales_order"):
+	        ...
+	    journal.count("created")
+	```
+	"""
+
+	def __init__(self, etsy_shop: str, kind: str, record_queries: bool = False, trigger: str = "Manual"):
+		self.etsy_shop = etsy_shop
+		self.kind = kind
+		self.trigger = trigger
+		self.started_at = now_datetime()
+		self.pages_fetched = 0
+		self.counts = dict.fromkeys(RECORD_OUTCOMES, 0)
+		self.phases: dict[str, list] = {}  # phase -> [seconds, calls]
+		self.sync_run: Document | None = None
+		self.profiler: RunProfiler | None = None
+		self.query_recorder = QueryRecorder() if record_queries else None
+		self._start = time.perf_counter()
+		self._lock = threading.Lock()
+		self._local = threading.local()
+
+	def __enter__(self) -> "SyncRunJournal":
+		if claim_profiling_run(self.etsy_shop):
+			self.start_profiler()
+			if not self.query_recorder and frappe.db.get_single_value("Etsy Settings", "record_queries"):
+				self.query_recorder = QueryRecorder()
+		if self.query_recorder:
+			self.query_recorder.start()
+		return self
+
+	def __exit__(self, exc_type, exc, tb):
+		self.finish(error="".join(traceback.format_exception(exc_type, exc, tb)) if exc else None)
+		return False
+
+	### collecting
+	@contextmanager
+	def phase(self, name: str):
+		"""Times a block as `name`. Time spent in a nested phase is only attributed to the innermost phase."""
+		stack = self._local.__dict__.setdefault("stack", [])
+		now = time.perf_counter()
+		if stack:
+			self._add(stack[-1][0], now - stack[-1][1], calls=0)
+		stack.append([name, now])
+		try:
+			yield
+		finally:
+			now = time.perf_counter()
+			_, start = stack.pop()
+			self._add(name, now - start)
+			if stack:
+				stack[-1][1] = now
+
+	def _add(self, name: str, seconds: float, calls: int = 1):
+		with self._lock:
+			entry = self.phases.setdefault(name, [0.0, 0])
+			entry[0] += seconds
+			entry[1] += calls
+
+	def count(self, outcome: str, n: int = 1):
+		with self._lock:
+			self.counts[outcome] += n
+
+	def paged(self, fetch_func: Callable) -> Callable:
+		"""Wraps a `fetch_all` page function to count the fetched pages."""
+
+		def wrapper(offset: int):
+			with self._lock:
+				self.pages_fetched += 1
+			return fetch_func(offset)
+
+		return wrapper
+
+	### profiling
+	def start_profiler(self):
+		try:
+			self.profiler = RunProfiler()
+			self.profiler.start()
+		except Exception:
+			self.profiler = None
+			frappe.log_error(f"Etsy: Failed to start profiler for shop {self.etsy_shop}")
+
+	def attach_profile(self):
+		frappe.get_doc(
+			{
+				"doctype": "File",
+				"file_name": f"{self.sync_run.name}-{self.profiler.filename}",
+				"attached_to_doctype": self.sync_run.doctype,
+				"attached_to_name": self.sync_run.name,
+				"content": self.profiler.content,
+				"is_private": 1,
+			}
+		).insert(ignore_permissions=True)
+
+	### writing
+	def finish(self, error: str | None = None) -> Document:
+		"""Writes the journal as `Etsy Sync Run`. Failures to write are logged but never raised."""
+		duration = time.perf_counter() - self._start
+		if self.profiler:
+			self.profiler.stop()
+		if self.query_recorder:
+			self.query_recorder.stop()
+		records = sum(self.counts.values())
+		phases = sorted(self.phases.items(), key=lambda p: p[1][0], reverse=True)
+		unaccounted = duration - sum(seconds for _, (seconds, _) in phases)
+
+		try:
+			if error:
+				frappe.db.rollback()
+
+			self.sync_run = frappe.get_doc(
+				{
+					"doctype": "Etsy Sync Run",
+					"etsy_shop": self.etsy_shop,
+					"kind": self.kind,
+					"trigger": self.trigger,
+					"status": "Failed" if error else "Completed",
+					"started_at": self.started_at,
+					"finished_at": now_datetime(),
+					"duration": duration,
+					"pages_fetched": self.pages_fetched,
+					**{f"records_{outcome}": n for outcome, n in self.counts.items()},
+					"phases": [
+						{
+							"phase": name,
+							"seconds": seconds,
+							"calls": calls,
+							"share": 100 * seconds / duration if duration else 0,
+						}
+						for name, (seconds, calls) in [*phases, ("unaccounted", (max(0.0, unaccounted), 0))]
+					],
+					"error": error,
+					"profile_summary": self.profiler.summary if self.profiler else None,
+					**(self._query_fields(records) if self.query_recorder else {}),
+				}
+			)
+			self.sync_run.insert(ignore_permissions=True)
+			if self.profiler:
+				self.attach_profile()
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(f"Etsy: Failed to write sync run for shop {self.etsy_shop}")
+
+		return self.sync_run
+
+	def _query_fields(self, records: int) -> dict:
+		recorder = self.query_recorder
+		return {
+			"queries": recorder.total,
+			"queries_per_record": recorder.total / records if records else 0,
+			"query_summary": recorder.summary(records),
+		}
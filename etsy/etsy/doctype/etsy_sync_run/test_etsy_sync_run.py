@@ -0,0 +1,32 @@
+from unittest.mock import patch
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.etsy.doctype.etsy_sync_run.etsy_sync_run import SyncRunJournal
+
+
+class TestSyncRunJournal(FrappeTestCase):
+	def test_nested_phases_are_exclusive(self):
+		journal = SyncRunJournal("Test Shop", "Receipts")
+		clock = iter([0.0, 1.0, 3.0, 4.0])
+		with patch("etsy.etsy.doctype.etsy_sync_run.etsy_sync_run.time.perf_counter", lambda: next(clock)):
+			with journal.phase("sales_order"):
+				with journal.phase("http"):
+					pass
+
+		self.assertEqual(journal.phases["http"], [2.0, 1])
+		self.assertEqual(journal.phases["sales_order"], [2.0, 1])
+
+	def test_count_and_paged(self):
+		journal = SyncRunJournal("Test Shop", "Listings")
+		fetch = journal.paged(lambda offset: offset)
+		self.assertEqual(fetch(100), 100)
+		fetch(200)
+		journal.count("created")
+		journal.count("failed", 2)
+
+		self.assertEqual(journal.pages_fetched, 2)
+		self.assertEqual(journal.counts, {"created": 1, "updated": 0, "skipped": 0, "failed": 2})
@@ -34,7 +34,34 @@ etsy_custom_fields = {
 			"insert_after": "naming_series",
 			"read_only": 1,
 			"unique": 1,
-		}
+		},
+		{
+			"fieldname": "etsy_status",
+			"label": "Etsy Status",
+			"fieldtype": "Data",
+			"insert_after": "etsy_order_id",
+			"read_only": 1,
+			"allow_on_submit": 1,
+			"no_copy": 1,
+		},
+		{
+			"fieldname": "etsy_last_modified",
+			"label": "Etsy Last Modified",
+			"fieldtype": "Datetime",
+			"insert_after": "etsy_status",
+			"read_only": 1,
+			"allow_on_submit": 1,
+			"no_copy": 1,
+		},
+		{
+			"fieldname": "etsy_shipments",
+			"label": "Etsy Shipments",
+			"fieldtype": "Small Text",
+			"insert_after": "etsy_last_modified",
+			"read_only": 1,
+			"allow_on_submit": 1,
+			"no_copy": 1,
+		},
 	],
 	"Sales Invoice": [
 		{
@@ -44,7 +71,16 @@ etsy_custom_fields = {
 			"insert_after": "naming_series",
 			"read_only": 1,
 			"unique": 1,
-		}
+		},
+		{
+			"fieldname": "etsy_refund_key",
+			"label": "Etsy Refund",
+			"fieldtype": "Data",
+			"insert_after": "etsy_order_id",
+			"read_only": 1,
+			"unique": 1,
+			"no_copy": 1,
+		},
 	],
 	"Item": [
 		{
@@ -223,6 +259,12 @@ after_uninstall = "etsy.install.after_uninstall"
 # 	}
 # }
 
+doc_events = {
+	"Stock Ledger Entry": {
+		"on_submit": "etsy.etsy.doctype.etsy_stock_outbox.etsy_stock_outbox.record_stock_change",
+	},
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -244,6 +286,21 @@ after_uninstall = "etsy.install.after_uninstall"
 # 	],
 # }
 
+scheduler_events = {
+	"cron": {
+		"*/5 * * * *": [
+			"etsy.etsy.doctype.etsy_stock_outbox.etsy_stock_outbox.flush_stock_outbox",
+		],
+	},
+	"hourly": [
+		"etsy.etsy.doctype.etsy_import_checkpoint.etsy_import_checkpoint.resume_interrupted_imports",
+		"etsy.api.synchronise_receipt_changes",
+	],
+	"daily": [
+		"etsy.api.synchronise_ledger",
+	],
+}
+
 # Testing
 # -------
 
@@ -320,6 +377,12 @@ before_tests = "etsy.install.before_tests"
 # 	"Logging DocType Name": 30  # days to retain logs
 # }
 
+default_log_clearing_doctypes = {
+	"Etsy Sync Run": 90,
+	"Etsy Import Window": 90,
+	"Etsy Import Checkpoint": 90,
+}
+
 # Translation
 # ------------
 # List of apps whose translatable strings should be excluded from this app's translations.
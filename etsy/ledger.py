@@ -0,0 +1,43 @@
+from datetime import date, datetime, time
+
+from etsy.datastruct import LedgerEntry
+
+LEDGER_WINDOW_DAYS = 31  # days fetched and booked per window
+
+
+def window_timestamps(start: date, end: date) -> tuple[int, int]:
+	"""Returns `min_created` and `max_created` covering the days from `start` up to (excluding) `end`."""
+	return (
+		int(datetime.combine(start, time.min).timestamp()),
+		int(datetime.combine(end, time.min).timestamp()) - 1,
+	)
+
+
+class LedgerAggregate:
+	"""
+	Sums ledger entries per day and ledger type in memory, so a window of entries
+	can be booked as one Journal Entry per day and account.
+	Amounts are kept in the ledger's minor unit (cents).
+	"""
+
+	def __init__(self):
+		self.totals: dict[tuple[date, str], list[int]] = {}  # (day, ledger_type) -> [amount, entries]
+
+	def add(self, entry: LedgerEntry):
+		total = self.totals.setdefault((entry.created_timestamp.date(), entry.ledger_type), [0, 0])
+		total[0] += entry.amount
+		total[1] += 1
+
+	def by_account(self, accounts: dict[str, str]) -> dict[tuple[date, str], dict[str, list[int]]]:
+		"""Groups the totals by day and the account of their ledger type, oldest day first."""
+		grouped: dict[tuple[date, str], dict[str, list[int]]] = {}
+		for (day, ledger_type), total in sorted(self.totals.items()):
+			if account := accounts.get(ledger_type):
+				grouped.setdefault((day, account), {})[ledger_type] = total
+		return grouped
+
+	def unmapped(self, accounts: dict[str, str]) -> int:
+		"""Number of entries whose ledger type has no account."""
+		return sum(
+			entries for (_, ledger_type), (_, entries) in self.totals.items() if ledger_type not in accounts
+		)
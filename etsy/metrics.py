@@ -0,0 +1,164 @@
+import re
+import time
+from urllib.parse import urlsplit
+
+import frappe
+
+METRICS_KEY = "etsy:metrics"
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000)  # upper bounds in ms, anything above is "inf"
+HOURLY_TTL = 48 * 3600  # seconds the hourly throughput counters are kept
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+### Recording
+def endpoint_template(url: str) -> str:
+	"""
+	Returns the endpoint path of `url` with numeric IDs replaced by `{id}`,
+	e.g. `/v3/application/shops/{id}/receipts`.
+	"""
+	return _ID_SEGMENT.sub("/{id}", urlsplit(str(url)).path)
+
+
+def latency_bucket(elapsed_ms: float) -> str:
+	for bound in LATENCY_BUCKETS:
+		if elapsed_ms <= bound:
+			return str(bound)
+	return "inf"
+
+
+def record_request(url: str, status: int | str, elapsed: float, size: int = 0, from_cache: bool = False):
+	"""
+	Aggregates a single API request in Redis.
+	All counters are written in one pipelined round trip; failures are swallowed so metrics never break a sync.
+	"""
+	try:
+		cache = frappe.cache()
+		elapsed_ms = elapsed * 1000
+		endpoint = endpoint_template(url)
+		key = cache.make_key(f"{METRICS_KEY}:endpoint:{endpoint}")
+		hourly_key = cache.make_key(f"{METRICS_KEY}:hourly:{time.strftime('%Y%m%d%H')}")
+		is_error = not isinstance(status, int) or status >= 400
+
+		pipe = cache.pipeline(transaction=False)
+		pipe.sadd(cache.make_key(f"{METRICS_KEY}:endpoints"), endpoint)
+		pipe.hincrby(key, "requests", 1)
+		pipe.hincrby(key, f"status:{status}", 1)
+		pipe.hincrby(key, f"latency_le:{latency_bucket(elapsed_ms)}", 1)
+		pipe.hincrbyfloat(key, "latency_ms", elapsed_ms)
+		pipe.hincrby(key, "bytes", size)
+		pipe.hincrby(key, "cache_hit" if from_cache else "cache_miss", 1)
+		pipe.hincrby(hourly_key, "requests", 1)
+		pipe.hincrby(hourly_key, "errors", int(is_error))
+		pipe.hincrby(hourly_key, "cache_hit", int(from_cache))
+		pipe.hincrbyfloat(hourly_key, "latency_ms", elapsed_ms)
+		pipe.expire(hourly_key, HOURLY_TTL)
+		pipe.execute()
+	except Exception:
+		pass
+
+
+def record_wait(reason: str, seconds: float):
+	"""Aggregates time spent sleeping before a request, e.g. `rate_limit`, `retry` or `throttle`."""
+	try:
+		cache = frappe.cache()
+		key = cache.make_key(f"{METRICS_KEY}:waits")
+		pipe = cache.pipeline(transaction=False)
+		pipe.hincrby(key, f"{reason}:count", 1)
+		pipe.hincrbyfloat(key, f"{reason}:seconds", seconds)
+		pipe.execute()
+	except Exception:
+		pass
+
+
+### Reporting
+# Reads go through a raw pipeline as well: RedisWrapper's own hash helpers pickle their values.
+def _read(*keys: str, members: str | None = None) -> list:
+	cache = frappe.cache()
+	pipe = cache.pipeline(transaction=False)
+	if members:
+		pipe.smembers(cache.make_key(members))
+	for key in keys:
+		pipe.hgetall(cache.make_key(key))
+	return pipe.execute()
+
+
+def _decode(mapping: dict) -> dict:
+	return {
+		(k.decode() if isinstance(k, bytes) else k): float(v.decode() if isinstance(v, bytes) else v)
+		for k, v in mapping.items()
+	}
+
+
+def _percentile(histogram: dict[str, float], total: float, percentile: float) -> str | None:
+	"""Returns the upper bound (in ms) of the latency bucket containing `percentile`."""
+	if not total:
+		return None
+	running = 0.0
+	for bound in (*LATENCY_BUCKETS, "inf"):
+		running += histogram.get(str(bound), 0)
+		if running >= total * percentile:
+			return str(bound)
+	return "inf"
+
+
+def summarise_endpoint(endpoint: str, raw: dict) -> dict:
+	raw = _decode(raw)
+	requests = raw.get("requests", 0)
+	histogram = {k.split(":", 1)[1]: v for k, v in raw.items() if k.startswith("latency_le:")}
+	hits, misses = raw.get("cache_hit", 0), raw.get("cache_miss", 0)
+
+	return {
+		"endpoint": endpoint,
+		"requests": int(requests),
+		"status_codes": {k.split(":", 1)[1]: int(v) for k, v in raw.items() if k.startswith("status:")},
+		"avg_latency_ms": round(raw.get("latency_ms", 0) / requests, 1) if requests else None,
+		"p50_latency_ms": _percentile(histogram, requests, 0.50),
+		"p95_latency_ms": _percentile(histogram, requests, 0.95),
+		"latency_histogram": {k: int(v) for k, v in histogram.items()},
+		"bytes_received": int(raw.get("bytes", 0)),
+		"cache_hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+	}
+
+
+def get_hourly_metrics(hours: int = 24) -> list[dict]:
+	"""Returns the request counters of the last `hours` hours, oldest first."""
+	now = time.time()
+	slots = [time.localtime(now - i * 3600) for i in reversed(range(hours))]
+	raws = _read(*[f"{METRICS_KEY}:hourly:{time.strftime('%Y%m%d%H', hour)}" for hour in slots])
+
+	result = []
+	for hour, raw in zip(slots, raws, strict=True):
+		raw = _decode(raw)
+		requests = raw.get("requests", 0)
+		result.append(
+			{
+				"hour": time.strftime("%H:00", hour),
+				"requests": int(requests),
+				"errors": int(raw.get("errors", 0)),
+				"cache_hits": int(raw.get("cache_hit", 0)),
+				"avg_latency_ms": round(raw.get("latency_ms", 0) / requests, 1) if requests else 0,
+			}
+		)
+	return result
+
+
+@frappe.whitelist()
+def get_metrics() -> dict:
+	"""Returns the aggregated Etsy API metrics per endpoint, the waits and the hourly throughput."""
+	frappe.only_for("System Manager")
+	members, waits = _read(f"{METRICS_KEY}:waits", members=f"{METRICS_KEY}:endpoints")
+	endpoints = sorted(m.decode() if isinstance(m, bytes) else m for m in members)
+	raws = _read(*[f"{METRICS_KEY}:endpoint:{endpoint}" for endpoint in endpoints])
+
+	return {
+		"endpoints": [summarise_endpoint(e, raw) for e, raw in zip(endpoints, raws, strict=True)],
+		"waits": _decode(waits),
+		"hourly": get_hourly_metrics(),
+	}
+
+
+@frappe.whitelist(methods=["POST"])
+def reset_metrics():
+	frappe.only_for("System Manager")
+	frappe.cache().delete_keys(f"{METRICS_KEY}:")
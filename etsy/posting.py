@@ -0,0 +1,199 @@
+"""
+Parallel posting of imported receipts across background jobs.
+
+The receipts of a page are partitioned by buyer and every partition is posted by its own job on the
+`POSTING_QUEUE`. Importers that run at the same time, e.g. the windows of a backfill or a webhook import,
+may still meet the same buyer, so every receipt is posted under the `buyer_lock` of its buyer:
+the Customer, Address and Contact of a buyer are never written by two jobs at once.
+The importing job waits until all partitions have reported their counts through the Redis cache
+before it commits its checkpoint and continues with the next page.
+Set the number of jobs in `Etsy Settings > Parallel Posting Jobs`; 1 posts within the importing job.
+The importing job blocks its worker while it waits, so the `POSTING_QUEUE` needs workers of its own:
+with fewer than 2 workers on it, the receipts are posted within the importing job.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from typing import TYPE_CHECKING
+
+import frappe
+from frappe.utils import cint
+from frappe.utils.background_jobs import get_workers
+from redis.exceptions import LockError
+
+from .api import EtsyAPI, wait
+
+if TYPE_CHECKING:
+	from .datastruct import Payment, ShopReceipt
+	from .etsy.doctype.etsy_shop.etsy_shop import EtsyShop
+
+POSTING_QUEUE = "short"
+POSTING_MAX_JOBS = 8  # upper bound of `Etsy Settings > Parallel Posting Jobs`
+POSTING_BATCH_SIZE = 100  # receipts partitioned at a time, one page of `getShopReceipts`
+POSTING_TIMEOUT = 1800  # seconds the partitions of a batch may take until the import is interrupted
+POSTING_POLL_INTERVAL = 1.0  # seconds between two checks of the partitions' progress
+POSTING_RESULTS_EXPIRY = (
+	2 * POSTING_TIMEOUT
+)  # seconds the counts of a batch are kept, e.g. if its importer died
+BUYER_LOCK_TIMEOUT = 600  # seconds until the lock of a buyer expires, e.g. if its job was killed
+BUYER_LOCK_WAIT = 300  # seconds a receipt waits for the lock of its buyer until it fails
+
+
+class EtsyPostingTimeoutError(Exception):
+	"""Raised if not all partitions of a batch are posted within `POSTING_TIMEOUT`."""
+
+
+class EtsyBuyerLockedError(Exception):
+	"""Raised if another job holds the lock of a buyer for longer than `BUYER_LOCK_WAIT`."""
+
+
+def posting_jobs() -> int:
+	"""
+	Number of jobs that post the receipts of a batch, see `Etsy Settings > Parallel Posting Jobs`.
+	1 if fewer than 2 workers run the `POSTING_QUEUE`, one of them may be busy with the import itself.
+	"""
+	jobs = min(max(1, cint(frappe.db.get_single_value("Etsy Settings", "posting_jobs"))), POSTING_MAX_JOBS)
+	if jobs > 1 and len(get_workers(POSTING_QUEUE)) < 2:
+		return 1
+	return jobs
+
+
+def partition(receipts: list[ShopReceipt], partitions: int) -> list[list[ShopReceipt]]:
+	"""
+	Splits `receipts` into at most `partitions` non-empty lists. All receipts of a buyer are in the same
+	list, in their original order.
+	"""
+	buckets: list[list[ShopReceipt]] = [[] for _ in range(max(1, partitions))]
+	for receipt in receipts:
+		buckets[receipt.buyer_user_id % len(buckets)].append(receipt)
+	return [bucket for bucket in buckets if bucket]
+
+
+@contextmanager
+def buyer_lock(etsy_shop: str, buyer_user_id: int) -> Iterator[None]:
+	"""
+	Holds the lock of a buyer of `etsy_shop` in the Redis cache, shared by all workers.
+	Post and commit a receipt within it, so concurrent importers never write the same Customer.
+
+	### Usage example:
+	```
+	with buyer_lock(etsy_shop.name, receipt.buyer_user_id):
+	    etsy_shop.import_receipt(receipt, api)
+	    frappe.db.commit()
+	```
+	"""
+	cache = frappe.cache()
+	lock = cache.lock(
+		cache.make_key(f"etsy:buyer_lock:{etsy_shop}:{buyer_user_id}"),
+		timeout=BUYER_LOCK_TIMEOUT,
+		blocking_timeout=BUYER_LOCK_WAIT,
+	)
+	if not lock.acquire():
+		raise EtsyBuyerLockedError(
+			f"Etsy: Buyer {buyer_user_id} of shop {etsy_shop} is posted by another job"
+		)
+	try:
+		yield
+	finally:
+		with suppress(LockError):  # expired after `BUYER_LOCK_TIMEOUT`
+			lock.release()
+
+
+class PostingBatch:
+	"""
+	Aggregate progress of the partitions of one batch, shared by the posting jobs through the Redis cache.
+
+	### Usage example:
+	```
+	batch = PostingBatch()
+	batch.dispatch(etsy_shop.name, partition(receipts, 4), payments)
+	counts = batch.wait()  # {"created": 97, "failed": 3}
+	```
+	"""
+
+	def __init__(self, batch_id: str | None = None):
+		self.batch_id = batch_id or frappe.generate_hash(length=10)
+		self.key = f"etsy:posting:{self.batch_id}"
+		self.size = 0
+
+	def dispatch(self, etsy_shop: str, partitions: list[list[ShopReceipt]], payments: dict[int, Payment]):
+		"""Queues one posting job per partition, with the payments of its receipts."""
+		for index, receipts in enumerate(partitions):
+			frappe.enqueue(
+				"etsy.posting.run_post_partition",
+				queue=POSTING_QUEUE,
+				timeout=POSTING_TIMEOUT,
+				etsy_shop=etsy_shop,
+				batch_id=self.batch_id,
+				index=index,
+				receipts=receipts,
+				payments={r.receipt_id: payments[r.receipt_id] for r in receipts if r.receipt_id in payments},
+			)
+		self.size = len(partitions)
+
+	def report(self, index: int, counts: dict[str, int]):
+		cache = frappe.cache()
+		cache.hset(self.key, str(index), counts)
+		cache.expire(cache.make_key(self.key), POSTING_RESULTS_EXPIRY)  # late reports after a failed wait
+
+	def results(self) -> list[dict[str, int]]:
+		return list((frappe.cache().hgetall(self.key) or {}).values())
+
+	def wait(self, timeout: float = POSTING_TIMEOUT) -> dict[str, int]:
+		"""
+		Waits until all dispatched partitions have reported and returns their summed counts.
+		Raises `EtsyPostingTimeoutError` after `timeout` seconds, e.g. if no worker runs the `POSTING_QUEUE`.
+		The counts are removed from the cache either way.
+		"""
+		deadline = time.monotonic() + timeout
+		try:
+			while len(results := self.results()) < self.size:
+				if time.monotonic() > deadline:
+					raise EtsyPostingTimeoutError(
+						f"Etsy: {self.size - len(results)} of {self.size} posting jobs of batch {self.batch_id} did not finish"
+					)
+				wait("posting", POSTING_POLL_INTERVAL)
+		finally:
+			frappe.cache().delete_value(self.key)
+
+		totals = Counter()
+		for counts in results:
+			totals.update(counts)
+		return dict(totals)
+
+
+def post_receipts(
+	etsy_shop: EtsyShop, receipts: list[ShopReceipt], payments: dict[int, Payment], api: EtsyAPI
+) -> dict[str, int]:
+	"""Imports `receipts` one by one, each in its own transaction. Returns the created and failed counts."""
+	counts = {"created": 0, "failed": 0}
+	for receipt in receipts:
+		try:
+			with buyer_lock(etsy_shop.name, receipt.buyer_user_id):
+				etsy_shop.import_receipt(receipt, api, payments.get(receipt.receipt_id))
+				frappe.db.commit()
+			counts["created"] += 1
+		except Exception:
+			frappe.db.rollback()
+			counts["failed"] += 1
+			frappe.log_error(f"Etsy: Failed to import receipt {receipt.receipt_id}")
+	return counts
+
+
+def run_post_partition(
+	etsy_shop: str, batch_id: str, index: int, receipts: list[ShopReceipt], payments: dict[int, Payment]
+):
+	"""Posting job of one partition, see `PostingBatch.dispatch`. Always reports its counts to the batch."""
+	counts = {"created": 0, "failed": len(receipts)}
+	try:
+		shop: EtsyShop = frappe.get_doc("Etsy Shop", etsy_shop)
+		counts = post_receipts(shop, receipts, payments, EtsyAPI(shop))
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(f"Etsy: Failed to post partition {index} of batch {batch_id}")
+	finally:
+		PostingBatch(batch_id).report(index, counts)
@@ -0,0 +1,104 @@
+import cProfile
+import io
+import marshal
+import pstats
+from collections import defaultdict
+
+import frappe
+
+try:
+	from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+	SamplingProfiler = None
+
+SAMPLING_INTERVAL = 0.005  # seconds between samples
+SUMMARY_SIZE = 15  # number of functions listed in the summary
+
+
+def claim_profiling_run(etsy_shop: str) -> bool:
+	"""
+	Returns True if the next import run of `etsy_shop` should be profiled and decrements
+	'Etsy Settings > Profile next Runs'. Profiling is switched off once no runs are left.
+	"""
+	if not frappe.db.get_single_value("Etsy Settings", "profiling_enabled"):
+		return False
+
+	settings = frappe.get_single("Etsy Settings")
+	if settings.profiling_shop and settings.profiling_shop != etsy_shop:
+		return False
+
+	runs = max(0, settings.profiling_runs - 1)
+	frappe.db.set_single_value("Etsy Settings", {"profiling_runs": runs, "profiling_enabled": int(runs > 0)})
+	frappe.db.commit()
+	return True
+
+
+def format_summary(rows: list[tuple[str, float]], total: float) -> str:
+	"""Formats `(function, self seconds)` rows as a plain text table, slowest first."""
+	rows = sorted(rows, key=lambda r: r[1], reverse=True)[:SUMMARY_SIZE]
+	return "\n".join(
+		f"{100 * seconds / total if total else 0:5.1f}%  {seconds:8.3f}s  {function}"
+		for function, seconds in rows
+	)
+
+
+class RunProfiler:
+	"""
+	Profiles a block with pyinstrument, or with cProfile if pyinstrument is not installed.
+	After `stop()`, `filename`, `content` and `summary` hold the report and a top-functions summary by self time.
+	"""
+
+	def __init__(self):
+		self.engine = "pyinstrument" if SamplingProfiler else "cProfile"
+		self.profiler = (
+			SamplingProfiler(interval=SAMPLING_INTERVAL) if SamplingProfiler else cProfile.Profile()
+		)
+		self.filename: str | None = None
+		self.content: str | bytes | None = None
+		self.summary: str | None = None
+
+	def start(self):
+		if self.engine == "pyinstrument":
+			self.profiler.start()
+		else:
+			self.profiler.enable()
+
+	def stop(self):
+		if self.engine == "pyinstrument":
+			session = self.profiler.stop()
+			self.filename = "profile.html"
+			self.content = self.profiler.output_html()
+			self.summary = self._summarise_pyinstrument(session)
+		else:
+			self.profiler.disable()
+			self.filename = "profile.prof"
+			stats = pstats.Stats(self.profiler, stream=io.StringIO())
+			self.content = marshal.dumps(stats.stats)  # same format as `pstats.Stats.dump_stats`
+			self.summary = self._summarise_cprofile(stats)
+
+	@staticmethod
+	def _summarise_pyinstrument(session) -> str:
+		root = session.root_frame()
+		if root is None:
+			return ""
+
+		self_times = defaultdict(float)
+		stack = [root]
+		while stack:
+			frame = stack.pop()
+			stack.extend(frame.children)
+			self_time = frame.time - sum(child.time for child in frame.children)
+			# synthetic frames (e.g. "[self]") are attributed to their caller
+			owner = frame.parent if frame.is_synthetic and frame.parent else frame
+			if self_time > 0:
+				self_times[f"{owner.function} ({owner.file_path_short}:{owner.line_no})"] += self_time
+
+		return format_summary(list(self_times.items()), root.time)
+
+	@staticmethod
+	def _summarise_cprofile(stats: pstats.Stats) -> str:
+		rows = [
+			(f"{function} ({filename}:{line})", tottime)
+			for (filename, line, function), (_, _, tottime, _, _) in stats.stats.items()
+		]
+		return format_summary(rows, stats.total_tt)
@@ -0,0 +1,67 @@
+import re
+from collections import Counter
+
+import frappe
+
+_STATEMENT = re.compile(r"^\s*\(?\s*(\w+)")
+_TABLE = re.compile(r"[`\"]tab([^`\"]+)[`\"]")
+SUMMARY_SIZE = 20  # number of (statement, table) rows listed in the summary
+
+
+def classify(query: str) -> tuple[str, str]:
+	"""Returns the statement type and the first table of `query`, e.g. `("SELECT", "Sales Order")`."""
+	query = str(query)
+	statement = match.group(1).upper() if (match := _STATEMENT.match(query)) else "-"
+	table = match.group(1) if (match := _TABLE.search(query)) else "-"
+	return statement, table
+
+
+class QueryRecorder:
+	"""
+	Counts the SQL queries sent through `frappe.db.sql` while active, grouped by statement type and table.
+
+	### Usage example:
+	```
+	with QueryRecorder() as recorder:
+	    shop.import_receipt(receipt, api)
+	print(recorder.total, recorder.summary(records=1))
+	```
+	"""
+
+	def __init__(self):
+		self.counts: Counter[tuple[str, str]] = Counter()
+		self._sql = None
+
+	@property
+	def total(self) -> int:
+		return sum(self.counts.values())
+
+	def start(self):
+		self._sql = sql = frappe.db.sql
+
+		def recording_sql(query, *args, **kwargs):
+			self.counts[classify(query)] += 1
+			return sql(query, *args, **kwargs)
+
+		frappe.db.sql = recording_sql
+
+	def stop(self):
+		if self._sql is not None:
+			frappe.db.sql = self._sql
+			self._sql = None
+
+	def __enter__(self) -> "QueryRecorder":
+		self.start()
+		return self
+
+	def __exit__(self, *exc):
+		self.stop()
+		return False
+
+	def summary(self, records: int = 0) -> str:
+		"""Formats the counts as a plain text table, most frequent first, with queries per record if `records` is given."""
+		lines = [f"{self.total} queries" + (f", {self.total / records:.1f} per record" if records else "")]
+		for (statement, table), count in self.counts.most_common(SUMMARY_SIZE):
+			per_record = f"  {count / records:7.1f}/record" if records else ""
+			lines.append(f"{count:7d}{per_record}  {statement:<8} {table}")
+		return "\n".join(lines)
@@ -0,0 +1,293 @@
+import threading
+from collections.abc import Callable
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import frappe
+from frappe.utils import now_datetime
+from httpx import ReadTimeout, Request, Response
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.api import (
+	RETRY_AFTER_MAX,
+	RETRY_MAX_ATTEMPTS,
+	EtsyAPI,
+	EtsyRESTv3,
+	PollSchedule,
+	QP_getListingsByShop,
+	QP_getShopReceipts,
+	Throttle,
+	backoff_delay,
+	fetch_all,
+	fetch_concurrently,
+)
+from etsy.benchmarks.fixtures import SHOP_ID, SyntheticShop
+from etsy.benchmarks.server import EtsyStandIn
+
+
+class FakeClient:
+	"""Replays the given responses (or raises the given exceptions) in order."""
+
+	def __init__(self, *results):
+		self.results = list(results)
+		self.calls = 0
+
+	def request(self, method, **kwargs):
+		self.calls += 1
+		result = self.results.pop(0)
+		if isinstance(result, Exception):
+			raise result
+		result.request = Request(method, kwargs["url"])
+		return result
+
+
+@patch("etsy.api.time.sleep")
+class TestRetry(FrappeTestCase):
+	"""Tests for the retry layer of EtsyRESTv3."""
+
+	def setUp(self):
+		self.rest = EtsyRESTv3({})
+		self.args = self.rest.args(endpoint="/v3/application/users/me")
+
+	def test_retries_retryable_status(self, sleep):
+		client = FakeClient(Response(502), Response(429, headers={"Retry-After": "2"}), Response(200))
+		resp = self.rest.request(client, **self.args)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(client.calls, 3)
+		sleep.assert_called_with(2.0)
+
+	def test_retries_timeout(self, sleep):
+		client = FakeClient(ReadTimeout("timeout"), Response(200))
+		self.assertEqual(self.rest.request(client, **self.args).status_code, 200)
+
+	def test_gives_up_after_max_attempts(self, sleep):
+		client = FakeClient(*[Response(503) for _ in range(RETRY_MAX_ATTEMPTS)])
+		with self.assertRaises(Exception):
+			self.rest.request(client, **self.args)
+		self.assertEqual(client.calls, RETRY_MAX_ATTEMPTS)
+
+	def test_no_retry_for_client_errors(self, sleep):
+		client = FakeClient(Response(404))
+		self.assertEqual(self.rest.request(client, **self.args).status_code, 404)
+		self.assertEqual(client.calls, 1)
+
+	def test_no_retry_for_non_idempotent_methods(self, sleep):
+		client = FakeClient(Response(503))
+		with self.assertRaises(Exception):
+			self.rest.request(client, method="POST", **self.args)
+		self.assertEqual(client.calls, 1)
+
+
+class TestBackoffDelay(FrappeTestCase):
+	"""Tests for the backoff_delay utility function."""
+
+	def test_retry_after_seconds(self):
+		self.assertEqual(backoff_delay(1, "7"), 7.0)
+
+	def test_retry_after_is_capped(self):
+		self.assertEqual(backoff_delay(1, "100000"), RETRY_AFTER_MAX)
+
+	def test_retry_after_http_date_in_the_past(self):
+		self.assertEqual(backoff_delay(1, "Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+	def test_exponential_backoff_bounds(self):
+		for attempt in range(1, 10):
+			delay = backoff_delay(attempt, "invalid")
+			self.assertGreaterEqual(delay, 0.0)
+			self.assertLessEqual(delay, min(30.0, 0.5 * 2 ** (attempt - 1)))
+
+
+@patch("etsy.api.wait")
+class TestFetchAll(FrappeTestCase):
+	def test_start_offset(self, wait):
+		items = list(range(250))
+		offsets = []
+
+		def fetch(offset):
+			offsets.append(offset)
+			return len(items), items[offset : offset + 100]
+
+		self.assertEqual(list(fetch_all(fetch)), items)
+		offsets.clear()
+		self.assertEqual(list(fetch_all(fetch, start_offset=120)), items[120:])
+		self.assertEqual(offsets, [120, 220])
+
+	def drifting_pages(self, items: list, change: Callable[[list], None]):
+		"""Page function over `items` that applies `change` to them after the first page."""
+		offsets = []
+
+		def fetch(offset):
+			offsets.append(offset)
+			if len(offsets) == 2:
+				change(items)
+			return len(items), items[offset : offset + 100]
+
+		return fetch, offsets
+
+	def test_snapshot_added_records(self, wait):
+		items = list(range(500, 0, -1))  # newest first
+		fetch, offsets = self.drifting_pages(items, lambda items: items.insert(0, 501))
+
+		self.assertEqual(list(fetch_all(fetch, key=int)), list(range(500, 0, -1)))
+		self.assertEqual(offsets, [0, 99, 198, 297, 396, 495])
+
+	def test_snapshot_removed_records(self, wait):
+		items = list(range(500, 0, -1))
+		fetch, offsets = self.drifting_pages(items, lambda items: items.__delitem__(slice(10, 15)))
+
+		self.assertEqual(list(fetch_all(fetch, key=int)), list(range(500, 0, -1)))
+		self.assertEqual(offsets, [0, 99, 0, 99, 198, 297, 396])  # the previous page once more
+
+	def test_snapshot_resume_after_anchor(self, wait):
+		items = list(range(500, 0, -1))
+		fetch, offsets = self.drifting_pages(items, lambda items: None)
+		del items[150:160]  # removed since the checkpoint was written after 301
+
+		self.assertEqual(
+			list(fetch_all(fetch, start_offset=200, key=int, anchor=301)), list(range(300, 0, -1))
+		)
+		self.assertEqual(offsets, [199, 99, 198, 297, 396])
+
+
+@patch("etsy.api.frappe.destroy")
+@patch("etsy.api.frappe.init")
+class TestFetchConcurrently(FrappeTestCase):
+	def test_records_of_all_fetchers(self, init, destroy):
+		fetchers = {"active": lambda: iter(range(300)), "draft": lambda: iter(range(5))}
+		records = list(fetch_concurrently(fetchers))
+
+		for name, fetcher in fetchers.items():
+			own = [record for n, record in records if n == name]
+			self.assertEqual(own, [*fetcher(), None])  # in order, then the end marker
+		self.assertEqual(init.call_count, 2)
+		self.assertEqual(destroy.call_count, 2)
+
+	def test_failing_fetcher(self, init, destroy):
+		def failing():
+			yield 1
+			raise ValueError("page failed")
+
+		with self.assertRaises(ValueError):
+			list(fetch_concurrently({"active": lambda: iter(range(10_000)), "draft": failing}))
+		self.assertEqual(destroy.call_count, 2)  # the other fetcher stopped as well
+
+	def test_states_through_one_api(self, init, destroy):
+		def fetcher(api: EtsyAPI, state: str) -> Callable:
+			def page(offset: int):
+				return api.getListingsByShop(
+					QP_getListingsByShop(shop_id=SHOP_ID, state=state, limit=100, offset=offset)
+				)
+
+			return lambda: fetch_all(page)
+
+		with EtsyStandIn(count=20) as stand_in:
+			api = stand_in_api(stand_in.url)
+			records = list(fetch_concurrently({state: fetcher(api, state) for state in ("active", "draft")}))
+
+		active = [listing.listing_id for name, listing in records if name == "active" and listing]
+		self.assertEqual(active, [SyntheticShop(20).listing(i)["listing_id"] for i in range(20)])
+		self.assertEqual(sorted(name for name, listing in records if listing is None), ["active", "draft"])
+
+
+class TestThrottle(FrappeTestCase):
+	@patch("etsy.api.wait")
+	def test_spaces_calls_across_threads(self, wait):
+		throttle = Throttle(10)
+		threads = [threading.Thread(target=throttle) for _ in range(3)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		delays = sorted(call.args[1] for call in wait.call_args_list)
+		self.assertEqual(len(delays), 2)  # the first call does not wait
+		self.assertAlmostEqual(delays[0], 10, delta=1)
+		self.assertAlmostEqual(delays[1], 20, delta=1)
+
+
+class FakeCache:
+	def __init__(self):
+		self.values = {}
+
+	def get_value(self, key):
+		return self.values.get(key)
+
+	def set_value(self, key, value, expires_in_sec=None):
+		self.values[key] = value
+
+
+class TestPollSchedule(FrappeTestCase):
+	def setUp(self):
+		cache = FakeCache()
+		patcher = patch("etsy.api.frappe.cache", return_value=cache)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.schedule = PollSchedule("_Test Shop", 1, 60)
+
+	def test_interval_follows_order_rate(self):
+		self.assertEqual(self.schedule.interval(orders=2000, empty_polls=0), 1)  # at least min_interval
+		self.assertEqual(self.schedule.interval(orders=48, empty_polls=0), 7.5)
+		self.assertEqual(self.schedule.interval(orders=48, empty_polls=2), 30)
+		self.assertEqual(self.schedule.interval(orders=48, empty_polls=5), 60)  # at most max_interval
+		self.assertEqual(self.schedule.interval(orders=0, empty_polls=0), 60)
+
+	@patch("etsy.api.time.time", return_value=1_000_000.0)
+	@patch.object(PollSchedule, "recent_orders", return_value=2000)
+	def test_empty_polls_back_off(self, recent_orders, time):
+		self.assertTrue(self.schedule.is_due())
+		for empty_polls, interval in ((1, 2), (2, 4), (3, 8)):
+			self.schedule.record_poll(created=0)
+			self.assertEqual(self.schedule.state()["empty_polls"], empty_polls)
+			self.assertEqual(self.schedule.state()["next_poll"], time.return_value + interval * 60)
+			self.assertFalse(self.schedule.is_due())
+
+		self.schedule.record_poll(created=3)
+		self.assertEqual(self.schedule.state()["empty_polls"], 0)
+		time.return_value += 60  # next run of the scheduler job
+		self.assertTrue(self.schedule.is_due())
+
+	def test_recent_orders_of_polls_and_webhooks(self):
+		self.addCleanup(frappe.db.rollback)
+		for trigger, created in (("Scheduled", 3), ("Webhook", 2), ("Manual", 400), ("Backfill", 10_000)):
+			frappe.get_doc(
+				{
+					"doctype": "Etsy Sync Run",
+					"etsy_shop": self.schedule.etsy_shop,
+					"kind": "Receipts",
+					"trigger": trigger,
+					"status": "Completed",
+					"started_at": now_datetime(),
+					"records_created": created,
+				}
+			).insert(ignore_permissions=True, ignore_links=True)
+
+		self.assertEqual(self.schedule.recent_orders(), 5)
+
+
+def stand_in_api(url: str) -> EtsyAPI:
+	"""An EtsyAPI that sends its requests to the Etsy stand-in server at `url`."""
+	api = EtsyAPI(SimpleNamespace(name="_Test Shop", language="en", get_auth_header=dict))
+	api.rest = EtsyRESTv3({}, language="en", base_url=url)
+	return api
+
+
+class TestBatchedPayments(FrappeTestCase):
+	@patch("etsy.api.frappe.log_error")
+	def test_payments_by_receipt_id(self, log_error):
+		shop = SyntheticShop(20)
+		receipt_ids = [shop.receipt(i)["receipt_id"] for i in range(20)]
+
+		with EtsyStandIn(count=20) as stand_in:
+			api = stand_in_api(stand_in.url)
+			api.getShopReceipts(
+				QP_getShopReceipts(shop_id=SHOP_ID)
+			)  # the importing thread uses its client first
+			payments = api.getShopPaymentsByReceiptIds(SHOP_ID, receipt_ids, max_workers=3)
+
+		self.assertEqual(set(payments), set(receipt_ids))
+		self.assertEqual(payments[receipt_ids[5]].payment_id, shop.payment(5)["payment_id"])
+		log_error.assert_not_called()
@@ -0,0 +1,106 @@
+import json
+import tempfile
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+import httpx
+
+from etsy.api import EtsyRESTv3
+from etsy.benchmarks import fixtures
+from etsy.benchmarks.fixtures import SyntheticShop, write_jsonl
+from etsy.benchmarks.micro import CASES, compare, load_baselines
+from etsy.benchmarks.server import EtsyStandIn
+from etsy.datastruct import LedgerEntry, Listing, Payment, ShopReceipt
+
+
+class TestSyntheticShop(FrappeTestCase):
+	def test_payloads_are_valid(self):
+		shop = SyntheticShop(200, distributions={"refund_ratio": 0.5, "digital_ratio": 0.5})
+		for receipt in shop.iter_receipts():
+			ShopReceipt.model_validate(receipt)
+		for listing in shop.iter_listings():
+			Listing.model_validate(listing)
+		for payment in shop.iter_payments():
+			Payment.model_validate(payment)
+		for entry in shop.iter_ledger_entries():
+			LedgerEntry.model_validate(entry)
+
+	def test_payloads_are_deterministic(self):
+		self.assertEqual(SyntheticShop(100, seed=1).receipt(7), SyntheticShop(100, seed=1).receipt(7))
+		self.assertNotEqual(SyntheticShop(100, seed=1).receipt(7), SyntheticShop(100, seed=2).receipt(7))
+		self.assertEqual(SyntheticShop(100, id_offset=1000).receipt(7)["receipt_id"], 3_000_001_007)
+
+	def test_distributions(self):
+		shop = SyntheticShop(
+			300,
+			distributions={
+				"variants_per_listing": {36: 1},
+				"transactions_per_receipt": {8: 1},
+				"currencies": {"USD": 1},
+				"repeat_buyer_ratio": 1,
+				"refund_ratio": 0,
+			},
+		)
+		listing = Listing.model_validate(shop.listing(0))
+		self.assertEqual(len(listing.inventory.products), 36)
+		self.assertEqual(len({tuple(p.property_values[0].values) for p in listing.inventory.products}), 6)
+
+		receipts = [ShopReceipt.model_validate(r) for r in shop.iter_receipts()]
+		self.assertTrue(all(len(r.transactions) == 8 for r in receipts))
+		self.assertTrue(all(r.grandtotal.currency_code.value == "USD" and not r.refunds for r in receipts))
+		self.assertLess(len({r.buyer_user_id for r in receipts}), 300)
+
+	def test_ledger_balance(self):
+		shop = SyntheticShop(50)
+		entries = list(shop.iter_ledger_entries())
+		self.assertEqual(entries[-1]["balance"], sum(e["amount"] for e in entries))
+		self.assertEqual(entries, sorted(entries, key=lambda e: e["sequence_number"]))
+
+	def test_ledger_entries_between(self):
+		shop = SyntheticShop(300, distributions={"refund_ratio": 0.5})
+		start, end = fixtures.BASE_TIMESTAMP + 86400, fixtures.BASE_TIMESTAMP + 6 * 86400 - 1
+		expected = [e for e in shop.iter_ledger_entries() if start <= e["created_timestamp"] <= end]
+		entries = shop.ledger_entries_between(start, end)
+		self.assertEqual(sorted(e["entry_id"] for e in entries), sorted(e["entry_id"] for e in expected))
+		self.assertIn("refund", {e["ledger_type"] for e in entries})
+
+	def test_write_jsonl(self):
+		with tempfile.NamedTemporaryFile("r", suffix=".jsonl") as f:
+			self.assertEqual(write_jsonl(f.name, "receipts", 25, seed=3), 25)
+			lines = f.readlines()
+		self.assertEqual(json.loads(lines[3]), SyntheticShop(25, seed=3).receipt(3))
+
+
+class TestEtsyStandIn(FrappeTestCase):
+	def test_pagination(self):
+		rest = EtsyRESTv3({}, base_url="http://127.0.0.1:1")
+		with EtsyStandIn(count=150) as stand_in:
+			rest.base_url = stand_in.url
+			args = rest.args(
+				f"/v3/application/shops/{fixtures.SHOP_ID}/receipts", params={"offset": 100, "limit": 100}
+			)
+			resp = httpx.get(args["url"], params=args["params"]).json()
+
+		self.assertEqual(resp["count"], 150)
+		self.assertEqual(len(resp["results"]), 50)
+		self.assertEqual(resp["results"][0], SyntheticShop(150).receipt(100))
+
+
+class TestMicroBenchmarks(FrappeTestCase):
+	def test_compare(self):
+		results = {
+			"fast": {"us_per_call": 1.0, "relative": 0.1},
+			"slow": {"us_per_call": 9.0, "relative": 0.9},
+			"new": {"us_per_call": 5.0, "relative": 0.5},
+		}
+		regressions = compare(results, {"fast": 0.1, "slow": 0.5}, threshold=1.5)
+		self.assertEqual(len(regressions), 1)
+		self.assertTrue(regressions[0].startswith("slow: 1.80x baseline"))
+
+	def test_every_case_has_a_baseline(self):
+		self.assertEqual(set(load_baselines()), set(CASES))
+		for case in CASES.values():
+			case()()
@@ -0,0 +1,44 @@
+from datetime import date, datetime
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.benchmarks.fixtures import SyntheticShop
+from etsy.datastruct import LedgerEntry
+from etsy.ledger import LedgerAggregate, window_timestamps
+
+
+def entry(ledger_type: str, amount: int, created: datetime) -> LedgerEntry:
+	payload = SyntheticShop(1).ledger_entries(0)[0]
+	payload.update(ledger_type=ledger_type, amount=amount, created_timestamp=int(created.timestamp()))
+	return LedgerEntry.model_validate(payload)
+
+
+class TestLedger(FrappeTestCase):
+	def test_window_timestamps(self):
+		min_created, max_created = window_timestamps(date(2026, 1, 1), date(2026, 1, 3))
+		self.assertEqual(max_created - min_created, 2 * 86400 - 1)
+		self.assertEqual(datetime.fromtimestamp(min_created), datetime(2026, 1, 1))
+
+	def test_aggregate(self):
+		aggregate = LedgerAggregate()
+		for e in [
+			entry("transaction", -65, datetime(2026, 1, 1, 9)),
+			entry("transaction", -35, datetime(2026, 1, 1, 18)),
+			entry("processing_fee", -50, datetime(2026, 1, 1, 9)),
+			entry("transaction", -10, datetime(2026, 1, 2, 9)),
+			entry("payment", 1000, datetime(2026, 1, 1, 9)),
+		]:
+			aggregate.add(e)
+
+		accounts = {"transaction": "Etsy Fees", "processing_fee": "Etsy Fees"}
+		self.assertEqual(
+			aggregate.by_account(accounts),
+			{
+				(date(2026, 1, 1), "Etsy Fees"): {"processing_fee": [-50, 1], "transaction": [-100, 2]},
+				(date(2026, 1, 2), "Etsy Fees"): {"transaction": [-10, 1]},
+			},
+		)
+		self.assertEqual(aggregate.unmapped(accounts), 1)
@@ -0,0 +1,61 @@
+import frappe
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.etsy.dashboard_chart_source.etsy_api_requests.etsy_api_requests import get as get_chart_data
+from etsy.metrics import _percentile, endpoint_template, latency_bucket, summarise_endpoint
+
+
+class TestMetrics(FrappeTestCase):
+	"""Tests for the pure helpers of the API metrics."""
+
+	def test_endpoint_template(self):
+		self.assertEqual(
+			endpoint_template("https://api.etsy.com/v3/application/shops/123/receipts/456/payments"),
+			"/v3/application/shops/{id}/receipts/{id}/payments",
+		)
+		self.assertEqual(
+			endpoint_template("https://api.etsy.com/v3/application/users/me?language=de"),
+			"/v3/application/users/me",
+		)
+
+	def test_latency_bucket(self):
+		self.assertEqual(latency_bucket(12), "50")
+		self.assertEqual(latency_bucket(50), "50")
+		self.assertEqual(latency_bucket(51), "100")
+		self.assertEqual(latency_bucket(99999), "inf")
+
+	def test_percentile(self):
+		histogram = {"50": 90, "500": 9, "inf": 1}
+		self.assertEqual(_percentile(histogram, 100, 0.5), "50")
+		self.assertEqual(_percentile(histogram, 100, 0.95), "500")
+		self.assertIsNone(_percentile({}, 0, 0.5))
+
+	def test_summarise_endpoint(self):
+		raw = {
+			b"requests": b"4",
+			b"status:200": b"3",
+			b"status:429": b"1",
+			b"latency_le:100": b"4",
+			b"latency_ms": b"200.0",
+			b"bytes": b"1024",
+			b"cache_hit": b"1",
+			b"cache_miss": b"3",
+		}
+		summary = summarise_endpoint("/v3/application/users/me", raw)
+		self.assertEqual(summary["requests"], 4)
+		self.assertEqual(summary["status_codes"], {"200": 3, "429": 1})
+		self.assertEqual(summary["avg_latency_ms"], 50.0)
+		self.assertEqual(summary["p95_latency_ms"], "100")
+		self.assertEqual(summary["cache_hit_ratio"], 0.25)
+
+
+class TestMetricsPermissions(FrappeTestCase):
+	def test_chart_source_needs_system_manager(self):
+		self.addCleanup(frappe.set_user, "Administrator")
+		frappe.set_user("Guest")
+		with self.assertRaises(frappe.PermissionError):
+			get_chart_data()
@@ -0,0 +1,136 @@
+from unittest.mock import patch
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.benchmarks.fixtures import SyntheticShop
+from etsy.datastruct import ShopReceipt
+from etsy.posting import (
+	POSTING_RESULTS_EXPIRY,
+	EtsyBuyerLockedError,
+	EtsyPostingTimeoutError,
+	PostingBatch,
+	buyer_lock,
+	partition,
+	posting_jobs,
+	run_post_partition,
+)
+
+
+class FakeCache:
+	def __init__(self):
+		self.hashes = {}
+		self.expiry = {}
+
+	def make_key(self, key):
+		return key
+
+	def expire(self, name, seconds):
+		self.expiry[name] = seconds
+
+	def hset(self, name, key, value):
+		self.hashes.setdefault(name, {})[key] = value
+
+	def hgetall(self, name):
+		return dict(self.hashes.get(name, {}))
+
+	def delete_value(self, name):
+		self.hashes.pop(name, None)
+		self.expiry.pop(name, None)
+
+
+class TestPartition(FrappeTestCase):
+	def test_buyers_stay_in_one_partition(self):
+		shop = SyntheticShop(200, distributions={"repeat_buyer_ratio": 0.5})
+		receipts = [ShopReceipt.model_validate(receipt) for receipt in shop.iter_receipts()]
+
+		partitions = partition(receipts, 4)
+
+		self.assertLessEqual(len(partitions), 4)
+		self.assertEqual(
+			sorted(r.receipt_id for p in partitions for r in p), sorted(r.receipt_id for r in receipts)
+		)
+		buyers = [{r.buyer_user_id for r in p} for p in partitions]
+		for i, own in enumerate(buyers):
+			for other in buyers[i + 1 :]:
+				self.assertFalse(own & other)
+		for p in partitions:  # in their original order
+			self.assertEqual(p, [r for r in receipts if r in p])
+
+	def test_single_partition(self):
+		receipts = [ShopReceipt.model_validate(receipt) for receipt in SyntheticShop(5).iter_receipts()]
+		self.assertEqual(partition(receipts, 1), [receipts])
+		self.assertEqual(partition([], 3), [])
+
+
+@patch("etsy.posting.wait")
+@patch("etsy.posting.frappe.enqueue")
+class TestPostingBatch(FrappeTestCase):
+	def setUp(self):
+		self.cache = FakeCache()
+		patcher = patch("etsy.posting.frappe.cache", return_value=self.cache)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.receipts = [ShopReceipt.model_validate(receipt) for receipt in SyntheticShop(6).iter_receipts()]
+
+	def test_waits_for_all_partitions(self, enqueue, wait):
+		batch = PostingBatch()
+		batch.dispatch("_Test Shop", partition(self.receipts, 3), {})
+		self.assertEqual(enqueue.call_count, batch.size)
+
+		for index in range(batch.size - 1):
+			batch.report(index, {"created": 2, "failed": 0})
+		wait.side_effect = lambda *args: batch.report(batch.size - 1, {"created": 1, "failed": 1})
+
+		self.assertEqual(batch.wait(), {"created": 2 * batch.size - 1, "failed": 1})
+		wait.assert_called_once()  # polled until the last partition reported
+		self.assertEqual(batch.results(), [])
+
+	def test_timed_out_batch_expires(self, enqueue, wait):
+		batch = PostingBatch()
+		batch.dispatch("_Test Shop", partition(self.receipts, 2), {})
+		batch.report(0, {"created": 3, "failed": 0})
+		self.assertEqual(self.cache.expiry[batch.key], POSTING_RESULTS_EXPIRY)
+
+		with self.assertRaises(EtsyPostingTimeoutError):
+			batch.wait(timeout=0)
+		self.assertEqual(batch.results(), [])
+
+		batch.report(1, {"created": 3, "failed": 0})  # a late partition, after the import gave up
+		self.assertEqual(self.cache.expiry[batch.key], POSTING_RESULTS_EXPIRY)
+
+	@patch("etsy.posting.frappe.log_error")
+	@patch("etsy.posting.frappe.get_doc", side_effect=ValueError("shop deleted"))
+	def test_failed_job_reports(self, get_doc, log_error, enqueue, wait):
+		batch = PostingBatch()
+		batch.size = 1
+		run_post_partition("_Test Shop", batch.batch_id, 0, self.receipts, {})
+
+		self.assertEqual(batch.wait(), {"created": 0, "failed": len(self.receipts)})
+		log_error.assert_called_once()
+
+
+@patch("etsy.posting.frappe.db.get_single_value", return_value=4)
+class TestPostingJobs(FrappeTestCase):
+	@patch("etsy.posting.get_workers", return_value=["importer", "poster"])
+	def test_configured_jobs(self, get_workers, get_single_value):
+		self.assertEqual(posting_jobs(), 4)
+
+	@patch("etsy.posting.get_workers", return_value=["importer"])
+	def test_posted_by_importer_without_own_workers(self, get_workers, get_single_value):
+		self.assertEqual(posting_jobs(), 1)  # the only worker waits for the partitions
+
+
+class TestBuyerLock(FrappeTestCase):
+	@patch("etsy.posting.BUYER_LOCK_WAIT", 0.1)
+	def test_one_job_per_buyer(self):
+		with buyer_lock("_Test Shop", 1):
+			with self.assertRaises(EtsyBuyerLockedError), buyer_lock("_Test Shop", 1):
+				pass  # e.g. a receipt of the same buyer in another backfill window
+			with buyer_lock("_Test Shop", 2), buyer_lock("_Test Other Shop", 1):
+				pass  # other buyers are posted meanwhile
+
+		with buyer_lock("_Test Shop", 1):
+			pass  # released
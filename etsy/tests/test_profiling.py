@@ -0,0 +1,34 @@
+import marshal
+from unittest.mock import patch
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.profiling import SUMMARY_SIZE, RunProfiler, format_summary
+
+
+def busy():
+	return sum(i * i for i in range(200_000))
+
+
+class TestProfiling(FrappeTestCase):
+	def test_format_summary(self):
+		rows = [(f"f{i}", float(i)) for i in range(SUMMARY_SIZE + 5)]
+		lines = format_summary(rows, total=1000.0).splitlines()
+		self.assertEqual(len(lines), SUMMARY_SIZE)
+		self.assertTrue(lines[0].endswith(f"f{SUMMARY_SIZE + 4}"))
+		self.assertIn("  0.0%", format_summary([("f", 0.0)], total=0))
+
+	@patch("etsy.profiling.SamplingProfiler", None)
+	def test_cprofile_fallback(self):
+		profiler = RunProfiler()
+		profiler.start()
+		busy()
+		profiler.stop()
+
+		self.assertEqual(profiler.engine, "cProfile")
+		self.assertEqual(profiler.filename, "profile.prof")
+		self.assertIsInstance(marshal.loads(profiler.content), dict)
+		self.assertIn("busy", profiler.summary)
@@ -0,0 +1,167 @@
+from contextlib import nullcontext
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from etsy.benchmarks.fixtures import SyntheticShop
+from etsy.datastruct import Listing, ShopReceipt
+from etsy.etsy.doctype.etsy_sync_run.etsy_sync_run import SyncRunJournal
+from etsy.query_recorder import QueryRecorder, classify
+from etsy.tests.utils import QueryBudgetTestCase
+
+# Upper bounds of SQL queries per imported record, the query count of the import plus a small margin.
+# Lower them when an import gets cheaper, raise them only with a reason:
+# a per-record cost that grows with the data is an N+1 query.
+QUERY_BUDGET_PER_LISTING = 45
+QUERY_BUDGET_PER_RECEIPT = 900
+# a new receipt of 2 transactions writes one row of each document, items are only created once,
+# and the Items and Accounts of its rows are looked up a bounded number of times
+RECEIPT_BUDGET = {
+	**{
+		("INSERT", table): 1
+		for table in ("Customer", "Address", "Contact", "Sales Order", "Sales Invoice", "Payment Entry")
+	},
+	("INSERT", "Item"): 2,
+	("SELECT", "Item"): 60,
+	("SELECT", "Account"): 100,
+}
+# a listing's tags are written in one statement, and not at all while they are unchanged
+LISTING_TAG_BUDGET = {("INSERT", "Etsy Listing Tag"): 1, ("DELETE", "Etsy Listing Tag"): 0}
+UNCHANGED_LISTING_TAG_BUDGET = {
+	(statement, "Etsy Listing Tag"): 0 for statement in ("INSERT", "UPDATE", "DELETE")
+}
+# the Customer, Address and Contact of a repeat buyer are only written when they change
+REPEAT_BUYER_BUDGET = {
+	(statement, table): 0
+	for statement in ("INSERT", "UPDATE", "DELETE")
+	for table in ("Customer", "Address", "Contact", "Contact Email", "Dynamic Link")
+}
+RECORDS = 5
+
+
+class FakeEtsyAPI:
+	"""Serves synthetic listings to `EtsyShop.import_listings` without HTTP."""
+
+	def __init__(self, listings: list[Listing]):
+		self.listings = listings
+		self.rest = MagicMock()
+		self.rest.getListingImage.return_value.json.return_value = {"url_170x135": None}
+
+	def phase(self, name: str):
+		return nullcontext()
+
+	def getListingsByShop(self, query_params) -> tuple[int, list[Listing]]:
+		offset = query_params.offset or 0
+		return len(self.listings), self.listings[offset : offset + query_params.limit]
+
+
+class TestQueryRecorder(QueryBudgetTestCase):
+	def test_classify(self):
+		self.assertEqual(classify("select `name` from `tabSales Order` where x=1"), ("SELECT", "Sales Order"))
+		self.assertEqual(classify('  UPDATE "tabItem" set a=1'), ("UPDATE", "Item"))
+		self.assertEqual(
+			classify("insert into `tabEtsy Listing Tag` (`name`) values (%s)"), ("INSERT", "Etsy Listing Tag")
+		)
+		self.assertEqual(classify("(select 1) union (select 2)"), ("SELECT", "-"))
+		self.assertEqual(classify("savepoint etsy"), ("SAVEPOINT", "-"))
+
+	def test_recorder(self):
+		with QueryRecorder() as recorder:
+			frappe.db.sql("select name from `tabDocType` limit 1")
+			frappe.db.sql("select name from `tabDocType` limit 1")
+			frappe.db.sql("select name from `tabModule Def` limit 1")
+
+		frappe.db.sql("select name from `tabDocType` limit 1")  # not recorded anymore
+		self.assertEqual(recorder.total, 3)
+		self.assertEqual(recorder.counts[("SELECT", "DocType")], 2)
+		self.assertIn("1.0 per record", recorder.summary(records=3))
+
+	def test_budget_failure_lists_tables(self):
+		with self.assertRaises(AssertionError) as failure:
+			with self.assertQueryBudget(per_record=1, records=1):
+				frappe.db.sql("select name from `tabDocType` limit 1")
+				frappe.db.sql("select name from `tabDocType` limit 1")
+		self.assertIn("DocType", str(failure.exception))
+
+	def test_table_budget(self):
+		with self.assertRaises(AssertionError) as failure:
+			with self.assertQueryBudget(per_record=10, records=1, tables={("SELECT", "DocType"): 1}):
+				frappe.db.sql("select name from `tabDocType` limit 1")
+				frappe.db.sql("select name from `tabDocType` limit 1")
+		self.assertIn("SELECT DocType: 2.0 per record, budget 1", str(failure.exception))
+
+
+class TestImportQueryBudget(QueryBudgetTestCase):
+	def setUp(self):
+		commit = patch.object(frappe.db, "commit")  # keep the imported documents in the test transaction
+		commit.start()
+		self.addCleanup(commit.stop)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_listing_import(self):
+		fixtures = SyntheticShop(
+			RECORDS,
+			seed=33,
+			id_offset=33_000_000,
+			distributions={"variants_per_listing": {3: 1}, "tags_per_listing": {13: 1}},
+		)
+		api = FakeEtsyAPI([Listing.model_validate(listing) for listing in fixtures.iter_listings()])
+		shop = frappe.get_doc({"doctype": "Etsy Shop", "shop_name": "_Test Query Budget", "shop_id": "1"})
+		journal = SyncRunJournal(shop.shop_name, "Listings")  # not entered, no Etsy Sync Run is written
+
+		with self.assertQueryBudget(QUERY_BUDGET_PER_LISTING, records=RECORDS, tables=LISTING_TAG_BUDGET):
+			shop.import_listings(etsy_api=api, journal=journal)
+		self.assertEqual(journal.counts["created"], RECORDS)
+
+		journal = SyncRunJournal(shop.shop_name, "Listings")
+		with self.assertQueryBudget(
+			QUERY_BUDGET_PER_LISTING, records=RECORDS, tables=UNCHANGED_LISTING_TAG_BUDGET
+		):
+			shop.import_listings(etsy_api=api, journal=journal)  # the next scheduled sync
+		self.assertEqual(journal.counts["updated"], RECORDS)
+
+	def test_receipt_import(self):
+		company = frappe.db.get_value(
+			"Company",
+			{"default_income_account": ("is", "set"), "default_cash_account": ("is", "set")},
+			["name", "default_currency", "default_income_account", "default_cash_account"],
+			as_dict=True,
+		)
+		if not company:
+			self.skipTest("Needs a company with default income and cash accounts")
+
+		fixtures = SyntheticShop(
+			RECORDS,
+			seed=33,
+			id_offset=33_000_000,
+			distributions={
+				"transactions_per_receipt": {2: 1},
+				"currencies": {company.default_currency: 1},
+				"repeat_buyer_ratio": 0,
+			},
+		)
+		shop = frappe.get_doc(
+			{
+				"doctype": "Etsy Shop",
+				"shop_name": "_Test Query Budget",
+				"company": company.name,
+				"shipping_income_account": company.default_income_account,
+				"bank_account": company.default_cash_account,
+			}
+		)
+		api = FakeEtsyAPI([])
+		receipts = [ShopReceipt.model_validate(receipt) for receipt in fixtures.iter_receipts()]
+
+		with self.assertQueryBudget(QUERY_BUDGET_PER_RECEIPT, records=RECORDS, tables=RECEIPT_BUDGET):
+			for receipt in receipts:
+				shop.import_receipt(receipt, api)
+
+		# the next orders of the same buyers, with unchanged names and addresses
+		repeated = [
+			receipt.model_copy(update={"receipt_id": receipt.receipt_id + RECORDS}) for receipt in receipts
+		]
+		with self.assertQueryBudget(QUERY_BUDGET_PER_RECEIPT, records=RECORDS, tables=REPEAT_BUYER_BUDGET):
+			for receipt in repeated:
+				shop.import_receipt(receipt, api)
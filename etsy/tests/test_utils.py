@@ -0,0 +1,18 @@
+from datetime import date
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.utils import date_windows
+
+
+class TestDateWindows(FrappeTestCase):
+	def test_date_windows(self):
+		windows = list(date_windows(date(2026, 1, 1), date(2026, 3, 1), days=31))
+		self.assertEqual(
+			windows,
+			[(date(2026, 1, 1), date(2026, 2, 1)), (date(2026, 2, 1), date(2026, 3, 1))],
+		)
+		self.assertEqual(list(date_windows(date(2026, 1, 1), date(2026, 1, 1), days=31)), [])
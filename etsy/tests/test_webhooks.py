@@ -0,0 +1,158 @@
+import base64
+import json
+from contextlib import nullcontext
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.benchmarks.fixtures import SHOP_ID, SyntheticShop
+from etsy.datastruct import ShopReceipt
+from etsy.etsy.doctype.etsy_shop.etsy_shop import EtsyShop, run_import_receipt
+from etsy.webhooks import WEBHOOK_TOLERANCE, EtsyWebhookSignatureError, parse_event, receive, sign, verify
+
+SECRET = "whsec_" + base64.b64encode(b"etsy webhook test secret").decode()
+NOW = 1_760_000_000
+
+
+def event(receipt_id: int, shop_id: int = 4242, event_type: str = "order.paid") -> bytes:
+	return json.dumps(
+		{
+			"event_type": event_type,
+			"shop_id": shop_id,
+			"resource_url": f"https://api.etsy.com/v3/application/shops/{shop_id}/receipts/{receipt_id}",
+		}
+	).encode()
+
+
+def headers(body: bytes, webhook_id: str = "msg_1", timestamp: int = NOW, secret: str = SECRET) -> dict:
+	return {
+		"webhook-id": webhook_id,
+		"webhook-timestamp": str(timestamp),
+		"webhook-signature": sign(secret, webhook_id, timestamp, body),
+	}
+
+
+class TestSignature(FrappeTestCase):
+	def test_valid_signature(self):
+		body = event(1)
+		verify(SECRET, headers(body), body, now=NOW + 10)
+
+	def test_rotated_secret(self):
+		body = event(1)
+		signed = headers(body)
+		signed["webhook-signature"] = (
+			f"{sign(SECRET[:-4] + 'AAA=', 'msg_1', NOW, body)} {signed['webhook-signature']}"
+		)
+		verify(SECRET, signed, body, now=NOW)
+
+	def test_rejected(self):
+		body = event(1)
+		for case, (signed, payload, now) in {
+			"tampered body": (headers(body), event(2), NOW),
+			"other secret": (headers(body, secret="whsec_" + base64.b64encode(b"x").decode()), body, NOW),
+			"replayed": (headers(body), body, NOW + WEBHOOK_TOLERANCE + 1),
+			"unsigned": ({}, body, NOW),
+		}.items():
+			with self.subTest(case), self.assertRaises(EtsyWebhookSignatureError):
+				verify(SECRET, signed, payload, now=now)
+
+	def test_parse_event(self):
+		self.assertEqual(parse_event(json.loads(event(77))), (4242, 77))
+		self.assertIsNone(parse_event(json.loads(event(77, event_type="listing.updated"))))
+
+
+@patch("etsy.webhooks.frappe.enqueue")
+class TestReceive(FrappeTestCase):
+	def setUp(self):
+		self.shop = frappe.get_doc(
+			{
+				"doctype": "Etsy Shop",
+				"shop_name": "_Test Webhook Shop",
+				"shop_id": "4242",
+				"webhook_secret": SECRET,
+			}
+		).insert(ignore_permissions=True, ignore_mandatory=True)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def post(self, body: bytes, signed: dict) -> dict:
+		from werkzeug.test import EnvironBuilder
+		from werkzeug.wrappers import Request
+
+		frappe.local.request = Request(EnvironBuilder(method="POST", data=body, headers=signed).get_environ())
+		return receive()
+
+	def test_enqueues_receipt_import_once(self, enqueue):
+		body = event(5150)
+		signed = headers(
+			body, webhook_id=frappe.generate_hash(), timestamp=int(frappe.utils.now_datetime().timestamp())
+		)
+
+		self.assertEqual(self.post(body, signed), {"status": "queued"})
+		self.assertEqual(self.post(body, signed), {"status": "duplicate"})  # redelivered by Etsy
+		enqueue.assert_called_once()
+		self.assertEqual(enqueue.call_args.kwargs["receipt_id"], 5150)
+		self.assertEqual(enqueue.call_args.kwargs["etsy_shop"], self.shop.name)
+
+	def test_rejects_invalid_signature(self, enqueue):
+		body = event(5150)
+		with self.assertRaises(EtsyWebhookSignatureError):
+			self.post(body, headers(body, timestamp=int(frappe.utils.now_datetime().timestamp()) - 3600))
+		enqueue.assert_not_called()
+
+
+class TestQueuedImport(FrappeTestCase):
+	def setUp(self):
+		commit = patch.object(frappe.db, "commit")  # keep the imported documents in the test transaction
+		commit.start()
+		self.addCleanup(commit.stop)
+
+	def tearDown(self):
+		frappe.set_user("Administrator")
+		frappe.db.rollback()
+
+	def test_imports_receipt_queued_by_guest(self):
+		company = frappe.db.get_value(
+			"Company",
+			{"default_income_account": ("is", "set"), "default_cash_account": ("is", "set")},
+			["name", "default_currency", "default_income_account", "default_cash_account"],
+			as_dict=True,
+		)
+		if not company:
+			self.skipTest("Needs a company with default income and cash accounts")
+
+		fixtures = SyntheticShop(
+			1, seed=40, id_offset=40_000_000, distributions={"currencies": {company.default_currency: 1}}
+		)
+		receipt = ShopReceipt.model_validate(fixtures.receipt(0))
+		shop = frappe.get_doc(
+			{
+				"doctype": "Etsy Shop",
+				"shop_name": "_Test Webhook Import",
+				"shop_id": str(SHOP_ID),
+				"company": company.name,
+				"shipping_income_account": company.default_income_account,
+				"bank_account": company.default_cash_account,
+			}
+		).insert(ignore_permissions=True, ignore_mandatory=True)
+
+		api = MagicMock()
+		api.phase.return_value = nullcontext()
+		api.getShopReceipt.return_value = receipt
+		api.rest.getListingImage.return_value.json.return_value = {"url_170x135": None}
+
+		frappe.set_user("Guest")  # `receive` enqueues the job as the Guest of the webhook request
+		with (
+			patch("etsy.etsy.doctype.etsy_shop.etsy_shop.EtsyAPI", return_value=api),
+			patch.object(EtsyShop, "preflight"),  # the configuration is covered by TestPreflight
+		):
+			run_import_receipt(shop.name, receipt.receipt_id)
+
+		self.assertTrue(frappe.db.exists("Sales Order", {"etsy_order_id": str(receipt.receipt_id)}))
+		self.assertTrue(frappe.db.exists("Customer", {"etsy_customer_id": str(receipt.buyer_user_id)}))
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+
+try:
+	from frappe.tests import UnitTestCase as FrappeTestCase  # Frappe v16+
+except ImportError:
+	from frappe.tests.utils import FrappeTestCase  # Frappe v15
+
+from etsy.query_recorder import QueryRecorder
+
+
+class QueryBudgetTestCase(FrappeTestCase):
+	@contextmanager
+	def assertQueryBudget(
+		self, per_record: float, records: int = 1, tables: dict[tuple[str, str], float] | None = None
+	):
+		"""
+		Fails if the block sends more than `per_record` SQL queries per record on average, or more than
+		`tables[(statement, table)]` queries per record of a statement type on a table.
+		The failure message lists the queries by statement type and table, so N+1 patterns stand out.
+
+		### Usage example:
+		```
+		with self.assertQueryBudget(
+		    per_record=60, records=len(listings), tables={("INSERT", "Etsy Listing Tag"): 1}
+		):
+		    shop.import_listings(etsy_api=api)
+		```
+		"""
+		with QueryRecorder() as recorder:
+			yield recorder
+
+		exceeded = [
+			f"{statement} {table}: {recorder.counts[(statement, table)] / records:.1f} per record, budget {budget}"
+			for (statement, table), budget in (tables or {}).items()
+			if recorder.counts[(statement, table)] > budget * records
+		]
+		if recorder.total > per_record * records:
+			exceeded.insert(0, f"{recorder.total / records:.1f} queries per record, budget {per_record}")
+		if exceeded:
+			self.fail(
+				f"Query budget exceeded for {records} records:\n"
+				+ "\n".join(exceeded)
+				+ "\n\n"
+				+ recorder.summary(records)
+			)
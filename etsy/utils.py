@@ -0,0 +1,10 @@
+from collections.abc import Iterator
+from datetime import date, timedelta
+
+
+def date_windows(start: date, end: date, days: int) -> Iterator[tuple[date, date]]:
+	"""Splits the days from `start` up to (excluding) `end` into windows of at most `days` days."""
+	while start < end:
+		window_end = min(start + timedelta(days=days), end)
+		yield start, window_end
+		start = window_end
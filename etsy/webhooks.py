@@ -0,0 +1,162 @@
+"""
+Receiver for Etsy webhooks, signed according to the Standard Webhooks specification.
+
+Register `Etsy Shop > Webhook URL` for the event `order.paid` in the Etsy app of the shop
+and copy the signing secret (`whsec_...`) into `Etsy Shop > Webhook Secret`.
+Each event enqueues the import of the single receipt it refers to.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import re
+import time
+import uuid
+
+import frappe
+from frappe import _
+
+WEBHOOK_TOLERANCE = 300  # seconds an event's timestamp may differ from the server time
+WEBHOOK_EVENTS = ("order.paid",)
+WEBHOOK_POLL_INTERVAL = 6 * 3600  # seconds between safety-net polls of shops that receive webhooks
+
+_RECEIPT_URL = re.compile(r"/shops/(\d+)/receipts/(\d+)")
+
+
+class EtsyWebhookSignatureError(frappe.AuthenticationError):
+	"""Raised when a webhook request is not signed with the shop's webhook secret."""
+
+
+def sign(secret: str, webhook_id: str, timestamp: int | str, body: bytes) -> str:
+	"""Returns the `webhook-signature` header for `body`: `v1,` and the base64 HMAC-SHA256."""
+	key = base64.b64decode(secret.removeprefix("whsec_"))
+	signed = f"{webhook_id}.{timestamp}.".encode() + body
+	return "v1," + base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode()
+
+
+def verify(secret: str, headers: dict, body: bytes, now: float | None = None):
+	"""Raises `EtsyWebhookSignatureError` unless one of the signatures in `headers` matches and the event is recent."""
+	webhook_id = headers.get("webhook-id")
+	timestamp = headers.get("webhook-timestamp")
+	signatures = (headers.get("webhook-signature") or "").split()
+	if not (webhook_id and timestamp and signatures):
+		raise EtsyWebhookSignatureError(_("Missing webhook signature headers."))
+
+	try:
+		age = abs((now or time.time()) - int(timestamp))
+	except ValueError:
+		raise EtsyWebhookSignatureError(_("Invalid webhook timestamp.")) from None
+	if age > WEBHOOK_TOLERANCE:
+		raise EtsyWebhookSignatureError(_("Webhook timestamp is too old or too new."))
+
+	expected = sign(secret, webhook_id, timestamp, body)
+	if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+		raise EtsyWebhookSignatureError(_("Invalid webhook signature."))
+
+
+def parse_event(payload: dict) -> tuple[int, int] | None:
+	"""Returns `(shop_id, receipt_id)` of an order event, `None` for other events."""
+	if payload.get("event_type") not in WEBHOOK_EVENTS:
+		return None
+	if match := _RECEIPT_URL.search(payload.get("resource_url") or ""):
+		return int(match.group(1)), int(match.group(2))
+	return None
+
+
+@frappe.whitelist(
+	methods=["POST"], allow_guest=True
+)  # nosemgrep: frappe-semgrep-rules.rules.security.guest-whitelisted-method
+def receive():
+	"""
+	Endpoint for Etsy webhooks: verifies the signature with the secret of the shop in the event
+	and enqueues the import of the receipt. Repeated deliveries of an event are ignored.
+	"""
+	body = frappe.request.get_data()
+	headers = {key.lower(): value for key, value in frappe.request.headers.items()}
+	try:
+		payload = json.loads(body)
+	except ValueError:
+		payload = None
+	if not isinstance(payload, dict):
+		frappe.throw(_("Invalid webhook payload."))
+
+	event = parse_event(payload)
+	shop_id = event[0] if event else payload.get("shop_id")
+	etsy_shop = frappe.db.get_value(
+		"Etsy Shop", {"shop_id": str(shop_id), "webhook_secret": ("is", "set")}, "name"
+	)
+	if not etsy_shop:
+		raise EtsyWebhookSignatureError(_("No Etsy Shop receives webhooks for shop ID {0}.").format(shop_id))
+
+	secret = frappe.get_doc("Etsy Shop", etsy_shop).get_password("webhook_secret")
+	verify(secret, headers, body)
+
+	cache = frappe.cache()
+	if not cache.set(
+		cache.make_key(f"etsy:webhook:{headers['webhook-id']}"), 1, ex=2 * WEBHOOK_TOLERANCE, nx=True
+	):
+		return {"status": "duplicate"}
+	if not event:
+		return {"status": "ignored"}
+
+	receipt_id = event[1]
+	frappe.enqueue(
+		"etsy.etsy.doctype.etsy_shop.etsy_shop.run_import_receipt",
+		queue="short",
+		job_id=f"etsy-receipt-{etsy_shop}-{receipt_id}",
+		deduplicate=True,
+		etsy_shop=etsy_shop,
+		receipt_id=receipt_id,
+	)
+	return {"status": "queued"}
+
+
+def simulate(etsy_shop: str, receipt_id: int, event_type: str = "order.paid", url: str | None = None) -> dict:
+	"""
+	Local event simulator: sends a signed webhook for `receipt_id` to this site, as Etsy would.
+	Combine it with the stand-in server of `etsy.benchmarks.server` to import the receipt without Etsy:
+	```
+	bench --site dev.localhost execute etsy.webhooks.simulate \
+	    --kwargs "{'etsy_shop': 'My Shop', 'receipt_id': 123456}"
+	```
+	"""
+	import httpx
+
+	shop = frappe.get_doc("Etsy Shop", etsy_shop)
+	body = json.dumps(
+		{
+			"event_type": event_type,
+			"shop_id": int(shop.shop_id),
+			"resource_url": f"https://api.etsy.com/v3/application/shops/{shop.shop_id}/receipts/{receipt_id}",
+		}
+	).encode()
+	webhook_id, timestamp = f"msg_{uuid.uuid4().hex}", int(time.time())
+	resp = httpx.post(
+		url or shop.webhook_url,
+		content=body,
+		headers={
+			"Content-Type": "application/json",
+			"webhook-id": webhook_id,
+			"webhook-timestamp": str(timestamp),
+			"webhook-signature": sign(shop.get_password("webhook_secret"), webhook_id, timestamp, body),
+		},
+	)
+	return {"status_code": resp.status_code, "response": resp.json()}
+
+
+def receives_webhooks(etsy_shop: str) -> bool:
+	return bool(frappe.db.get_value("Etsy Shop", etsy_shop, "webhook_secret"))
+
+
+def safety_poll_due(etsy_shop: str) -> bool:
+	"""
+	Whether the scheduled receipt sync should poll `etsy_shop`. Shops that receive webhooks
+	are only polled every `WEBHOOK_POLL_INTERVAL` seconds, to catch events that were not delivered.
+	"""
+	if not receives_webhooks(etsy_shop):
+		return True
+	cache = frappe.cache()
+	return bool(
+		cache.set(cache.make_key(f"etsy:safety_poll:{etsy_shop}"), 1, ex=WEBHOOK_POLL_INTERVAL, nx=True)
+	)